@@ -6,13 +6,58 @@ Users should use the AsyncClient to manage the interface, as it has performance
 features. A simpler Client is also given as a base implementation.
 """
 
-import json
 import requests
 from auvsi_suas.client.exceptions import InteropError
 from auvsi_suas.proto import interop_api_pb2
 from concurrent.futures import ThreadPoolExecutor
 from google.protobuf import json_format
 
+# Content type for binary protos, which are smaller and faster to serialize
+# than JSON formatted protos.
+PROTO_CONTENT_TYPE = 'application/x-protobuf'
+
+
+def proto_request(proto):
+    """Gets request arguments to send the proto as a binary proto."""
+    return {
+        'data': proto.SerializeToString(),
+        'headers': {
+            'Content-Type': PROTO_CONTENT_TYPE
+        },
+    }
+
+
+def response_is_proto(r):
+    """Whether the response contains a binary proto."""
+    return r.headers.get('Content-Type', '').startswith(PROTO_CONTENT_TYPE)
+
+
+def parse_response(r, proto):
+    """Parses the binary or JSON formatted proto response into the proto."""
+    if response_is_proto(r):
+        proto.ParseFromString(r.content)
+    else:
+        json_format.Parse(r.text, proto)
+    return proto
+
+
+def parse_list_response(r, list_proto, field):
+    """Parses a binary or JSON formatted list of protos.
+
+    Args:
+        r: The response to parse.
+        list_proto: The wrapper proto used by binary responses.
+        field: Name of the repeated field in list_proto holding the protos.
+    Returns:
+        List of the parsed protos.
+    """
+    if response_is_proto(r):
+        list_proto.ParseFromString(r.content)
+    else:
+        for proto_dict in r.json():
+            json_format.ParseDict(proto_dict, getattr(list_proto, field).add())
+    return list(getattr(list_proto, field))
+
 
 class Client(object):
     """Client which provides authenticated access to interop API.
@@ -23,6 +68,9 @@ class Client(object):
     This client uses a single session to make blocking requests to the
     interoperability server. This is the base core implementation. The
     AsyncClient uses this base Client to add performance features.
+
+    Requests are sent and responses requested as binary protos, which are
+    cheaper to serialize and smaller on the network than JSON.
     """
 
     def __init__(self,
@@ -48,6 +96,8 @@ class Client(object):
         self.max_concurrent = 128
 
         self.session = requests.Session()
+        # Prefer binary protos in responses.
+        self.session.headers['Accept'] = PROTO_CONTENT_TYPE
         self.session.mount('http://',
                            requests.adapters.HTTPAdapter(
                                pool_maxsize=max_concurrent,
@@ -57,7 +107,7 @@ class Client(object):
         creds = interop_api_pb2.Credentials()
         creds.username = username
         creds.password = password
-        self.post('/api/login', data=json_format.MessageToJson(creds))
+        self.post('/api/login', **proto_request(creds))
 
     def get(self, uri, **kwargs):
         """GET request to server.
@@ -129,12 +179,8 @@ class Client(object):
             ValueError or AttributeError: Malformed response from server.
         """
         r = self.get('/api/teams')
-        teams = []
-        for team_dict in r.json():
-            team_proto = interop_api_pb2.TeamStatus()
-            json_format.Parse(json.dumps(team_dict), team_proto)
-            teams.append(team_proto)
-        return teams
+        return parse_list_response(r, interop_api_pb2.TeamStatusList(),
+                                   'teams')
 
     def get_mission(self, mission_id):
         """GET a mission by ID.
@@ -147,9 +193,7 @@ class Client(object):
             ValueError or AttributeError: Malformed response from server.
         """
         r = self.get('/api/missions/%d' % mission_id)
-        mission = interop_api_pb2.Mission()
-        json_format.Parse(r.text, mission)
-        return mission
+        return parse_response(r, interop_api_pb2.Mission())
 
     def post_telemetry(self, telem):
         """POST new telemetry.
@@ -160,7 +204,22 @@ class Client(object):
             InteropError: Error from server.
             requests.Timeout: Request timeout.
         """
-        self.post('/api/telemetry', data=json_format.MessageToJson(telem))
+        self.post('/api/telemetry', **proto_request(telem))
+
+    def post_telemetry_batch(self, batch):
+        """POST a batch of telemetry.
+
+        Args:
+            batch: TelemetryBatch object containing timestamped telemetry.
+        Returns:
+            TelemetryBatchResult with whether each telemetry was accepted.
+        Raises:
+            InteropError: Error from server.
+            requests.Timeout: Request timeout.
+            ValueError or AttributeError: Malformed response from server.
+        """
+        r = self.post('/api/telemetry/batch', **proto_request(batch))
+        return parse_response(r, interop_api_pb2.TelemetryBatchResult())
 
     def get_odlcs(self, mission=None):
         """GET odlcs.
@@ -178,12 +237,7 @@ class Client(object):
         if mission:
             url += '?mission=%d' % mission
         r = self.get(url)
-        odlcs = []
-        for odlc_dict in r.json():
-            odlc_proto = interop_api_pb2.Odlc()
-            json_format.Parse(json.dumps(odlc_dict), odlc_proto)
-            odlcs.append(odlc_proto)
-        return odlcs
+        return parse_list_response(r, interop_api_pb2.OdlcList(), 'odlcs')
 
     def get_odlc(self, odlc_id):
         """GET odlc.
@@ -198,9 +252,7 @@ class Client(object):
             ValueError or AttributeError: Malformed response from server.
         """
         r = self.get('/api/odlcs/%d' % odlc_id)
-        odlc = interop_api_pb2.Odlc()
-        json_format.Parse(r.text, odlc)
-        return odlc
+        return parse_response(r, interop_api_pb2.Odlc())
 
     def post_odlc(self, odlc):
         """POST odlc.
@@ -214,10 +266,8 @@ class Client(object):
             requests.Timeout: Request timeout.
             ValueError or AttributeError: Malformed response from server.
         """
-        r = self.post('/api/odlcs', data=json_format.MessageToJson(odlc))
-        odlc = interop_api_pb2.Odlc()
-        json_format.Parse(r.text, odlc)
-        return odlc
+        r = self.post('/api/odlcs', **proto_request(odlc))
+        return parse_response(r, interop_api_pb2.Odlc())
 
     def put_odlc(self, odlc_id, odlc):
         """PUT odlc.
@@ -232,11 +282,8 @@ class Client(object):
             requests.Timeout: Request timeout.
             ValueError or AttributeError: Malformed response from server.
         """
-        r = self.put(
-            '/api/odlcs/%d' % odlc_id, data=json_format.MessageToJson(odlc))
-        odlc = interop_api_pb2.Odlc()
-        json_format.Parse(r.text, odlc)
-        return odlc
+        r = self.put('/api/odlcs/%d' % odlc_id, **proto_request(odlc))
+        return parse_response(r, interop_api_pb2.Odlc())
 
     def delete_odlc(self, odlc_id):
         """DELETE odlc.
@@ -363,6 +410,17 @@ class AsyncClient(object):
         """
         return self.executor.submit(self.client.post_telemetry, telem)
 
+    def post_telemetry_batch(self, batch):
+        """POST a batch of telemetry.
+
+        Args:
+            batch: TelemetryBatch object containing timestamped telemetry.
+        Returns:
+            Future object which contains the return value or error from the
+            underlying Client.
+        """
+        return self.executor.submit(self.client.post_telemetry_batch, batch)
+
     def get_odlcs(self, mission=None):
         """GET odlcs.
 
@@ -101,6 +101,26 @@ class TestClient(unittest.TestCase):
         with self.assertRaises(InteropError):
             self.async_client.post_telemetry(t).result()
 
+    def test_post_telemetry_batch(self):
+        """Test sending a batch of telemetry."""
+        batch = interop_api_pb2.TelemetryBatch()
+        t = batch.telemetry.add().telemetry
+        t.latitude = 38
+        t.longitude = -76
+        t.altitude = 100
+        t.heading = 90
+        t = batch.telemetry.add().telemetry
+        t.latitude = 38
+        t.longitude = -76
+        t.altitude = 100
+        t.heading = 400  # Out of range.
+
+        result = self.client.post_telemetry_batch(batch)
+        async_result = self.async_client.post_telemetry_batch(batch).result()
+        self.assertEqual([True, False], [r.accepted for r in result.results])
+        self.assertEqual([True, False],
+                         [r.accepted for r in async_result.results])
+
     def test_odlcs(self):
         """Test odlc workflow."""
         # Post a odlc gets an updated odlc.
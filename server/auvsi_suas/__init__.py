@@ -1 +1 @@
-
+default_app_config = 'auvsi_suas.apps.AuvsiSuasConfig'
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AuvsiSuasConfig(AppConfig):
     name = 'auvsi_suas'
+
+    def ready(self):
+        # Lists the partitioned UasTelemetry table, so it is flushed.
+        from auvsi_suas.patches import postgresql_patch
@@ -31,6 +31,11 @@ NavigationCtrl = function($routeParams) {
             url: "/api/missions/export.kml",
             target: "_blank"
         },
+        {
+            text: "Export Simplified Data (KML)",
+            url: "/api/missions/export.kml?tolerance=10&max_rate=1",
+            target: "_blank"
+        },
         {
             text: "GPS Conversion",
             url: "/#!/gps_conversion",
@@ -5,14 +5,16 @@
 
 /**
  * Controller for the Evaluate Teams page.
- * @param {!angular.$window} $window The window service.
+ * @param {!angular.$http} $http The http service.
+ * @param {!angular.$interval} $interval The interval service.
+ * @param {!angular.Scope} $scope The scope of the controller to listen for events.
  * @param {!Object} Backend The backend service.
  * @final
  * @constructor
  * @struct
  * @ngInject
  */
-EvaluateTeamsCtrl = function($window, $routeParams, Backend) {
+EvaluateTeamsCtrl = function($http, $interval, $scope, $routeParams, Backend) {
     /**
      * @export {?Array<Object>} The teams for evaluation.
      */
@@ -24,9 +26,24 @@ EvaluateTeamsCtrl = function($window, $routeParams, Backend) {
     this.selectedTeamId = "-1";
 
     /**
-     * @private @const {!angular.$window} The window service.
+     * @export {?Object} The status of the evaluation job.
      */
-    this.window_ = $window;
+    this.job = null;
+
+    /**
+     * @private @const {!angular.$http} The http service.
+     */
+    this.http_ = $http;
+
+    /**
+     * @private @const {!angular.$interval} The interval service.
+     */
+    this.interval_ = $interval;
+
+    /**
+     * @private {?Object} Polls the evaluation job every 1s.
+     */
+    this.pollInterval_ = null;
 
     /**
      * @private @const {integer} The mission ID for evaluation.
@@ -36,11 +53,13 @@ EvaluateTeamsCtrl = function($window, $routeParams, Backend) {
     // Get the teams to display.
     Backend.teamsResource.query({}).$promise.then(
             angular.bind(this, this.setTeams_));
+
+    $scope.$on("$destroy", angular.bind(this, this.stopPolling_));
 };
 
 
 /**
- * Evaluates the teams and renders the result.
+ * Starts a job evaluating the teams, and polls it until done.
  * @export
  */
 EvaluateTeamsCtrl.prototype.evaluate = function() {
@@ -51,9 +70,58 @@ EvaluateTeamsCtrl.prototype.evaluate = function() {
         query = '?team=' + id;
     }
 
-    // Open evaluation in new tab.
-    this.window_.open('/api/missions/' + this.missionId_ + '/evaluate.zip'+ query,
-                      '_blank');
+    this.stopPolling_();
+    this.http_.post('/api/missions/' + this.missionId_ + '/evaluate/jobs' + query)
+        .then(angular.bind(this, this.setJob_));
+};
+
+
+/**
+ * Whether an evaluation job is running.
+ * @return {boolean} Whether running.
+ * @export
+ */
+EvaluateTeamsCtrl.prototype.isRunning = function() {
+    return !!this.job && this.job.state == 'RUNNING';
+};
+
+
+/**
+ * Sets the job status, and polls the job while it's running.
+ * @param {!Object} response The job status response.
+ * @private
+ */
+EvaluateTeamsCtrl.prototype.setJob_ = function(response) {
+    this.job = response.data;
+    if (!this.isRunning()) {
+        this.stopPolling_();
+    } else if (!this.pollInterval_) {
+        this.pollInterval_ = this.interval_(
+                angular.bind(this, this.poll_), 1000);
+    }
+};
+
+
+/**
+ * Gets the status of the running job.
+ * @private
+ */
+EvaluateTeamsCtrl.prototype.poll_ = function() {
+    this.http_.get('/api/missions/' + this.missionId_ + '/evaluate/jobs/' +
+                   this.job.id)
+        .then(angular.bind(this, this.setJob_));
+};
+
+
+/**
+ * Stops polling the job.
+ * @private
+ */
+EvaluateTeamsCtrl.prototype.stopPolling_ = function() {
+    if (this.pollInterval_) {
+        this.interval_.cancel(this.pollInterval_);
+        this.pollInterval_ = null;
+    }
 };
 
 
@@ -69,7 +137,9 @@ EvaluateTeamsCtrl.prototype.setTeams_ = function(teams) {
 
 // Register controller with app.
 angular.module('auvsiSuasApp').controller('EvaluateTeamsCtrl', [
-    '$window',
+    '$http',
+    '$interval',
+    '$scope',
     '$routeParams',
     'Backend',
     EvaluateTeamsCtrl
@@ -16,7 +16,7 @@
  */
 MissionDashboardCtrl = function($routeParams, $interval, $scope, Backend) {
     /**
-     * @export {?Object} The teams data.
+     * @export {?Array<Object>} The teams data.
      */
     this.teams = null;
 
@@ -30,29 +30,94 @@ MissionDashboardCtrl = function($routeParams, $interval, $scope, Backend) {
      */
     this.interval_ = $interval;
 
+    /**
+     * @private @const {!angular.Scope} The scope of the controller.
+     */
+    this.scope_ = $scope;
+
     /**
      * @private @const {!Object} The backend service.
      */
     this.backend_ = Backend;
 
     /**
-     * @private @const {!Object} Data sync every 1s.
+     * @private {?EventSource} Stream of changes to team status. The browser
+     *     reconnects if the stream ends. Null while the server refuses
+     *     streams, during which teams are polled.
+     */
+    this.teamsStream_ = null;
+
+    /**
+     * @private {number} Number of polls until the stream is retried.
+     */
+    this.pollsUntilStream_ = 0;
+
+    /**
+     * @private @const {!Object} Redraws every 1s, as teams become inactive
+     *     without a change in status, or polls teams without a stream.
      */
     this.updateInterval_ = this.interval_(
             angular.bind(this, this.update_), 1000);
+    this.update_();
     $scope.$on("$destroy", angular.bind(this, function() {
+        if (this.teamsStream_) {
+            this.teamsStream_.close();
+            this.teamsStream_ = null;
+        }
         this.interval_.cancel(this.updateInterval_);
         this.updateInterval_ = null;
     }));
 };
 
+
 /**
- * Executes asynchronous updates for data.
+ * Polls the teams if the server refused the stream, retrying the stream
+ * every 30 polls.
  * @private
  */
 MissionDashboardCtrl.prototype.update_ = function() {
-    this.backend_.teamsResource.query({}).$promise
-        .then(angular.bind(this, this.setTeams_));
+    if (this.teamsStream_) {
+        return;
+    }
+    if (this.pollsUntilStream_ > 0) {
+        this.pollsUntilStream_--;
+        this.backend_.teamsResource.query({}).$promise
+            .then(angular.bind(this, this.setTeams_));
+        return;
+    }
+    this.teamsStream_ = new EventSource('/api/teams/stream');
+    this.teamsStream_.onmessage = angular.bind(this, this.updateTeams_);
+    this.teamsStream_.onerror = angular.bind(this, function() {
+        // The browser doesn't reconnect if the server refused the stream.
+        if (this.teamsStream_.readyState == EventSource.CLOSED) {
+            this.teamsStream_ = null;
+            this.pollsUntilStream_ = 30;
+        }
+    });
+};
+
+
+/**
+ * Updates the teams with the changed teams of a stream event.
+ * @param {!MessageEvent} event The stream event.
+ * @private
+ */
+MissionDashboardCtrl.prototype.updateTeams_ = function(event) {
+    var changed = angular.fromJson(event.data);
+    this.scope_.$apply(angular.bind(this, function() {
+        var teams = this.teams || [];
+        for (var i = 0; i < changed.length; i++) {
+            var index = teams.findIndex(function(team) {
+                return team.team.id == changed[i].team.id;
+            });
+            if (index < 0) {
+                teams.push(changed[i]);
+            } else {
+                teams[index] = changed[i];
+            }
+        }
+        this.setTeams_(teams);
+    }));
 };
 
 
@@ -0,0 +1,82 @@
+"""Manages the daily partitions of UasTelemetry."""
+
+import datetime
+import os
+from auvsi_suas.models import telemetry_partitions
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+
+def parse_day(value):
+    """Parses a YYYY-MM-DD day argument."""
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError('Invalid day, expected YYYY-MM-DD: %s' % value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Manages the daily partitions of telemetry. Run "create" daily, as '
+        'scheduled in uwsgi.ini, to create upcoming partitions, '
+        '"archive" to move closed partitions '
+        'to compressed files, and "restore" to reload archives for '
+        'evaluation.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['list', 'create', 'archive', 'restore'],
+            help='Action to take on the partitions.')
+        parser.add_argument(
+            'archives',
+            nargs='*',
+            help='For restore, the archive files to restore.')
+        parser.add_argument(
+            '--days_ahead',
+            type=int,
+            default=1,
+            help='For create, the number of days after today to create '
+            'partitions for.')
+        parser.add_argument(
+            '--directory', help='For archive, the directory to write to.')
+        parser.add_argument(
+            '--before',
+            help='For archive, only archive partitions for days before this '
+            'YYYY-MM-DD day. Defaults to today.')
+
+    def handle(self, *args, **options):
+        if not telemetry_partitions.is_partitioned():
+            raise CommandError(
+                'Telemetry is not partitioned. Partitioning requires '
+                'PostgreSQL 11+ and the auvsi_suas migrations.')
+
+        action = options['action']
+        if action == 'list':
+            for day in telemetry_partitions.partition_days():
+                self.stdout.write(telemetry_partitions.partition_name(day))
+        elif action == 'create':
+            for day in telemetry_partitions.create_partitions(
+                    options['days_ahead']):
+                self.stdout.write('Created partition %s.' %
+                                  telemetry_partitions.partition_name(day))
+        elif action == 'archive':
+            directory = options['directory']
+            if not directory or not os.path.isdir(directory):
+                raise CommandError('Not a directory: %s' % directory)
+            before = timezone.now().astimezone(timezone.utc).date()
+            if options['before']:
+                before = min(before, parse_day(options['before']))
+            for day in telemetry_partitions.partition_days():
+                if day >= before:
+                    continue
+                path = telemetry_partitions.archive_partition(day, directory)
+                self.stdout.write('Archived partition to %s.' % path)
+        elif action == 'restore':
+            for path in options['archives']:
+                try:
+                    telemetry_partitions.restore_partition(path)
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write('Restored partition from %s.' % path)
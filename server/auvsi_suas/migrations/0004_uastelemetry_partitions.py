@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Partitions the UasTelemetry table by day on PostgreSQL.
+
+The existing table is replaced by a table partitioned by range of timestamp,
+with a partition per UTC day of existing telemetry and a default partition.
+Existing telemetry, the id sequence, indexes, and constraints are carried over.
+Other databases are unchanged.
+"""
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+TABLE = 'auvsi_suas_uastelemetry'
+OLD_TABLE = TABLE + '_old'
+DEFAULT_PARTITION = TABLE + '_default'
+PARTITION_PREFIX = TABLE + '_p'
+
+# Minimum PostgreSQL version, for default partitions and partitioned indexes.
+MIN_POSTGRES_VERSION = 110000
+
+
+def supported(schema_editor):
+    connection = schema_editor.connection
+    return (connection.vendor == 'postgresql' and
+            connection.pg_version >= MIN_POSTGRES_VERSION)
+
+
+def table_definition(cursor, table):
+    """Gets the (pkey name, index defs, foreign key defs) of the table."""
+    cursor.execute('SELECT conname FROM pg_constraint '
+                   'WHERE conrelid = %s::regclass AND contype = %s',
+                   [table, 'p'])
+    pkey = cursor.fetchone()[0]
+    cursor.execute('SELECT indexdef FROM pg_indexes '
+                   'WHERE tablename = %s AND indexname != %s', [table, pkey])
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        'WHERE conrelid = %s::regclass AND contype = %s', [table, 'f'])
+    foreign_keys = cursor.fetchall()
+    return (pkey, indexes, foreign_keys)
+
+
+def replace_table(cursor, create_sql, pkey_columns, after_create=None):
+    """Replaces the table with a new table, preserving data and definition.
+
+    Args:
+        cursor: The database cursor.
+        create_sql: SQL to create the new table from OLD_TABLE.
+        pkey_columns: Columns of the new primary key.
+        after_create: Optional. Function called with the cursor after the new
+            table is created, before data is copied.
+    """
+    (pkey, indexes, foreign_keys) = table_definition(cursor, TABLE)
+    cursor.execute('ALTER TABLE %s RENAME TO %s' % (TABLE, OLD_TABLE))
+    cursor.execute(create_sql)
+    if after_create:
+        after_create(cursor)
+    cursor.execute('INSERT INTO %s SELECT * FROM %s' % (TABLE, OLD_TABLE))
+    # The id sequence is owned by the old table, keep it when dropped.
+    cursor.execute('ALTER SEQUENCE %s_id_seq OWNED BY %s.id' % (TABLE, TABLE))
+    cursor.execute('DROP TABLE %s' % OLD_TABLE)
+    # Recreate the definition with the original names.
+    cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s PRIMARY KEY (%s)' %
+                   (TABLE, pkey, pkey_columns))
+    for index in indexes:
+        cursor.execute(index)
+    for (name, definition) in foreign_keys:
+        cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s %s' % (TABLE, name,
+                                                                definition))
+
+
+def create_day_partitions(cursor):
+    """Creates a partition for each day of telemetry, and the default."""
+    cursor.execute(
+        'SELECT DISTINCT date_trunc(\'day\', "timestamp" AT TIME ZONE \'UTC\') '
+        'FROM %s' % OLD_TABLE)
+    for (day, ) in cursor.fetchall():
+        cursor.execute(
+            'CREATE TABLE %s%s PARTITION OF %s FOR VALUES '
+            'FROM (%%s::timestamp AT TIME ZONE \'UTC\') '
+            'TO ((%%s::timestamp + interval \'1 day\') AT TIME ZONE \'UTC\')' %
+            (PARTITION_PREFIX, day.strftime('%Y%m%d'), TABLE), [day, day])
+    cursor.execute('CREATE TABLE %s PARTITION OF %s DEFAULT' %
+                   (DEFAULT_PARTITION, TABLE))
+
+
+def partition(apps, schema_editor):
+    if not supported(schema_editor):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        replace_table(
+            cursor,
+            'CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE ("timestamp")' % (TABLE, OLD_TABLE),
+            # Unique constraints on partitioned tables must include the
+            # partition key.
+            'id, "timestamp"',
+            after_create=create_day_partitions)
+
+
+def unpartition(apps, schema_editor):
+    if not supported(schema_editor):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        replace_table(cursor, 'CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS)' %
+                      (TABLE, OLD_TABLE), 'id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auvsi_suas', '0003_static_params'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -31,6 +31,9 @@ class AccessLogMixin(models.Model):
     def by_user(cls, user, start_time=None, end_time=None):
         """Gets the time-sorted list of access log for the given user.
 
+        The time bounds are applied as timestamp range filters, so for tables
+        partitioned by timestamp only the overlapping partitions are scanned.
+
         Args:
             user: The user to get the access log for.
             start_time: Optional. Inclusive start time.
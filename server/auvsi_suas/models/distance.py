@@ -1,5 +1,6 @@
 """Functions for computing distance."""
 
+import functools
 import logging
 import math
 import numpy as np
@@ -7,7 +8,10 @@ import pyproj
 from auvsi_suas.models import units
 
 logger = logging.getLogger(__name__)
-wgs84 = pyproj.Proj(init="epsg:4326")
+wgs84 = pyproj.CRS("EPSG:4326")
+
+# Mean radius of the Earth.
+EARTH_RADIUS_KM = 6371
 
 
 def haversine(lon1, lat1, lon2, lat2):
@@ -38,8 +42,40 @@ def haversine(lon1, lat1, lon2, lat2):
              math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2)
     hav_c = 2 * math.asin(math.sqrt(hav_a))
 
-    # 6367 km is the radius of the Earth
-    dist_km = 6371 * hav_c
+    dist_km = EARTH_RADIUS_KM * hav_c
+    return dist_km
+
+
+def haversine_many(lon1, lat1, lon2, lat2):
+    """Vectorized haversine, which broadcasts over arrays of positions.
+
+    Computing many distances with a single call avoids the per call overhead
+    of haversine(), which remains faster for single distances.
+
+    Args:
+        lon1, lat1: The latitude and longitude of positions 1, as scalars or
+            arrays.
+        lon2, lat2: The latitude and longitude of positions 2, as scalars or
+            arrays.
+
+    Returns:
+        The distances in kilometers, as an array of the broadcast shape.
+    """
+    # convert decimal degrees to radians
+    lon1 = np.radians(lon1)
+    lat1 = np.radians(lat1)
+    lon2 = np.radians(lon2)
+    lat2 = np.radians(lat2)
+
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    hav_a = (np.sin(dlat / 2)**2 +
+             np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2)
+    # Rounding may push hav_a slightly above 1 for antipodal points.
+    hav_c = 2 * np.arcsin(np.sqrt(np.minimum(hav_a, 1)))
+
+    dist_km = EARTH_RADIUS_KM * hav_c
     return dist_km
 
 
@@ -61,6 +97,81 @@ def distance_to(latitude_1, longitude_1, altitude_1, latitude_2, longitude_2,
     return math.hypot(gps_dist_ft, alt_dist_ft)
 
 
+def distance_to_many(latitude, longitude, altitude, ref_latitude,
+                     ref_longitude, ref_altitude):
+    """Get the distances in feet between positions, broadcasting over arrays.
+
+    Arguments may be scalars or arrays. For example, the distance from every
+    position of a track to a single reference position is
+    distance_to_many(lats, lons, alts, ref_lat, ref_lon, ref_alt).
+
+    Args:
+        latitude: The latitudes of the positions.
+        longitude: The longitudes of the positions.
+        altitude: The altitudes in feet of the positions.
+        ref_latitude: The latitudes of the reference positions.
+        ref_longitude: The longitudes of the reference positions.
+        ref_altitude: The altitudes in feet of the reference positions.
+    Returns:
+        The distances in feet, as an array of the broadcast shape.
+    """
+    gps_dist_km = haversine_many(longitude, latitude, ref_longitude,
+                                 ref_latitude)
+    gps_dist_ft = units.kilometers_to_feet(gps_dist_km)
+    alt_dist_ft = np.subtract(altitude, ref_altitude)
+    return np.hypot(gps_dist_ft, alt_dist_ft)
+
+
+def distance_matrix(latitude, longitude, altitude, ref_latitude, ref_longitude,
+                    ref_altitude):
+    """Get the distances in feet between all pairs of positions.
+
+    Args:
+        latitude: Sequence of N latitudes.
+        longitude: Sequence of N longitudes.
+        altitude: Sequence of N altitudes in feet.
+        ref_latitude: Sequence of M reference latitudes.
+        ref_longitude: Sequence of M reference longitudes.
+        ref_altitude: Sequence of M reference altitudes in feet.
+    Returns:
+        An N x M array, where element (i, j) is the distance in feet between
+        position i and reference position j.
+    """
+
+    def column(v):
+        return np.asarray(v, dtype=np.float64)[:, np.newaxis]
+
+    def row(v):
+        return np.asarray(v, dtype=np.float64)[np.newaxis, :]
+
+    return distance_to_many(
+        column(latitude),
+        column(longitude),
+        column(altitude),
+        row(ref_latitude), row(ref_longitude), row(ref_altitude))
+
+
+def tangent_plane(latitude, longitude, ref_latitude, ref_longitude):
+    """Projects positions onto the plane tangent at a reference position.
+
+    The (equirectangular) projection is accurate near the reference, where it
+    agrees with haversine distances. Arguments may be scalars or arrays.
+
+    Args:
+        latitude: The latitudes of the positions.
+        longitude: The longitudes of the positions.
+        ref_latitude: The latitude of the reference position.
+        ref_longitude: The longitude of the reference position.
+    Returns:
+        Tuple of (x, y) east and north of the reference in feet.
+    """
+    ft_per_degree = units.kilometers_to_feet(EARTH_RADIUS_KM) * math.pi / 180
+    x = np.subtract(longitude, ref_longitude) * (
+        ft_per_degree * math.cos(math.radians(ref_latitude)))
+    y = np.subtract(latitude, ref_latitude) * ft_per_degree
+    return (x, y)
+
+
 def utm_zone(lat, lon):
     """Determine the UTM zone for a given latitude and longitude.
 
@@ -93,9 +204,20 @@ def utm_zone(lat, lon):
     return zone, lat > 0
 
 
+def utm_ref(zone, north):
+    """PROJ string for the given zone."""
+    ref = "+proj=utm +zone=%d +ellps=WGS84" % zone
+    if not north:
+        ref += " +south"
+    return ref
+
+
+@functools.lru_cache(maxsize=None)
 def proj_utm(zone, north):
     """Proj instance for the given zone.
 
+    Instances are cached, so repeated calls are cheap.
+
     Args:
         zone: UTM zone
         north: North zone or south zone
@@ -103,15 +225,64 @@ def proj_utm(zone, north):
     Returns:
         pyproj.Proj instance for the given zone
     """
-    ref = "+proj=utm +zone=%d +ellps=WGS84" % zone
-    if not north:
-        ref += " +south"
-    return pyproj.Proj(ref)
+    return pyproj.Proj(utm_ref(zone, north))
+
+
+@functools.lru_cache(maxsize=None)
+def utm_transformer(zone, north):
+    """Transformer from WGS84 to the given zone.
+
+    Instances are cached, so repeated calls are cheap.
+
+    Args:
+        zone: UTM zone
+        north: North zone or south zone
+
+    Returns:
+        pyproj.Transformer from (lon, lat) to UTM (x, y) in meters.
+    """
+    return pyproj.Transformer.from_crs(
+        wgs84, pyproj.CRS(utm_ref(zone, north)), always_xy=True)
+
+
+def project_utm(points, utm):
+    """Projects points into cartesian UTM coordinates with a single transform.
+
+    Args:
+        points: Sequence of points in the form (lat, lon, alt MSL (ft)).
+        utm: The UTM Transformer to project with.
+
+    Returns:
+        An N x 3 array of (x, y, z) in meters. Points well outside of the
+        projection are not finite.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    x, y = utm.transform(points[:, 1], points[:, 0])
+    return np.column_stack((x, y, units.feet_to_meters(points[:, 2])))
 
 
 def distance_to_line(start, end, point, utm):
     """Compute the closest distance from point to a line segment.
 
+    Arguments are points in the form (lat, lon, alt MSL (ft)).
+
+    Args:
+        start: Defines the start of the line.
+        end: Defines the end of the line.
+        point: Free point to compute distance from.
+        utm: The UTM Transformer to project into. If start, end, or point
+             are well outside of this projection, this function returns
+             infinite.
+
+    Returns:
+        Closest distance in ft from point to the line.
+    """
+    return float(distance_to_segments([point], [(start, end)], utm)[0, 0])
+
+
+def distance_to_segments(points, segments, utm):
+    """Compute the closest distance from each point to each line segment.
+
     Based on the point-line distance derived in:
     http://mathworld.wolfram.com/Point-LineDistance3-Dimensional.html
 
@@ -130,51 +301,47 @@ def distance_to_line(start, end, point, utm):
 
     d = |p - p_c|
 
-    Arguments are points in the form (lat, lon, alt MSL (ft)).
+    All points and segment ends are projected with a single transform, and
+    distances are computed for all pairs with array operations.
+
+    Points are in the form (lat, lon, alt MSL (ft)).
 
     Args:
-        start: Defines the start of the line.
-        end: Defines the end of the line.
-        point: Free point to compute distance from.
-        utm: The UTM Proj projection to project into. If start, end, or point
-             are well outside of this projection, this function returns
-             infinite.
+        points: Sequence of N free points to compute distance from.
+        segments: Sequence of M (start, end) points defining line segments.
+        utm: The UTM Transformer to project into. Distances for points or
+             segments well outside of this projection are infinite.
 
     Returns:
-        Closest distance in ft from point to the line.
+        An N x M array, where element (i, j) is the closest distance in ft
+        from point i to segment j.
     """
-    try:
-        # Convert points to UTM projection.
-        # We need a cartesian coordinate system to perform the calculation.
-        lat, lon, ftmsl = start
-        x, y = pyproj.transform(wgs84, utm, lon, lat)
-        l1 = np.array([x, y, units.feet_to_meters(ftmsl)])
-
-        lat, lon, ftmsl = end
-        x, y = pyproj.transform(wgs84, utm, lon, lat)
-        l2 = np.array([x, y, units.feet_to_meters(ftmsl)])
-
-        lat, lon, ftmsl = point
-        x, y = pyproj.transform(wgs84, utm, lon, lat)
-        p = np.array([x, y, units.feet_to_meters(ftmsl)])
-    except RuntimeError:
-        # pyproj throws RuntimeError if the coordinates are grossly beyond the
-        # bounds of the projection. We simplify this to "infinite" distance.
-        return float("inf")
-
-    d1 = l1 - p
-    d2 = l2 - l1
-    num = np.dot(d1, d2)
-    dem = np.linalg.norm(l2 - l1)**2
-    t = -num / dem
-
-    if t < 0:
-        t = 0
-    elif t > 1:
-        t = 1
-
-    p_c = l1 + t * (l2 - l1)
-
-    dist = np.linalg.norm(p - p_c)
+    num_points = len(points)
+    ends = [end for segment in segments for end in segment]
+    # Convert points to UTM projection.
+    # We need a cartesian coordinate system to perform the calculation.
+    projected = project_utm(list(points) + ends, utm)
+    p = projected[:num_points]
+    l1 = projected[num_points::2]
+    l2 = projected[num_points + 1::2]
+
+    # Positions outside the projection may be inf, ignore the math warnings.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d2 = l2 - l1
+        dem = np.sum(d2**2, axis=1)
+        d1 = l1[np.newaxis, :, :] - p[:, np.newaxis, :]
+        num = np.sum(d1 * d2[np.newaxis, :, :], axis=2)
+        # Segments of zero length are nearest at their start.
+        t = np.where(dem > 0, -num / dem, 0)
+        t = np.clip(t, 0, 1)
+
+        p_c = l1[np.newaxis, :, :] + t[:, :, np.newaxis] * d2[np.newaxis, :, :]
+        dist = np.linalg.norm(p[:, np.newaxis, :] - p_c, axis=2)
+
+    # Positions which couldn't be projected are "infinite" distance.
+    p_ok = np.all(np.isfinite(p), axis=1)
+    l_ok = np.all(np.isfinite(l1), axis=1) & np.all(np.isfinite(l2), axis=1)
+    dist = np.where(p_ok[:, np.newaxis] & l_ok[np.newaxis, :], dist,
+                    float("inf"))
 
     return units.meters_to_feet(dist)
@@ -1,5 +1,7 @@
 """Tests for the distance module."""
 
+import numpy as np
+import time
 from auvsi_suas.models import distance
 from django.test import TestCase
 
@@ -54,11 +56,108 @@ class TestHaversine(TestCase):
         ])  # yapf: disable
 
 
+class TestDistanceToMany(TestCase):
+    """Tests the vectorized distance functions."""
+
+    def setUp(self):
+        rand = np.random.RandomState(0)
+        self.lat = rand.uniform(-80, 80, 100)
+        self.lon = rand.uniform(-180, 180, 100)
+        self.alt = rand.uniform(0, 1000, 100)
+
+    def test_haversine_many(self):
+        """Tests haversine_many matches haversine."""
+        dists = distance.haversine_many(self.lon[:-1], self.lat[:-1],
+                                        self.lon[1:], self.lat[1:])
+        self.assertEqual((99, ), dists.shape)
+        for i in range(99):
+            self.assertAlmostEqual(
+                distance.haversine(self.lon[i], self.lat[i], self.lon[i + 1],
+                                   self.lat[i + 1]),
+                dists[i],
+                places=6)
+
+    def test_distance_to_many(self):
+        """Tests distance_to_many matches distance_to."""
+        dists = distance.distance_to_many(self.lat, self.lon, self.alt, 38,
+                                          -76, 100)
+        self.assertEqual((100, ), dists.shape)
+        for i in range(100):
+            self.assertAlmostEqual(
+                distance.distance_to(self.lat[i], self.lon[i], self.alt[i], 38,
+                                     -76, 100),
+                dists[i],
+                places=3)
+
+    def test_distance_to_many_scalar(self):
+        """Tests distance_to_many with scalars."""
+        self.assertAlmostEqual(
+            distance.distance_to(38, -76, 0, 38.1, -76.1, 100),
+            distance.distance_to_many(38, -76, 0, 38.1, -76.1, 100),
+            places=3)
+        self.assertEqual(0, distance.distance_to_many(38, -76, 0, 38, -76, 0))
+
+    def test_distance_matrix(self):
+        """Tests distance_matrix matches distance_to for all pairs."""
+        dists = distance.distance_matrix(self.lat[:10], self.lon[:10],
+                                         self.alt[:10], self.lat[10:15],
+                                         self.lon[10:15], self.alt[10:15])
+        self.assertEqual((10, 5), dists.shape)
+        for i in range(10):
+            for j in range(5):
+                self.assertAlmostEqual(
+                    distance.distance_to(self.lat[i], self.lon[i], self.alt[i],
+                                         self.lat[10 + j], self.lon[10 + j],
+                                         self.alt[10 + j]),
+                    dists[i][j],
+                    places=3)
+
+    def test_distance_matrix_empty(self):
+        """Tests distance_matrix without positions."""
+        self.assertEqual((0, 2),
+                         distance.distance_matrix([], [], [], [38, 39],
+                                                  [-76, -77], [0, 0]).shape)
+        self.assertEqual((2, 0),
+                         distance.distance_matrix([38, 39], [-76, -77], [0, 0],
+                                                  [], [], []).shape)
+
+    def test_antipodal(self):
+        """Tests antipodal positions, where rounding may exceed the domain."""
+        self.assertAlmostEqual(
+            distance.haversine(0, 0, 180, 0),
+            distance.haversine_many(0, 0, 180, 0),
+            places=6)
+
+    def test_loadtest(self):
+        """Tests the per point cost of vectorized distances."""
+        rand = np.random.RandomState(0)
+        for num in [1, 1000, 1000000]:
+            lat = rand.uniform(38, 39, num)
+            lon = rand.uniform(-77, -76, num)
+            alt = rand.uniform(0, 1000, num)
+            start_t = time.clock()
+            dists = distance.distance_to_many(lat, lon, alt, 38.5, -76.5, 100)
+            end_t = time.clock()
+            self.assertEqual((num, ), dists.shape)
+            # A single point is too fast to time.
+            if num >= 1000:
+                point_cost = (end_t - start_t) / num
+                self.assertLessEqual(point_cost, 10e-6)
+
+            # Check a sample with scalar calls, as 1M takes several seconds.
+            for i in rand.randint(0, num, min(num, 100)):
+                self.assertAlmostEqual(
+                    distance.distance_to(lat[i], lon[i], alt[i], 38.5, -76.5,
+                                         100),
+                    dists[i],
+                    places=3)
+
+
 class TestDistanceToLine(TestCase):
     """Tests distance_to_line."""
 
     # Use UTM 18N for all test cases.
-    utm = distance.proj_utm(zone=18, north=True)
+    utm = distance.utm_transformer(zone=18, north=True)
 
     def evaluate_inputs(self, inputs):
         """Evaluates a list of test cases."""
@@ -109,3 +208,83 @@ class TestDistanceToLine(TestCase):
                 207,  # dist
             ),
         ])  # yapf: disable
+
+    def test_degenerate_line(self):
+        """Test a line segment with equal start and end."""
+        self.evaluate_inputs([
+            ((38, -76, 100), (38, -76, 100), (38, -76, 200), 100),
+        ])  # yapf: disable
+
+    def test_outside_projection(self):
+        """Test points which can't be projected are infinitely far."""
+        self.assertEqual(
+            float('inf'),
+            distance.distance_to_line((38, -76, 100), (38, -77, 100),
+                                      (0, 15, 100), self.utm))
+
+
+class TestDistanceToSegments(TestCase):
+    """Tests distance_to_segments."""
+
+    utm = distance.utm_transformer(zone=18, north=True)
+
+    def setUp(self):
+        rand = np.random.RandomState(0)
+        self.points = [(lat, lon, alt)
+                       for (lat, lon, alt) in zip(
+                           rand.uniform(38.14, 38.15, 50),
+                           rand.uniform(-76.43, -76.42, 50),
+                           rand.uniform(0, 500, 50))]  # yapf: disable
+        self.segments = list(zip(self.points[:10], self.points[10:20]))
+
+    def test_utm_cached(self):
+        """Tests projections are cached per zone."""
+        utm = distance.utm_transformer(18, True)
+        self.assertIs(utm, distance.utm_transformer(18, True))
+        self.assertIsNot(utm, distance.utm_transformer(18, False))
+        self.assertIs(distance.proj_utm(18, True), distance.proj_utm(18, True))
+
+    def test_matches_distance_to_line(self):
+        """Tests all pairs match distance_to_line."""
+        dists = distance.distance_to_segments(self.points, self.segments,
+                                              self.utm)
+        self.assertEqual((50, 10), dists.shape)
+        for (i, point) in enumerate(self.points):
+            for (j, (start, end)) in enumerate(self.segments):
+                self.assertAlmostEqual(
+                    distance.distance_to_line(start, end, point, self.utm),
+                    dists[i, j],
+                    places=6)
+
+    def test_empty(self):
+        """Tests without points or segments."""
+        self.assertEqual((0, 10),
+                         distance.distance_to_segments([], self.segments,
+                                                       self.utm).shape)
+        self.assertEqual((50, 0),
+                         distance.distance_to_segments(self.points, [],
+                                                       self.utm).shape)
+
+    def test_loadtest(self):
+        """Tests distances from an hour of flight to a boundary."""
+        # An hour of telemetry at 10 Hz and a 20 segment boundary.
+        rand = np.random.RandomState(0)
+        num_points = 60 * 60 * 10
+        points = list(
+            zip(
+                rand.uniform(38.14, 38.15, num_points),
+                rand.uniform(-76.43, -76.42, num_points),
+                rand.uniform(0, 500, num_points)))
+        boundary = points[:20]
+        segments = list(zip(boundary, boundary[1:] + boundary[:1]))
+
+        dists = distance.distance_to_segments(points, segments, self.utm)
+        self.assertEqual((num_points, len(segments)), dists.shape)
+
+        # Check a sample with per pair calls.
+        for i in rand.randint(0, num_points, 100):
+            for j, (start, end) in enumerate(segments):
+                self.assertAlmostEqual(
+                    distance.distance_to_line(start, end, points[i], self.utm),
+                    dists[i, j],
+                    places=3)
@@ -0,0 +1,158 @@
+"""Cache of team evaluations, keyed on a fingerprint of their inputs.
+
+Evaluating a team loads and scores all of its flight telemetry, so evaluating
+every team is slow, though between exports only a few teams have changed. The
+serialized MissionEvaluation of each team is kept in the shared Django cache
+with a fingerprint of the evaluation inputs: the team's takeoff and landing
+events, the count, latest id and latest timestamp of its telemetry in flight,
+its ODLCs, its judge feedback, and the mission geometry. A cached
+evaluation is only used if the fingerprint is unchanged, so only changed teams
+are evaluated again. Telemetry which is modified in place, rather than added
+or deleted, isn't detected until the cache times out.
+"""
+
+import hashlib
+import logging
+from auvsi_suas.models.mission_judge_feedback import MissionJudgeFeedback
+from auvsi_suas.models.odlc import Odlc
+from auvsi_suas.models.team_status_cache import count
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds after which cached evaluations are evaluated again. Bounds
+# the staleness for changes not covered by the fingerprint.
+CACHE_TIMEOUT = 24 * 60 * 60
+
+# Version of the evaluation, part of every fingerprint. Must be incremented
+# when evaluation or scoring changes, as cached evaluations outlive servers.
+EVALUATION_VERSION = 1
+
+# Cache key for the (fingerprint, evaluation) of a mission and user.
+EVALUATION_KEY = 'mission_evaluation/%d/%d'
+# Cache keys for the hit and miss counters.
+HITS_KEY = 'mission_evaluation/hits'
+MISSES_KEY = 'mission_evaluation/misses'
+
+# Fields of ODLCs which are evaluated, besides the location.
+ODLC_FIELDS = [f.attname for f in Odlc._meta.concrete_fields]
+# Fields of judge feedback which are evaluated.
+JUDGE_FEEDBACK_FIELDS = [
+    f.attname for f in MissionJudgeFeedback._meta.concrete_fields
+]
+
+
+def odlc_inputs(odlc):
+    """Gets the evaluated fields of an ODLC, including the location."""
+    location = (None, None)
+    if odlc.location:
+        location = (odlc.location.latitude, odlc.location.longitude)
+    return tuple(getattr(odlc, f) for f in ODLC_FIELDS) + location
+
+
+def mission_inputs(mission_data):
+    """Gets the inputs to evaluation common to all teams of the mission.
+
+    Args:
+        mission_data: The MissionData evaluated against.
+    Returns:
+        A list of the mission's geometry and real ODLCs.
+    """
+    mission_config = mission_data.mission_config
+    return [
+        EVALUATION_VERSION,
+        mission_config.pk,
+        (mission_data.home_pos.latitude, mission_data.home_pos.longitude),
+        [(w.pk, w.order, w.latitude, w.longitude, w.altitude_msl)
+         for w in mission_data.waypoints],
+        list(
+            mission_config.fly_zones.order_by('pk', 'boundary_pts__pk')
+            .values_list('pk', 'altitude_msl_min', 'altitude_msl_max',
+                         'boundary_pts__order', 'boundary_pts__latitude',
+                         'boundary_pts__longitude')),
+        [(o.pk, o.latitude, o.longitude, o.cylinder_radius, o.cylinder_height)
+         for o in mission_data.stationary_obstacles],
+        [odlc_inputs(o) for o in mission_data.real_odlcs],
+    ]
+
+
+def team_fingerprint(team, common_inputs, telemetry):
+    """Computes the fingerprint of the inputs to a team's evaluation.
+
+    Args:
+        team: The team's TeamData.
+        common_inputs: The mission_inputs() of the mission.
+        telemetry: The team's entry of evaluation_data.telemetry_aggregates(),
+            or None if the team has no telemetry in flight.
+    Returns:
+        The fingerprint as a hex string.
+    """
+    user = team.user
+    judge_feedback = None
+    if team.judge_feedback:
+        judge_feedback = tuple(
+            getattr(team.judge_feedback, f) for f in JUDGE_FEEDBACK_FIELDS)
+    inputs = [
+        common_inputs,
+        (user.pk, user.username, user.first_name, user.last_name),
+        [(e.pk, e.timestamp, e.uas_in_air) for e in team.events],
+        telemetry,
+        [odlc_inputs(o) for o in team.odlcs],
+        judge_feedback,
+    ]
+    return hashlib.sha1(repr(inputs).encode('utf-8')).hexdigest()
+
+
+def get_evaluations(mission_config, fingerprints):
+    """Gets the cached evaluations which match their fingerprint.
+
+    Args:
+        mission_config: The mission evaluated against.
+        fingerprints: A dict of user pk to the team_fingerprint().
+    Returns:
+        A dict of user pk to serialized MissionEvaluation, for the users with
+        a matching cached evaluation.
+    """
+    keys = {EVALUATION_KEY % (mission_config.pk, u): u for u in fingerprints}
+    cached = cache.get_many(list(keys.keys()))
+    evaluations = {}
+    for key, (fingerprint, evaluation) in cached.items():
+        user_pk = keys[key]
+        if fingerprint == fingerprints[user_pk]:
+            evaluations[user_pk] = evaluation
+    count(HITS_KEY, len(evaluations))
+    count(MISSES_KEY, len(fingerprints) - len(evaluations))
+    return evaluations
+
+
+def set_evaluations(mission_config, fingerprints, evaluations):
+    """Caches evaluations with their fingerprint.
+
+    Args:
+        mission_config: The mission evaluated against.
+        fingerprints: A dict of user pk to the team_fingerprint() computed
+            before evaluation.
+        evaluations: A dict of user pk to serialized MissionEvaluation.
+    """
+    if not evaluations:
+        return
+    cache.set_many(
+        {
+            EVALUATION_KEY % (mission_config.pk, u): (fingerprints[u],
+                                                      evaluation)
+            for u, evaluation in evaluations.items()
+        },
+        timeout=CACHE_TIMEOUT)
+
+
+def stats():
+    """Gets the cache hit and miss counters.
+
+    Returns:
+        A dict with the number of cache hits and misses.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+    }
@@ -0,0 +1,201 @@
+"""Bulk loading of the inputs to the evaluation of a mission's teams.
+
+Evaluating teams one at a time queries each team's activity, flights,
+telemetry per flight, ODLCs and judge feedback, and the mission's geometry
+again for every team. Instead, the inputs of all teams are loaded in a constant
+number of queries: the mission in a MissionData, and each team's part in a
+TeamData. Teams are then evaluated without further queries, so can also be
+evaluated by worker processes without database connections.
+"""
+
+import itertools
+import logging
+import numpy as np
+from auvsi_suas.models.gps_position import GpsPosition
+from auvsi_suas.models.mission_judge_feedback import MissionJudgeFeedback
+from auvsi_suas.models.odlc import Odlc
+from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.telemetry_track import TRACK_FIELDS
+from auvsi_suas.models.telemetry_track import TelemetryTrack
+from auvsi_suas.models.telemetry_track import to_us
+from auvsi_suas.models.time_period import TimePeriod
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+class MissionData(object):
+    """The inputs to evaluation common to all teams of a mission.
+
+    Attributes:
+        mission_config: The MissionConfig evaluated against.
+        home_pos: The GpsPosition of the mission's home.
+        waypoints: The mission waypoints, in order.
+        fly_zones: The FlyZones of the mission.
+        stationary_obstacles: The StationaryObstacles of the mission.
+        real_odlcs: The judge made Odlcs, with their locations.
+    """
+
+    def __init__(self, mission_config):
+        """Loads the mission's inputs.
+
+        Args:
+            mission_config: The MissionConfig to load.
+        """
+        self.mission_config = mission_config
+        self.home_pos = GpsPosition.objects.get(pk=mission_config.home_pos_id)
+        self.waypoints = list(
+            mission_config.mission_waypoints.order_by('order'))
+        self.fly_zones = list(mission_config.fly_zones.order_by('pk'))
+        self.stationary_obstacles = list(
+            mission_config.stationary_obstacles.order_by('pk'))
+        self.real_odlcs = list(
+            mission_config.odlcs.select_related('location').order_by('pk'))
+
+
+class TeamData(object):
+    """The inputs to evaluation of a team.
+
+    Attributes:
+        user: The team's User.
+        events: The team's TakeoffOrLandingEvents for the mission, in time
+            order.
+        flights: The TimePeriods of the team's flights.
+        odlcs: The team's submitted Odlcs, with their locations.
+        judge_feedback: The team's MissionJudgeFeedback, or None.
+        telemetry: A TelemetryTrack for each flight, or None if not loaded.
+    """
+
+    def __init__(self, user, events, odlcs, judge_feedback):
+        self.user = user
+        self.events = events
+        self.flights = TimePeriod.from_events(
+            events,
+            is_start_func=lambda x: x.uas_in_air,
+            is_end_func=lambda x: not x.uas_in_air)
+        self.odlcs = odlcs
+        self.judge_feedback = judge_feedback
+        self.telemetry = None
+
+
+def load_teams(mission_config, users=None):
+    """Loads the inputs of the active teams (non admin users) of a mission.
+
+    Teams are active if they have a takeoff or landing event, an ODLC or judge
+    feedback for the mission.
+
+    Args:
+        mission_config: The MissionConfig evaluated against.
+        users: Optional list of users to load. If None, loads all users.
+    Returns:
+        A list of TeamData, in order of username, without telemetry.
+    """
+    events = defaultdict(list)
+    for event in TakeoffOrLandingEvent.objects.filter(
+            mission=mission_config).order_by('user_id', 'timestamp', 'pk'):
+        events[event.user_id].append(event)
+    odlcs = defaultdict(list)
+    for odlc in Odlc.objects.filter(
+            mission=mission_config).select_related('location').order_by(
+                'user_id', 'pk'):
+        odlcs[odlc.user_id].append(odlc)
+    judge_feedback = {
+        f.user_id: f
+        for f in MissionJudgeFeedback.objects.filter(mission=mission_config)
+    }
+    active = set(events) | set(odlcs) | set(judge_feedback)
+
+    if users is None:
+        users = User.objects.filter(pk__in=active)
+    teams = []
+    for user in sorted(users, key=lambda u: u.username):
+        # Ignore admins.
+        if user.is_superuser:
+            logger.info('Filtering superuser: %s.' % user.username)
+            continue
+        # Filter inactive users.
+        if user.pk not in active:
+            logger.info('Filtering inactive user: %s.' % user.username)
+            continue
+        teams.append(
+            TeamData(user, events[user.pk], odlcs[user.pk],
+                     judge_feedback.get(user.pk)))
+    return teams
+
+
+def flight_telemetry(teams):
+    """Gets a query of the telemetry of the teams within their flights.
+
+    Args:
+        teams: A list of TeamData.
+    Returns:
+        A UasTelemetry query, or None if the teams have no flights.
+    """
+    in_flight = None
+    for team in teams:
+        for flight in team.flights:
+            # Same bounds as UasTelemetry.by_time_period().
+            cond = Q(user_id=team.user.pk)
+            if flight.start:
+                cond &= Q(timestamp__gte=flight.start)
+            if flight.end:
+                cond &= Q(timestamp__lt=flight.end)
+            in_flight = cond if in_flight is None else in_flight | cond
+    if in_flight is None:
+        return None
+    return UasTelemetry.objects.filter(in_flight)
+
+
+def telemetry_aggregates(teams):
+    """Aggregates the telemetry of the teams within their flights.
+
+    Args:
+        teams: A list of TeamData.
+    Returns:
+        A dict of user pk to the (count, max pk, max timestamp) of the team's
+        telemetry in flight, for teams with such telemetry.
+    """
+    query = flight_telemetry(teams)
+    if query is None:
+        return {}
+    aggregates = query.order_by().values('user_id').annotate(
+        Count('pk'), Max('pk'), Max('timestamp'))
+    return {
+        a['user_id']: (a['pk__count'], a['pk__max'], a['timestamp__max'])
+        for a in aggregates
+    }
+
+
+def load_telemetry(teams):
+    """Loads the telemetry of each flight of the teams.
+
+    Args:
+        teams: A list of TeamData, whose telemetry is set.
+    """
+    tracks = {}
+    query = flight_telemetry(teams)
+    if query is not None:
+        rows = query.order_by('user_id', 'timestamp').values_list(
+            'user_id', *TRACK_FIELDS).iterator()
+        for user_pk, user_rows in itertools.groupby(rows, lambda r: r[0]):
+            tracks[user_pk] = TelemetryTrack.from_rows(r[1:]
+                                                       for r in user_rows)
+
+    for team in teams:
+        track = tracks.get(team.user.pk, TelemetryTrack.empty())
+        team.telemetry = []
+        for flight in team.flights:
+            start = 0
+            if flight.start:
+                start = np.searchsorted(
+                    track.t_us, to_us(flight.start), side='left')
+            end = len(track)
+            if flight.end:
+                end = np.searchsorted(
+                    track.t_us, to_us(flight.end), side='left')
+            team.telemetry.append(track[start:end])
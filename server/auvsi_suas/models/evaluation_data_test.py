@@ -0,0 +1,145 @@
+"""Tests for the evaluation_data module."""
+
+import datetime
+from auvsi_suas.models import evaluation_data
+from auvsi_suas.models import test_utils
+from auvsi_suas.models.mission_judge_feedback import MissionJudgeFeedback
+from auvsi_suas.models.odlc import Odlc
+from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.telemetry_track import TelemetryTrack
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from auvsi_suas.proto import interop_api_pb2
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+
+class TestEvaluationData(TestCase):
+    """Tests loading the inputs to evaluation."""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        self.user = User.objects.create_user('user', 'email@example.com',
+                                             'testpass')
+        self.now = timezone.now()
+
+    def create_event(self, user, seconds, uas_in_air):
+        TakeoffOrLandingEvent(
+            user=user,
+            mission=self.mission,
+            uas_in_air=uas_in_air,
+            timestamp=self.now + datetime.timedelta(seconds=seconds)).save()
+
+    def create_telemetry(self, user, seconds):
+        UasTelemetry(
+            user=user,
+            timestamp=self.now + datetime.timedelta(seconds=seconds),
+            latitude=38 + seconds / 1000.0,
+            longitude=-76,
+            altitude_msl=100,
+            uas_heading=0).save()
+
+    def test_mission_data(self):
+        """Tests the mission's geometry and real ODLCs are loaded."""
+        mission_data = evaluation_data.MissionData(self.mission)
+        self.assertEqual(self.mission.home_pos, mission_data.home_pos)
+        self.assertEqual(
+            list(self.mission.mission_waypoints.order_by('order')),
+            mission_data.waypoints)
+        self.assertEqual(
+            set(self.mission.fly_zones.all()), set(mission_data.fly_zones))
+        self.assertEqual(
+            set(self.mission.stationary_obstacles.all()),
+            set(mission_data.stationary_obstacles))
+        self.assertEqual(
+            set(self.mission.odlcs.all()), set(mission_data.real_odlcs))
+
+    def test_load_teams(self):
+        """Tests only active teams are loaded, with their inputs."""
+        self.assertEqual([], evaluation_data.load_teams(self.mission))
+
+        other = User.objects.create_user('other', 'email@example.com',
+                                         'testpass')
+        self.create_event(self.user, 0, True)
+        self.create_event(self.user, 10, False)
+        self.create_event(self.superuser, 0, True)
+        odlc = Odlc(
+            mission=self.mission,
+            user=other,
+            odlc_type=interop_api_pb2.Odlc.STANDARD)
+        odlc.save()
+        feedback = MissionJudgeFeedback(
+            mission=self.mission,
+            user=other,
+            flight_time=datetime.timedelta(seconds=1),
+            post_process_time=datetime.timedelta(seconds=1),
+            used_timeout=False,
+            min_auto_flight_time=True,
+            safety_pilot_takeovers=0,
+            out_of_bounds=0,
+            unsafe_out_of_bounds=0,
+            things_fell_off_uas=False,
+            crashed=False,
+            air_drop_accuracy=0,
+            ugv_drove_to_location=False,
+            operational_excellence_percent=100)
+        feedback.save()
+        User.objects.create_user('inactive', 'email@example.com', 'testpass')
+
+        teams = evaluation_data.load_teams(self.mission)
+        self.assertEqual([other, self.user], [t.user for t in teams])
+        self.assertEqual([], teams[0].events)
+        self.assertEqual([odlc], teams[0].odlcs)
+        self.assertEqual(feedback, teams[0].judge_feedback)
+        self.assertEqual(2, len(teams[1].events))
+        self.assertEqual(
+            TakeoffOrLandingEvent.flights(self.mission, self.user),
+            teams[1].flights)
+        self.assertEqual([], teams[1].odlcs)
+        self.assertIsNone(teams[1].judge_feedback)
+
+        teams = evaluation_data.load_teams(self.mission,
+                                           [self.user, self.superuser])
+        self.assertEqual([self.user], [t.user for t in teams])
+
+    def test_load_telemetry(self):
+        """Tests telemetry matches the telemetry queried per flight."""
+        other = User.objects.create_user('other', 'email@example.com',
+                                         'testpass')
+        self.create_event(self.user, 0, True)
+        self.create_event(self.user, 10, False)
+        self.create_event(self.user, 20, True)
+        self.create_event(self.user, 30, False)
+        self.create_event(self.user, 40, True)
+        self.create_event(other, 5, False)
+        for user in [self.user, other]:
+            for seconds in range(-5, 50, 2):
+                self.create_telemetry(user, seconds)
+
+        teams = evaluation_data.load_teams(self.mission)
+        evaluation_data.load_telemetry(teams)
+        for team in teams:
+            flights = TakeoffOrLandingEvent.flights(self.mission, team.user)
+            expect = [
+                TelemetryTrack.from_queryset(logs)
+                for logs in UasTelemetry.by_time_period(team.user, flights)
+            ]
+            self.assertEqual(len(expect), len(team.telemetry))
+            for (e, t) in zip(expect, team.telemetry):
+                self.assertEqual(e.t_us.tolist(), t.t_us.tolist())
+                self.assertEqual(e.latitude.tolist(), t.latitude.tolist())
+
+        aggregates = evaluation_data.telemetry_aggregates(teams)
+        self.assertEqual(
+            sum(len(t)
+                for t in teams[1].telemetry), aggregates[self.user.pk][0])
+
+    def test_load_telemetry_no_flights(self):
+        """Tests loading telemetry of teams without flights."""
+        self.create_telemetry(self.user, 0)
+        teams = [evaluation_data.TeamData(self.user, [], [], None)]
+        evaluation_data.load_telemetry(teams)
+        self.assertEqual([], teams[0].telemetry)
+        self.assertEqual({}, evaluation_data.telemetry_aggregates(teams))
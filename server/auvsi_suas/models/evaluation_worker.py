@@ -0,0 +1,22 @@
+"""Setup of the worker processes which evaluate teams.
+
+Workers are started from a forkserver rather than forked from the server
+process, so they don't set up Django by inheriting it. Workers import this
+module before Django is set up, so it must not import models.
+"""
+
+import django
+from django.conf import settings
+
+
+def init_worker(databases, caches):
+    """Sets up Django in a worker process.
+
+    Args:
+        databases: The DATABASES of the server process, which may differ from
+            the settings module, like the database of tests.
+        caches: The CACHES of the server process.
+    """
+    settings.DATABASES = databases
+    settings.CACHES = caches
+    django.setup()
@@ -0,0 +1,126 @@
+"""Cache of simplified flight tracks.
+
+Rendering every telemetry of a flight, reported at up to 10 Hz, makes tracks
+too large to display. Tracks are instead decimated to a max rate and
+simplified within a tolerance. Telemetry of a flight doesn't change once the
+flight ends, so simplified tracks of ended flights are kept in the shared
+Django cache, keyed by the flight and the simplification parameters. Flights
+are only treated as ended once telemetry can no longer be uploaded for them.
+Tracks are cached as the packed bytes of their arrays, and tracks too large
+for a cache item aren't cached.
+"""
+
+import logging
+import numpy as np
+from auvsi_suas.models.team_status_cache import count
+from auvsi_suas.models.telemetry_track import MICROSECOND
+from auvsi_suas.models.telemetry_track import TelemetryTrack
+from auvsi_suas.models.telemetry_track import to_us
+from auvsi_suas.models.uas_telemetry import TELEMETRY_BATCH_MAX_AGE
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds after which cached tracks are simplified again. Bounds the
+# staleness if telemetry is changed after the flight.
+CACHE_TIMEOUT = 60 * 60
+
+# Max size in bytes of a cached track. Memcached items are at most 1 MB,
+# including the key and the item's overhead.
+CACHE_MAX_BYTES = 1000 * 1000
+
+# Type of a cached track row, packed without padding.
+TRACK_DTYPE = np.dtype([
+    ('t_us', '<i8'),
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('altitude_msl', '<f8'),
+    ('uas_heading', '<f8'),
+])
+
+# Cache key for a simplified track, by user, start, end, tolerance and
+# interval.
+TRACK_KEY = 'flight_track/%d/%s/%s/%r/%d'
+# Cache keys for the hit and miss counters.
+HITS_KEY = 'flight_track/hits'
+MISSES_KEY = 'flight_track/misses'
+
+
+def track_to_cache(track):
+    """Converts a TelemetryTrack to the cached bytes."""
+    rows = np.empty(len(track), dtype=TRACK_DTYPE)
+    for field in TRACK_DTYPE.names:
+        rows[field] = getattr(track, field)
+    return rows.tobytes()
+
+
+def track_from_cache(value):
+    """Converts the cached bytes to a TelemetryTrack."""
+    rows = np.frombuffer(value, dtype=TRACK_DTYPE)
+    return TelemetryTrack(*(np.ascontiguousarray(rows[field])
+                            for field in TRACK_DTYPE.names))
+
+
+def simplified_track(user_id, start, end, tolerance_ft, min_interval):
+    """Gets the simplified telemetry track of a flight.
+
+    Args:
+        user_id: The pk of the team's User.
+        start: Optional start time of the flight.
+        end: Optional end time of the flight.
+        tolerance_ft: The max distance in feet of telemetry from the
+            simplified track.
+        min_interval: The min time between telemetry of the track, as a
+            timedelta.
+    Returns:
+        The simplified TelemetryTrack, without bad or duplicate telemetry.
+    """
+    # Only ended flights are cached, as others may gain telemetry. Batches
+    # may still upload telemetry from shortly before the end.
+    ended = (end is not None and
+             end <= timezone.now() - TELEMETRY_BATCH_MAX_AGE)
+    start_us = to_us(start) if start else ''
+    end_us = to_us(end) if end else ''
+    key = TRACK_KEY % (user_id, start_us, end_us, tolerance_ft,
+                       min_interval // MICROSECOND)
+    if ended:
+        value = cache.get(key)
+        if value is not None:
+            count(HITS_KEY, 1)
+            return track_from_cache(value)
+        count(MISSES_KEY, 1)
+
+    query = UasTelemetry.objects.filter(user_id=user_id)
+    if start:
+        query = query.filter(timestamp__gte=start)
+    if end:
+        query = query.filter(timestamp__lt=end)
+    track = TelemetryTrack.from_queryset(query.order_by('timestamp'))
+    track = UasTelemetry.dedupe(UasTelemetry.filter_bad(track))
+    track = track.decimate(min_interval).simplify(tolerance_ft)
+
+    if ended:
+        value = track_to_cache(track)
+        if len(value) <= CACHE_MAX_BYTES:
+            cache.set(key, value, timeout=CACHE_TIMEOUT)
+        else:
+            logger.warning(
+                'Track of %d telemetry is %d bytes, too large to cache. '
+                'Increase the tolerance or interval to simplify it more.',
+                len(track), len(value))
+    return track
+
+
+def stats():
+    """Gets the cache hit and miss counters.
+
+    Returns:
+        A dict with the number of cache hits and misses.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+    }
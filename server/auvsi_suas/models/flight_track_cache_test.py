@@ -0,0 +1,117 @@
+"""Tests for the flight_track_cache module."""
+
+import datetime
+from auvsi_suas.models import flight_track_cache
+from auvsi_suas.models.uas_telemetry import TELEMETRY_BATCH_MAX_AGE
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+
+def track_rows(track):
+    """Gets the rows of a track, to compare tracks."""
+    return list(
+        zip(track.t_us, track.latitude, track.longitude, track.altitude_msl,
+            track.uas_heading))
+
+
+class TestFlightTrackCache(TestCase):
+    """Tests the flight track cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'email@example.com',
+                                             'testpass')
+        self.start = timezone.now() - datetime.timedelta(minutes=10)
+        self.end = self.start + datetime.timedelta(seconds=10)
+        # A straight line at 10 Hz, with a turn halfway.
+        logs = []
+        for i in range(100):
+            offset = min(i, 50) * 1e-4
+            turn = max(i - 50, 0) * 1e-4
+            logs.append(
+                UasTelemetry(
+                    user=self.user,
+                    timestamp=self.start + datetime.timedelta(seconds=i / 10),
+                    latitude=38 + offset,
+                    longitude=-76 + turn,
+                    altitude_msl=100,
+                    uas_heading=0))
+        UasTelemetry.objects.bulk_create(logs)
+
+    def test_simplified_track(self):
+        """Tests the track is decimated and simplified."""
+        track = flight_track_cache.simplified_track(self.user.pk, self.start,
+                                                    self.end, 10,
+                                                    datetime.timedelta(0))
+        self.assertEqual(3, len(track))
+        self.assertEqual(38 + 50 * 1e-4, track[1].latitude)
+
+        track = flight_track_cache.simplified_track(
+            self.user.pk,
+            self.start,
+            self.end,
+            10,
+            datetime.timedelta(seconds=1))
+        self.assertEqual([0, 5000000, 9900000],
+                         list(track.t_us - track.t_us[0]))
+
+    def test_ended_cached(self):
+        """Tests tracks of ended flights are cached."""
+        args = (self.user.pk, self.start, self.end, 10, datetime.timedelta(0))
+        track = flight_track_cache.simplified_track(*args)
+        with self.assertNumQueries(0):
+            cached = flight_track_cache.simplified_track(*args)
+        self.assertEqual(track_rows(track), track_rows(cached))
+        self.assertEqual({'hits': 1, 'misses': 1}, flight_track_cache.stats())
+
+        # Other parameters aren't cached.
+        with self.assertNumQueries(1):
+            flight_track_cache.simplified_track(self.user.pk, self.start,
+                                                self.end, 20,
+                                                datetime.timedelta(0))
+
+    def test_cached_packed(self):
+        """Tests tracks are cached as packed rows."""
+        track = flight_track_cache.simplified_track(self.user.pk, self.start,
+                                                    self.end, 10,
+                                                    datetime.timedelta(0))
+        value = flight_track_cache.track_to_cache(track)
+        self.assertEqual(3 * 40, len(value))
+        self.assertEqual(
+            track_rows(track),
+            track_rows(flight_track_cache.track_from_cache(value)))
+
+    def test_large_not_cached(self):
+        """Tests tracks too large for a cache item aren't cached."""
+        self.addCleanup(setattr, flight_track_cache, 'CACHE_MAX_BYTES',
+                        flight_track_cache.CACHE_MAX_BYTES)
+        flight_track_cache.CACHE_MAX_BYTES = 2 * 40
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                track = flight_track_cache.simplified_track(
+                    self.user.pk, self.start, self.end, 10,
+                    datetime.timedelta(0))
+            self.assertEqual(3, len(track))
+        self.assertEqual({'hits': 0, 'misses': 2}, flight_track_cache.stats())
+
+    def test_in_flight_not_cached(self):
+        """Tests tracks of flights in progress aren't cached."""
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                track = flight_track_cache.simplified_track(
+                    self.user.pk, self.start, None, 10, datetime.timedelta(0))
+            self.assertEqual(3, len(track))
+        self.assertEqual({'hits': 0, 'misses': 0}, flight_track_cache.stats())
+
+    def test_recently_ended_not_cached(self):
+        """Tests tracks which may still gain batch telemetry aren't cached."""
+        end = timezone.now() - TELEMETRY_BATCH_MAX_AGE / 2
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                track = flight_track_cache.simplified_track(
+                    self.user.pk, self.start, end, 10, datetime.timedelta(0))
+            self.assertEqual(3, len(track))
+        self.assertEqual({'hits': 0, 'misses': 0}, flight_track_cache.stats())
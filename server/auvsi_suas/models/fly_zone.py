@@ -1,23 +1,104 @@
-"""Fly zone model."""
+"""Fly zone model.
+
+Testing positions against a zone uses a compiled FlyZoneGeometry. The
+boundary is kept in the shared Django cache, so it isn't queried for every
+test, and the compiled geometry is kept by each process while the cached
+boundary is unchanged.
+Saving the zone, changing its boundary points, or saving or deleting a
+boundary point invalidates the cached geometry via model signals, once the
+change is committed.
+"""
 
 import datetime
 import logging
 import numpy as np
 from auvsi_suas.models import aerial_position
+from auvsi_suas.models.telemetry_track import TelemetryTrack
 from auvsi_suas.models.waypoint import Waypoint
 from django.contrib import admin
 from django.core import exceptions
 from django.core import validators
+from django.core.cache import cache
 from django.db import models
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from matplotlib import path as mplpath
 
 logger = logging.getLogger(__name__)
 
+# Time in seconds after which cached geometry is reloaded. Bounds the
+# staleness if the database is changed without sending signals.
+GEOMETRY_CACHE_TIMEOUT = 5 * 60
+# Cache key for the geometry of a zone.
+GEOMETRY_KEY = 'fly_zone/geometry/%d'
+
 # The time window (in seconds) in which a plane cannot be counted as going out
 # of bounds multiple times. This prevents noisy input data from recording
 # significant more violations than a human observer.
 OUT_OF_BOUNDS_DEBOUNCE_SEC = 10.0
 
+# Compiled FlyZoneGeometry of zones in this process, by zone pk.
+_compiled_geometry = {}
+
+
+class FlyZoneGeometry(object):
+    """Compiled geometry of a FlyZone: its polygon and altitude band.
+
+    Tests arrays of positions at once, without database queries.
+    """
+
+    def __init__(self, vertices, altitude_msl_min, altitude_msl_max):
+        """Compiles the geometry.
+
+        Args:
+            vertices: Sequence of ordered (lat, lon) boundary points.
+            altitude_msl_min: The minimum altitude (MSL) in feet.
+            altitude_msl_max: The maximum altitude (MSL) in feet.
+        """
+        self.vertices = [tuple(v) for v in vertices]
+        self.altitude_msl_min = altitude_msl_min
+        self.altitude_msl_max = altitude_msl_max
+
+        # At least 3 points are needed to define a polygon.
+        self.path = None
+        if len(self.vertices) >= 3:
+            path_pts = np.array(self.vertices + self.vertices[:1])
+            self.path = mplpath.Path(path_pts, closed=True)
+            (self.lat_min, self.lon_min) = path_pts.min(axis=0)
+            (self.lat_max, self.lon_max) = path_pts.max(axis=0)
+
+    def contains(self, latitude, longitude, altitude_msl):
+        """Whether positions are inside the zone.
+
+        Args:
+            latitude: Array of latitudes.
+            longitude: Array of longitudes.
+            altitude_msl: Array of altitudes (MSL) in feet.
+        Returns:
+            A boolean array of whether each position is inside the zone.
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        altitude_msl = np.asarray(altitude_msl, dtype=np.float64)
+        if self.path is None:
+            return np.zeros(len(latitude), dtype=bool)
+
+        # Only test positions within the altitude band and the bounding box
+        # against the polygon.
+        results = ((altitude_msl >= self.altitude_msl_min) &
+                   (altitude_msl <= self.altitude_msl_max) &
+                   (latitude >= self.lat_min) & (latitude <= self.lat_max) &
+                   (longitude >= self.lon_min) & (longitude <= self.lon_max))
+        candidates = np.nonzero(results)[0]
+        if len(candidates):
+            results[candidates] = self.path.contains_points(
+                np.column_stack((latitude[candidates], longitude[candidates])))
+        return results
+
 
 class FlyZone(models.Model):
     """An approved area for UAS flight. UAS shall be in at least one zone."""
@@ -50,52 +131,47 @@ class FlyZone(models.Model):
         """
         return self.contains_many_pos([aerial_pos])[0]
 
+    def geometry(self):
+        """Gets the compiled FlyZoneGeometry of the zone.
+
+        The boundary is cached, and only loaded from the database if it
+        changed. The geometry is only compiled again if the cached boundary
+        or the altitude band changed.
+        """
+        key = GEOMETRY_KEY % self.pk
+        vertices = cache.get(key)
+        if vertices is None:
+            ordered_pts = self.boundary_pts.order_by('order')
+            vertices = list(ordered_pts.values_list('latitude', 'longitude'))
+            cache.set(key, vertices, timeout=GEOMETRY_CACHE_TIMEOUT)
+
+        compiled = _compiled_geometry.get(self.pk)
+        if (compiled is None or compiled.vertices != vertices or
+                compiled.altitude_msl_min != self.altitude_msl_min or
+                compiled.altitude_msl_max != self.altitude_msl_max):
+            compiled = FlyZoneGeometry(vertices, self.altitude_msl_min,
+                                       self.altitude_msl_max)
+            _compiled_geometry[self.pk] = compiled
+        return compiled
+
     def contains_many_pos(self, aerial_pos_list):
         """Evaluates a list of positions more efficiently than inidividually.
 
         Args:
-            aerial_pos_list: A list of AerialPositions to test.
+            aerial_pos_list: A list of AerialPositions, or a TelemetryTrack,
+                to test.
         Returns:
-            A list storing whether each position is inside the boundary.
+            A list storing whether each position is inside the boundary. A
+            boolean array if given a TelemetryTrack.
         """
-        # Get boundary points
-        ordered_pts = self.boundary_pts.order_by('order')
-        path_pts = [[wpt.latitude, wpt.longitude] for wpt in ordered_pts]
-        # First check enough points to define a polygon
-        if len(path_pts) < 3:
-            return [False] * len(aerial_pos_list)
-
-        # Create path to use for testing polygon inclusion
-        path_pts.append(path_pts[0])
-        path = mplpath.Path(np.array(path_pts))
-
-        # Test each aerial position for altitude
-        results = []
-        for aerial_pos in aerial_pos_list:
-            # Check altitude bounds
-            alt = aerial_pos.altitude_msl
-            altitude_check = (alt <= self.altitude_msl_max and
-                              alt >= self.altitude_msl_min)
-            results.append(altitude_check)
-
-        # Create a list of positions to test whether inside polygon
-        polygon_test_point_ids = [
-            cur_id for cur_id in range(len(aerial_pos_list)) if results[cur_id]
-        ]
-        if len(polygon_test_point_ids) == 0:
-            return results
-        polygon_test_points = [[
-            aerial_pos_list[cur_id].latitude, aerial_pos_list[cur_id].longitude
-        ] for cur_id in polygon_test_point_ids]
-
-        # Test each point for inside polygon
-        polygon_test_results = path.contains_points(
-            np.array(polygon_test_points))
-        for test_id in range(len(polygon_test_point_ids)):
-            cur_id = polygon_test_point_ids[test_id]
-            results[cur_id] = polygon_test_results[test_id]
-
-        return results
+        if isinstance(aerial_pos_list, TelemetryTrack):
+            track = aerial_pos_list
+            return self.geometry().contains(track.latitude, track.longitude,
+                                            track.altitude_msl)
+        return self.geometry().contains(
+            [pos.latitude for pos in aerial_pos_list], [
+                pos.longitude for pos in aerial_pos_list
+            ], [pos.altitude_msl for pos in aerial_pos_list]).tolist()
 
     @classmethod
     def out_of_bounds(cls, fly_zones, uas_telemetry_logs):
@@ -103,64 +179,109 @@ class FlyZone(models.Model):
 
         Args:
             fly_zones: The list of FlyZone that the UAS must be in.
-            uas_telemetry_logs: A list of UasTelemetry logs sorted by timestamp
-                which demonstrate the flight of the UAS.
+            uas_telemetry_logs: A list of UasTelemetry logs sorted by timestamp,
+                or a TelemetryTrack, which demonstrate the flight of the UAS.
         Returns:
             num_violations: The number of times fly zone boundaries violated.
             total_time: The timedelta for time spent out of bounds
                 as indicated by the telemetry logs.
         """
-        # Get the aerial positions for the logs
-        aerial_pos_list = uas_telemetry_logs
-        log_ids_to_process = range(len(aerial_pos_list))
-
-        # Evaluate zones against the logs, eliminating satisfied ones, until
-        # only the out of boundary ids remain
+        # Evaluate zones against the positions not yet found in a zone.
+        track = uas_telemetry_logs
+        if not isinstance(track, TelemetryTrack):
+            track = TelemetryTrack.from_logs(uas_telemetry_logs)
+        in_bounds = np.zeros(len(track), dtype=bool)
         for zone in fly_zones:
-            # Stop processing if no ids
-            if len(log_ids_to_process) == 0:
+            remaining = np.nonzero(~in_bounds)[0]
+            # Stop processing if no positions remain.
+            if len(remaining) == 0:
                 break
-            # Evaluate the positions still not satisfied
-            cur_positions = [
-                aerial_pos_list[cur_id] for cur_id in log_ids_to_process
-            ]
-            satisfied_positions = zone.contains_many_pos(cur_positions)
-            # Retain those which were not satisfied in this pass
-            log_ids_to_process = [
-                log_ids_to_process[cur_id]
-                for cur_id in range(len(log_ids_to_process))
-                if not satisfied_positions[cur_id]
-            ]
-
-        out_of_bounds_time = datetime.timedelta()
+            in_bounds[remaining] = zone.geometry().contains(
+                track.latitude[remaining], track.longitude[remaining],
+                track.altitude_msl[remaining])
+
+        # Walk the violations using the runs of in and out of bounds. For
+        # each position, the next position (inclusive) in and out of bounds.
+        num_pos = len(track)
+        ids = np.arange(num_pos + 1)
+        in_bounds = np.append(in_bounds, [True])
+        next_in = np.minimum.accumulate(
+            np.where(in_bounds, ids, num_pos)[::-1])[::-1]
+        next_out = np.minimum.accumulate(
+            np.where(~in_bounds, ids, num_pos)[::-1])[::-1]
+        t_us = track.t_us
+        debounce_us = int(OUT_OF_BOUNDS_DEBOUNCE_SEC * 1e6)
+
         violations = 0
-        prev_event_id = -1
-        currently_in_bounds = True
-        out_of_bounds_ids = set(log_ids_to_process)
-        for i in range(len(aerial_pos_list)):
-            i_in_bounds = i not in out_of_bounds_ids
-            if currently_in_bounds and not i_in_bounds:
-                # As soon as there is one telemetry log out of bounds, we count
-                # it as a violation.
-                currently_in_bounds = False
-                violations += 1
-                prev_event_id = i
-            elif not currently_in_bounds and i_in_bounds:
-                # A switch of state needs to happen. But first make sure
-                # enough time has passed.
-                time_diff = (uas_telemetry_logs[i].timestamp -
-                             uas_telemetry_logs[prev_event_id].timestamp)
-                currently_in_bounds = (time_diff.total_seconds() >=
-                                       OUT_OF_BOUNDS_DEBOUNCE_SEC)
-
-            if not currently_in_bounds and i > 0:
-                time_diff = (uas_telemetry_logs[i].timestamp -
-                             uas_telemetry_logs[i - 1].timestamp)
-                out_of_bounds_time += time_diff
+        out_of_bounds_us = 0
+        i = 0
+        while True:
+            # As soon as there is one telemetry log out of bounds, we count it
+            # as a violation.
+            start = next_out[i]
+            if start >= num_pos:
+                break
+            violations += 1
+            # Back in bounds at the first position in bounds once enough time
+            # has passed since the violation.
+            debounced = np.searchsorted(
+                t_us, t_us[start] + debounce_us, side='left')
+            i = next_in[max(start + 1, debounced)]
+            # Time out of bounds is from the position before the violation
+            # until the last position before back in bounds.
+            out_of_bounds_us += int(t_us[i - 1] - t_us[max(start - 1, 0)])
+        out_of_bounds_time = datetime.timedelta(microseconds=out_of_bounds_us)
 
         return (violations, out_of_bounds_time)
 
 
+def clear_geometry(zone_ids):
+    """Clears the cached geometry of the zones."""
+    for zone_id in zone_ids:
+        _compiled_geometry.pop(zone_id, None)
+    cache.delete_many([GEOMETRY_KEY % zone_id for zone_id in zone_ids])
+
+
+def clear_geometry_on_commit(zone_ids):
+    """Clears the cached geometry of the zones once the transaction commits.
+
+    Other connections only see a change once committed, and would otherwise
+    cache the boundary from before the change.
+    """
+    # Found now, as the change may remove the rows they're found from.
+    zone_ids = list(zone_ids)
+    transaction.on_commit(lambda: clear_geometry(zone_ids))
+
+
+@receiver(post_save, sender=FlyZone)
+@receiver(post_delete, sender=FlyZone)
+def on_fly_zone_change(sender, instance, created=False, **kwargs):
+    # Database ids may be reused, so new zones can't have cached geometry.
+    if created:
+        clear_geometry([instance.pk])
+    clear_geometry_on_commit([instance.pk])
+
+
+@receiver(m2m_changed, sender=FlyZone.boundary_pts.through)
+def on_boundary_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_') and action != 'pre_clear':
+        return
+    if not reverse:
+        clear_geometry_on_commit([instance.pk])
+    elif pk_set:
+        clear_geometry_on_commit(pk_set)
+    elif action == 'pre_clear':
+        # Clearing zones from a boundary point doesn't give the zones.
+        clear_geometry_on_commit(
+            instance.flyzone_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Waypoint)
+@receiver(pre_delete, sender=Waypoint)
+def on_waypoint_change(sender, instance, **kwargs):
+    clear_geometry_on_commit(instance.flyzone_set.values_list('pk', flat=True))
+
+
 @admin.register(FlyZone)
 class FlyZoneModelAdmin(admin.ModelAdmin):
     filter_horizontal = ("boundary_pts", )
@@ -1,12 +1,22 @@
 """Tests for the fly_zone module."""
 
 import datetime
+import numpy as np
+import time
 from auvsi_suas.models.aerial_position import AerialPosition
 from auvsi_suas.models.fly_zone import FlyZone
+from auvsi_suas.models.fly_zone import GEOMETRY_KEY
+from auvsi_suas.models.fly_zone import OUT_OF_BOUNDS_DEBOUNCE_SEC
+from auvsi_suas.models.telemetry_track import TelemetryTrack
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.models.waypoint import Waypoint
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db import transaction
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 TESTDATA_FLYZONE_CONTAINSPOS = [
@@ -166,6 +176,27 @@ TESTDATA_FLYZONE_EVALBOUNDS = (
 )  # yapf: disable
 
 
+def out_of_bounds_loop(in_bounds, timestamps):
+    """Reference per position implementation of FlyZone.out_of_bounds."""
+    out_of_bounds_time = datetime.timedelta()
+    violations = 0
+    prev_event_id = -1
+    currently_in_bounds = True
+    for i in range(len(timestamps)):
+        i_in_bounds = in_bounds[i]
+        if currently_in_bounds and not i_in_bounds:
+            currently_in_bounds = False
+            violations += 1
+            prev_event_id = i
+        elif not currently_in_bounds and i_in_bounds:
+            time_diff = timestamps[i] - timestamps[prev_event_id]
+            currently_in_bounds = (time_diff.total_seconds() >=
+                                   OUT_OF_BOUNDS_DEBOUNCE_SEC)
+        if not currently_in_bounds and i > 0:
+            out_of_bounds_time += timestamps[i] - timestamps[i - 1]
+    return (violations, out_of_bounds_time)
+
+
 class TestFlyZone(TestCase):
     """Tests the FlyZone class."""
 
@@ -282,3 +313,188 @@ class TestFlyZone(TestCase):
             self.assertEqual(num_violations, exp_violations)
             self.assertAlmostEqual(out_of_bounds_time.total_seconds(),
                                    exp_out_of_bounds_time)
+
+
+class TestFlyZoneGeometry(TransactionTestCase):
+    """Tests the cached geometry of a FlyZone.
+
+    Cached geometry is cleared once changes are committed, so tests aren't run
+    in a transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.zone = FlyZone(altitude_msl_min=0, altitude_msl_max=100)
+        self.zone.save()
+        self.wpts = []
+        for (order, (lat, lon)) in enumerate([(0, 0), (10, 0), (10, 10),
+                                              (0, 10)]):
+            wpt = Waypoint(
+                order=order, latitude=lat, longitude=lon, altitude_msl=0)
+            wpt.save()
+            self.zone.boundary_pts.add(wpt)
+            self.wpts.append(wpt)
+        self.pos = AerialPosition(latitude=5, longitude=15, altitude_msl=50)
+
+    def test_contains_track(self):
+        """Tests testing a track gives an array."""
+        track = TelemetryTrack([0, 1, 2], [5, 5, 5], [5, 15, 5], [50, 50, 150],
+                               [0, 0, 0])
+        np.testing.assert_array_equal([True, False, False],
+                                      self.zone.contains_many_pos(track))
+
+    def test_cached(self):
+        """Tests the boundary is only queried once."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(self.zone.contains_pos(self.pos))
+            self.assertFalse(self.zone.contains_pos(self.pos))
+        self.assertEqual(1, len(queries))
+
+    def test_compiled(self):
+        """Tests the geometry is only compiled again if changed."""
+        geometry = self.zone.geometry()
+        self.assertIs(geometry, self.zone.geometry())
+        self.assertIs(
+            geometry, FlyZone.objects.get(pk=self.zone.pk).geometry())
+
+        self.wpts[2].longitude = 20
+        self.wpts[2].save()
+        changed = self.zone.geometry()
+        self.assertIsNot(geometry, changed)
+        self.assertEqual((10, 20), changed.vertices[2])
+
+        # Other processes compile again once the cached boundary changes.
+        cache.set(GEOMETRY_KEY % self.zone.pk, geometry.vertices)
+        self.assertEqual(geometry.vertices, self.zone.geometry().vertices)
+
+    def test_cleared_on_commit(self):
+        """Tests the geometry is cleared once the change is committed."""
+        self.assertFalse(self.zone.contains_pos(self.pos))
+        with transaction.atomic():
+            self.wpts[2].longitude = 20
+            self.wpts[2].save()
+            self.wpts[3].longitude = 20
+            self.wpts[3].save()
+            self.assertEqual((10, 10), self.zone.geometry().vertices[2])
+        self.assertTrue(self.zone.contains_pos(self.pos))
+
+    def test_boundary_change(self):
+        """Tests changing the boundary invalidates the geometry."""
+        self.assertFalse(self.zone.contains_pos(self.pos))
+        self.wpts[2].longitude = 20
+        self.wpts[2].save()
+        self.wpts[3].longitude = 20
+        self.wpts[3].save()
+        self.assertTrue(self.zone.contains_pos(self.pos))
+
+        self.zone.boundary_pts.remove(self.wpts[3])
+        self.assertFalse(self.zone.contains_pos(self.pos))
+
+        wpt = Waypoint(order=3, latitude=0, longitude=20, altitude_msl=0)
+        wpt.save()
+        wpt.flyzone_set.add(self.zone)
+        self.assertTrue(self.zone.contains_pos(self.pos))
+
+        wpt.flyzone_set.clear()
+        self.assertFalse(self.zone.contains_pos(self.pos))
+
+        self.wpts[0].delete()
+        self.assertFalse(self.zone.contains_pos(self.pos))
+        self.assertEqual(2, len(self.zone.geometry().vertices))
+
+    def test_altitude_change(self):
+        """Tests changing the altitude band."""
+        pos = AerialPosition(latitude=5, longitude=5, altitude_msl=150)
+        self.assertFalse(self.zone.contains_pos(pos))
+        self.zone.altitude_msl_max = 200
+        self.zone.save()
+        self.assertTrue(self.zone.contains_pos(pos))
+
+    def test_loadtest(self):
+        """Tests testing an hour of flight against a zone."""
+        num_pos = 60 * 60 * 10
+        rand = np.random.RandomState(0)
+        track = TelemetryTrack(
+            np.arange(num_pos),
+            rand.uniform(-5, 15, num_pos),
+            rand.uniform(-5, 15, num_pos),
+            rand.uniform(-50, 150, num_pos), np.zeros(num_pos))
+        self.zone.geometry()
+
+        with CaptureQueriesContext(connection) as queries:
+            contains = self.zone.contains_many_pos(track)
+        self.assertEqual(0, len(queries))
+        self.assertEqual((num_pos, ), contains.shape)
+
+        # Check a sample against testing each position.
+        for i in rand.randint(0, num_pos, 100):
+            pos = AerialPosition(
+                latitude=track.latitude[i],
+                longitude=track.longitude[i],
+                altitude_msl=track.altitude_msl[i])
+            self.assertEqual(self.zone.contains_pos(pos), contains[i])
+
+
+class TestFlyZoneOutOfBounds(TestCase):
+    """Tests out_of_bounds against the per position implementation."""
+
+    def setUp(self):
+        self.zones = []
+        for (lon_min, alt_max) in [(0, 100), (8, 200)]:
+            zone = FlyZone(altitude_msl_min=0, altitude_msl_max=alt_max)
+            zone.save()
+            for (order, (lat, lon)) in enumerate([(0, lon_min), (10, lon_min),
+                                                  (10, lon_min + 10),
+                                                  (0, lon_min + 10)]):
+                wpt = Waypoint(
+                    order=order, latitude=lat, longitude=lon, altitude_msl=0)
+                wpt.save()
+                zone.boundary_pts.add(wpt)
+            self.zones.append(zone)
+
+    def random_track(self, num, rand, step_sec):
+        """Creates a random flight wandering in and out of the zones."""
+        t_us = np.cumsum(rand.choice([0, 1, 2, 5], num) * step_sec * 1e6)
+        return TelemetryTrack(
+            t_us.astype(np.int64),
+            rand.uniform(-1, 11, num),
+            rand.uniform(-1, 19, num),
+            rand.uniform(-10, 210, num), np.zeros(num))
+
+    def expected(self, track):
+        in_bounds = np.logical_or(
+            *[zone.contains_many_pos(track) for zone in self.zones])
+        return out_of_bounds_loop(in_bounds, track.timestamps())
+
+    def test_matches_loop(self):
+        """Tests random flights match the per position implementation."""
+        rand = np.random.RandomState(0)
+        for num in [0, 1, 2, 10, 100, 1000]:
+            for step_sec in [0.1, 1, 3]:
+                track = self.random_track(num, rand, step_sec)
+                self.assertEqual(
+                    self.expected(track),
+                    FlyZone.out_of_bounds(self.zones, track))
+
+    def test_loadtest(self):
+        """Tests out_of_bounds over an hour of flight at 20 Hz."""
+        num_pos = 60 * 60 * 20
+        rand = np.random.RandomState(0)
+        # Wander out of bounds for a few seconds every few minutes.
+        t_us = np.arange(num_pos, dtype=np.int64) * 50000
+        out = (np.arange(num_pos) // 20) % 180 < 5
+        track = TelemetryTrack(
+            t_us,
+            np.where(out, 20, 5) + rand.uniform(-1, 1, num_pos),
+            rand.uniform(1, 17, num_pos),
+            rand.uniform(10, 90, num_pos), np.zeros(num_pos))
+        for zone in self.zones:
+            zone.geometry()
+
+        start_t = time.clock()
+        got = FlyZone.out_of_bounds(self.zones, track)
+        end_t = time.clock()
+        pos_rate = num_pos / (end_t - start_t)
+        self.assertGreaterEqual(pos_rate, 100000)
+        self.assertEqual(self.expected(track), got)
+        self.assertEqual(20, got[0])
@@ -0,0 +1,187 @@
+"""Cache of serialized missions.
+
+Every team polls its mission, which is serialized from the mission's fly
+zones, boundary points, waypoints, search grid, air drop boundary and
+obstacles. Missions rarely change, so the serialized mission is kept in the
+shared Django cache. Saving or deleting a mission or any of its parts, or
+changing the parts of a mission, invalidates the cached missions via model
+signals, once the change is committed. The rendered KML of all missions is
+also cached, and invalidated with any mission, or when the judges' ODLCs
+change.
+"""
+
+import logging
+from auvsi_suas.models.fly_zone import FlyZone
+from auvsi_suas.models.gps_position import GpsPosition
+from auvsi_suas.models.mission_config import MissionConfig
+from auvsi_suas.models.odlc import Odlc
+from auvsi_suas.models.stationary_obstacle import StationaryObstacle
+from auvsi_suas.models.team_status_cache import count
+from auvsi_suas.models.waypoint import Waypoint
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds after which cached missions are serialized again. Bounds
+# the staleness if the database is changed without sending signals.
+CACHE_TIMEOUT = 5 * 60
+
+# Cache key for a serialized mission.
+MISSION_KEY = 'mission/%d'
+# Cache key for the rendered KML of all missions.
+MISSIONS_KML_KEY = 'mission/kml'
+# Cache keys for the hit and miss counters.
+HITS_KEY = 'mission/hits'
+MISSES_KEY = 'mission/misses'
+
+# Positions of a mission which are serialized.
+POSITION_FIELDS = [
+    'lost_comms_pos', 'off_axis_odlc_pos', 'emergent_last_known_pos',
+    'air_drop_pos', 'ugv_drive_pos'
+]
+# Positions of a mission which are rendered to KML, besides the serialized.
+KML_POSITION_FIELDS = ['home_pos', 'odlcs__location']
+
+
+def get_missions(pks):
+    """Gets the cached serialized missions.
+
+    Args:
+        pks: The pks of the missions.
+    Returns:
+        A dict of mission pk to serialized mission, for cached missions.
+    """
+    keys = {MISSION_KEY % pk: pk for pk in pks}
+    missions = {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+    count(HITS_KEY, len(missions))
+    count(MISSES_KEY, len(keys) - len(missions))
+    return missions
+
+
+def set_missions(missions):
+    """Caches serialized missions.
+
+    Args:
+        missions: A dict of mission pk to serialized mission.
+    """
+    cache.set_many(
+        {MISSION_KEY % pk: v
+         for pk, v in missions.items()},
+        timeout=CACHE_TIMEOUT)
+
+
+def clear_missions(pks=None):
+    """Clears the cached missions.
+
+    Args:
+        pks: The pks of the missions to clear, or None for all missions.
+    """
+    if pks is None:
+        pks = MissionConfig.objects.values_list('pk', flat=True)
+    cache.delete_many([MISSION_KEY % pk for pk in pks] + [MISSIONS_KML_KEY])
+
+
+def clear_missions_on_commit(pks=None):
+    """Clears the cached missions once the current transaction commits.
+
+    Other connections only see a change once committed, and would otherwise
+    cache the mission from before the change.
+
+    Args:
+        pks: The pks of the missions to clear, or None for all missions.
+    """
+    if pks is not None:
+        # Found now, as the change may remove the rows they're found from.
+        pks = list(pks)
+    transaction.on_commit(lambda: clear_missions(pks))
+
+
+def stats():
+    """Gets the cache hit and miss counters.
+
+    Returns:
+        A dict with the number of cache hits and misses.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+    }
+
+
+@receiver(post_save, sender=MissionConfig)
+@receiver(post_delete, sender=MissionConfig)
+def on_mission_change(sender, instance, created=False, **kwargs):
+    # Database ids may be reused, so new missions can't be cached.
+    if created:
+        clear_missions([instance.pk])
+    clear_missions_on_commit([instance.pk])
+
+
+@receiver(m2m_changed, sender=MissionConfig.fly_zones.through)
+@receiver(m2m_changed, sender=MissionConfig.mission_waypoints.through)
+@receiver(m2m_changed, sender=MissionConfig.search_grid_points.through)
+@receiver(m2m_changed, sender=MissionConfig.air_drop_boundary_points.through)
+@receiver(m2m_changed, sender=MissionConfig.stationary_obstacles.through)
+@receiver(m2m_changed, sender=MissionConfig.odlcs.through)
+def on_mission_parts_change(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        clear_missions_on_commit([instance.pk])
+    else:
+        clear_missions_on_commit()
+
+
+@receiver(m2m_changed, sender=FlyZone.boundary_pts.through)
+def on_boundary_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        clear_missions_on_commit()
+
+
+@receiver(post_save, sender=FlyZone)
+@receiver(post_delete, sender=FlyZone)
+@receiver(post_save, sender=StationaryObstacle)
+@receiver(post_delete, sender=StationaryObstacle)
+@receiver(post_save, sender=Waypoint)
+@receiver(post_delete, sender=Waypoint)
+def on_part_change(sender, instance, **kwargs):
+    clear_missions_on_commit()
+
+
+@receiver(post_save, sender=GpsPosition)
+@receiver(post_delete, sender=GpsPosition)
+def on_position_change(sender, instance, **kwargs):
+    # Positions are also saved for ODLCs, so only clear missions using it.
+    uses_position = Q()
+    for field in POSITION_FIELDS + KML_POSITION_FIELDS:
+        uses_position |= Q(**{field: instance.pk})
+    clear_missions_on_commit(
+        MissionConfig.objects.filter(uses_position).values_list(
+            'pk', flat=True).distinct())
+
+
+@receiver(post_save, sender=Odlc)
+def on_odlc_save(sender, instance, **kwargs):
+    # Teams' ODLCs aren't part of missions, so only clear for judges' ODLCs.
+    clear_missions_on_commit(
+        instance.missionconfig_odlc.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Odlc)
+def on_odlc_pre_delete(sender, instance, **kwargs):
+    # The ODLC's mission relations are deleted with it, so find them before.
+    instance._mission_pks = list(
+        instance.missionconfig_odlc.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Odlc)
+def on_odlc_delete(sender, instance, **kwargs):
+    clear_missions_on_commit(getattr(instance, '_mission_pks', []))
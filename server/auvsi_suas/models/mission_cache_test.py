@@ -0,0 +1,137 @@
+"""Tests for the mission_cache module."""
+
+from auvsi_suas.models import mission_cache
+from auvsi_suas.models import test_utils
+from auvsi_suas.models.fly_zone import FlyZone
+from auvsi_suas.models.gps_position import GpsPosition
+from auvsi_suas.models.waypoint import Waypoint
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+
+class TestMissionCache(TransactionTestCase):
+    """Tests the mission cache.
+
+    Cached missions are cleared once changes are committed, so tests aren't
+    run in a transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        self.other = test_utils.create_sample_mission(self.superuser)
+        self.pks = [self.mission.pk, self.other.pk]
+
+    def set_cached(self):
+        """Caches both missions."""
+        mission_cache.set_missions({pk: 'mission%d' % pk for pk in self.pks})
+        self.assertCached(self.pks)
+
+    def assertCached(self, pks):
+        """Asserts which missions are cached."""
+        self.assertEqual(
+            sorted(pks), sorted(mission_cache.get_missions(self.pks).keys()))
+
+    def test_get_set(self):
+        """Tests getting cached missions and the counters."""
+        self.assertEqual({}, mission_cache.get_missions(self.pks))
+        mission_cache.set_missions({self.mission.pk: 'mission'})
+        self.assertEqual({
+            self.mission.pk: 'mission'
+        }, mission_cache.get_missions(self.pks))
+        self.assertEqual({'hits': 1, 'misses': 3}, mission_cache.stats())
+
+    def test_mission_saved(self):
+        """Tests saving a mission clears only that mission."""
+        self.set_cached()
+        self.mission.save()
+        self.assertCached([self.other.pk])
+
+    def test_mission_parts_changed(self):
+        """Tests changing the parts of a mission clears it."""
+        self.set_cached()
+        self.mission.mission_waypoints.remove(
+            self.mission.mission_waypoints.first())
+        self.assertCached([self.other.pk])
+
+        zone = FlyZone(altitude_msl_min=0, altitude_msl_max=100)
+        zone.save()
+        self.set_cached()
+        zone.missionconfig_set.add(self.other)
+        self.assertCached([])
+
+    def test_part_saved(self):
+        """Tests saving parts shared by missions clears all missions."""
+        self.set_cached()
+        waypoint = self.mission.mission_waypoints.first()
+        waypoint.altitude_msl += 10
+        waypoint.save()
+        self.assertCached([])
+
+        self.set_cached()
+        obstacle = self.mission.stationary_obstacles.first()
+        obstacle.cylinder_radius += 10
+        obstacle.save()
+        self.assertCached([])
+
+        self.set_cached()
+        waypoint = Waypoint(
+            latitude=38, longitude=-76, altitude_msl=0, order=0)
+        waypoint.save()
+        self.assertCached([])
+        self.set_cached()
+        self.mission.fly_zones.first().boundary_pts.add(waypoint)
+        self.assertCached([])
+
+    def test_position_saved(self):
+        """Tests saving a mission position clears only its missions."""
+        self.set_cached()
+        GpsPosition(latitude=38, longitude=-76).save()
+        self.assertCached(self.pks)
+
+        self.mission.air_drop_pos.latitude += 0.001
+        self.mission.air_drop_pos.save()
+        self.assertCached([self.other.pk])
+
+    def test_odlc_saved(self):
+        """Tests saving a judge ODLC clears its mission and the KML."""
+        cache.set(mission_cache.MISSIONS_KML_KEY, 'kml')
+        self.set_cached()
+        odlc = self.mission.odlcs.first()
+        odlc.alphanumeric = 'Z'
+        odlc.save()
+        self.assertCached([self.other.pk])
+        self.assertIsNone(cache.get(mission_cache.MISSIONS_KML_KEY))
+
+        cache.set(mission_cache.MISSIONS_KML_KEY, 'kml')
+        self.set_cached()
+        odlc.location.latitude += 0.001
+        odlc.location.save()
+        self.assertCached([self.other.pk])
+        self.assertIsNone(cache.get(mission_cache.MISSIONS_KML_KEY))
+
+    def test_odlc_deleted(self):
+        """Tests deleting a judge ODLC clears its mission."""
+        self.set_cached()
+        self.mission.odlcs.first().delete()
+        self.assertCached([self.other.pk])
+
+    def test_cleared_on_commit(self):
+        """Tests missions are cleared once the change is committed."""
+        self.set_cached()
+        with transaction.atomic():
+            self.mission.save()
+            # Other connections may still load the mission before the change.
+            self.assertCached(self.pks)
+        self.assertCached([self.other.pk])
+
+        self.set_cached()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.mission.save()
+                raise ValueError('Rolled back.')
+        self.assertCached(self.pks)
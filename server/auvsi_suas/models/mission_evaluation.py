@@ -1,15 +1,18 @@
 """Mission evaluation."""
 
-import itertools
 import logging
-from auvsi_suas.models.mission_judge_feedback import MissionJudgeFeedback
-from auvsi_suas.models.odlc import Odlc
+import multiprocessing
+from auvsi_suas.models import evaluation_cache
+from auvsi_suas.models import evaluation_data
+from auvsi_suas.models import evaluation_worker
+from auvsi_suas.models.fly_zone import FlyZone
 from auvsi_suas.models.odlc import OdlcEvaluator
-from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.telemetry_track import TelemetryTrack
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.proto import interop_admin_api_pb2
 from auvsi_suas.proto import interop_api_pb2
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import connection
 
 logger = logging.getLogger(__name__)
 
@@ -63,29 +66,27 @@ AIR_DROP_WEIGHT = 0.2
 OPERATIONAL_WEIGHT = 0.1
 
 
-def generate_feedback(mission_config, user, team_eval):
+def generate_feedback(mission_data, team, team_eval):
     """Generates mission feedback for the given team and mission.
 
     Args:
-        mission_config: The mission to evaluate the team against.
-        user: The team user object for which to evaluate and provide feedback.
+        mission_data: The MissionData to evaluate the team against.
+        team: The TeamData of the team, with telemetry.
         team_eval: The team evaluation to fill.
     """
     feedback = team_eval.feedback
+    user = team.user
 
     # Find the user's flights.
-    flight_periods = TakeoffOrLandingEvent.flights(mission_config, user)
+    flight_periods = team.flights
     for period in flight_periods:
         if period.duration() is None:
             team_eval.warnings.append(
                 'Infinite flight period, may be missing TakeoffOrLandingEvent.'
             )
             break
-    uas_period_logs = [
-        UasTelemetry.dedupe(logs)
-        for logs in UasTelemetry.by_time_period(user, flight_periods)
-    ]
-    uas_logs = list(itertools.chain.from_iterable(uas_period_logs))
+    uas_period_logs = [UasTelemetry.dedupe(logs) for logs in team.telemetry]
+    uas_logs = TelemetryTrack.concatenate(uas_period_logs)
 
     # Determine interop telemetry rates.
     telem_max, telem_avg = UasTelemetry.rates(
@@ -97,38 +98,52 @@ def generate_feedback(mission_config, user, team_eval):
 
     # Determine if the uas hit the waypoints.
     feedback.waypoints.extend(
-        UasTelemetry.satisfied_waypoints(
-            mission_config.home_pos,
-            mission_config.mission_waypoints.order_by('order'), uas_logs))
+        UasTelemetry.satisfied_waypoints(mission_data.home_pos,
+                                         mission_data.waypoints, uas_logs))
 
     # Evaluate the object detections.
-    user_odlcs = Odlc.objects.filter(user=user).filter(
-        mission=mission_config.pk).all()
-    for odlc in user_odlcs:
+    for odlc in team.odlcs:
         if odlc.thumbnail and odlc.thumbnail_approved is None:
             team_eval.warnings.append(
                 'Odlc thumbnail review not set, may need to review ODLCs.')
             break
-    evaluator = OdlcEvaluator(user_odlcs,
-                              mission_config.odlcs.all(), flight_periods)
+    evaluator = OdlcEvaluator(team.odlcs, mission_data.real_odlcs,
+                              flight_periods)
     feedback.odlc.CopyFrom(evaluator.evaluate())
 
     # Determine collisions with stationary.
-    for obst in mission_config.stationary_obstacles.all():
+    for obst in mission_data.stationary_obstacles:
         obst_eval = feedback.stationary_obstacles.add()
         obst_eval.id = obst.pk
         obst_eval.hit = obst.evaluate_collision_with_uas(uas_logs)
 
+    # Determine fly zone boundary violations, per flight.
+    fly_zones = mission_data.fly_zones
+    violations = 0
+    violation_time_sec = 0.0
+    for logs in uas_period_logs:
+        (flight_violations, flight_time) = FlyZone.out_of_bounds(
+            fly_zones, logs)
+        violations += flight_violations
+        violation_time_sec += flight_time.total_seconds()
+    feedback.boundary_violations = violations
+    feedback.boundary_violation_time_sec = violation_time_sec
+
     # Add judge feedback.
-    try:
-        judge_feedback = MissionJudgeFeedback.objects.get(
-            mission=mission_config.pk, user=user.pk)
+    judge_feedback = team.judge_feedback
+    if judge_feedback:
         feedback.judge.CopyFrom(judge_feedback.proto())
         if feedback.judge.min_auto_flight_time and not flight_periods:
             team_eval.warnings.append(
                 'Min flight time achieved by no flight periods, may be missing TakeoffOrLandingEvent.'
             )
-    except MissionJudgeFeedback.DoesNotExist:
+        judge_violations = (
+            feedback.judge.out_of_bounds + feedback.judge.unsafe_out_of_bounds)
+        if judge_violations != violations:
+            team_eval.warnings.append(
+                'Telemetry has %d boundary violations, but judges recorded '
+                '%d out of bounds.' % (violations, judge_violations))
+    else:
         team_eval.warnings.append('No MissionJudgeFeedback for team.')
 
 
@@ -253,50 +268,158 @@ def score_team(team_eval):
         score.score_ratio = 0
 
 
-def evaluate_teams(mission_config, users=None):
+def evaluate_team(mission_data, team):
+    """Evaluates a team against a mission.
+
+    Evaluation uses only the loaded data, without database queries.
+
+    Args:
+        mission_data: The MissionData to evaluate against.
+        team: The TeamData of the team, with telemetry.
+    Returns:
+        A serialized auvsi_suas.proto.MissionEvaluation, so that it can be
+        returned from a worker process.
+    """
+    mission_config = mission_data.mission_config
+    user = team.user
+
+    # Start the evaluation data structure.
+    logger.info('Evaluation starting for user: %s.' % user.username)
+    team_eval = interop_admin_api_pb2.MissionEvaluation()
+    team_eval.mission = mission_config.pk
+    team_eval.team.username = user.username
+    team_eval.team.name = user.first_name
+    team_eval.team.university = user.last_name
+    # Generate feedback.
+    generate_feedback(mission_data, team, team_eval)
+    # Generate score from feedback.
+    score_team(team_eval)
+    return team_eval.SerializeToString()
+
+
+def _evaluate_team_args(args):
+    return evaluate_team(*args)
+
+
+def team_evaluations(mission_config, teams, fingerprints, evaluations, results,
+                     progress):
+    """Merges cached and new evaluations, caching and reporting new ones.
+
+    Args:
+        mission_config: The mission evaluated against.
+        teams: The TeamData of all teams, in order of username.
+        fingerprints: A dict of user pk to the team_fingerprint().
+        evaluations: A dict of user pk to cached serialized evaluation.
+        results: An iterable of serialized evaluations of the teams without a
+            cached evaluation, in order.
+        progress: Optional function called with the number of teams evaluated
+            and the total.
+    Yields:
+        The auvsi_suas.proto.MissionEvaluation of each team, in order.
+    """
+    results = iter(results)
+    num_done = len(evaluations)
+    for team in teams:
+        evaluation = evaluations.get(team.user.pk)
+        if evaluation is None:
+            evaluation = next(results)
+            evaluation_cache.set_evaluations(mission_config, fingerprints,
+                                             {team.user.pk: evaluation})
+            num_done += 1
+            if progress:
+                progress(num_done, len(teams))
+        team_eval = interop_admin_api_pb2.MissionEvaluation()
+        team_eval.ParseFromString(evaluation)
+        yield team_eval
+
+
+def iter_evaluate_teams(mission_config,
+                        users=None,
+                        processes=None,
+                        progress=None):
+    """Evaluates the teams (non admin users) of the competition.
+
+    Teams whose evaluation inputs haven't changed since they were last
+    evaluated use the cached evaluation. Other teams may be evaluated in
+    parallel by worker processes. Teams are yielded as they're evaluated, in
+    order of username regardless of the number of processes, so they can be
+    used before all teams are evaluated.
+
+    Args:
+        mission_config: The mission to evaluate users against.
+        users: Optional list of users to eval. If None will evaluate all.
+        processes: Optional number of processes to evaluate teams with. If
+            None, uses settings.MISSION_EVALUATION_PROCESSES.
+        progress: Optional function called with the number of teams
+            evaluated and the total number of teams, once cached evaluations
+            are found and after each team is evaluated.
+    Yields:
+        The auvsi_suas.proto.MissionEvaluation of each team.
+    """
+    # Load the inputs of all teams in bulk.
+    logger.info('Starting team evaluations.')
+    mission_data = evaluation_data.MissionData(mission_config)
+    teams = evaluation_data.load_teams(mission_config, users)
+
+    # Only evaluate teams without a current cached evaluation.
+    common_inputs = evaluation_cache.mission_inputs(mission_data)
+    telemetry = evaluation_data.telemetry_aggregates(teams)
+    fingerprints = {
+        team.user.pk: evaluation_cache.team_fingerprint(
+            team, common_inputs, telemetry.get(team.user.pk))
+        for team in teams
+    }
+    evaluations = evaluation_cache.get_evaluations(mission_config,
+                                                   fingerprints)
+    eval_teams = [t for t in teams if t.user.pk not in evaluations]
+    logger.info('Evaluating %d teams, %d are cached.' % (len(eval_teams),
+                                                         len(evaluations)))
+    if progress:
+        progress(len(evaluations), len(teams))
+    evaluation_data.load_telemetry(eval_teams)
+
+    if processes is None:
+        processes = settings.MISSION_EVALUATION_PROCESSES
+    processes = min(processes, len(eval_teams))
+    args = [(mission_data, team) for team in eval_teams]
+    # Workers may still load uncached fly zone geometry with their own
+    # connections, which can't see data uncommitted by a transaction.
+    if processes > 1 and not connection.in_atomic_block:
+        # Server processes run threads, and forking a process with threads
+        # may copy locks held by the other threads, deadlocking the workers.
+        # Workers are instead forked by a single-threaded server process.
+        pool = multiprocessing.get_context('forkserver').Pool(
+            processes,
+            initializer=evaluation_worker.init_worker,
+            initargs=(settings.DATABASES, settings.CACHES))
+        try:
+            results = pool.imap(_evaluate_team_args, args, chunksize=1)
+            yield from team_evaluations(mission_config, teams, fingerprints,
+                                        evaluations, results, progress)
+        finally:
+            # Stops the workers, even if the evaluation is abandoned.
+            pool.terminate()
+            pool.join()
+    else:
+        results = (evaluate_team(*a) for a in args)
+        yield from team_evaluations(mission_config, teams, fingerprints,
+                                    evaluations, results, progress)
+
+
+def evaluate_teams(mission_config, users=None, processes=None, progress=None):
     """Evaluates the teams (non admin users) of the competition.
 
     Args:
         mission_config: The mission to evaluate users against.
         users: Optional list of users to eval. If None will evaluate all.
+        processes: Optional number of processes to evaluate teams with. If
+            None, uses settings.MISSION_EVALUATION_PROCESSES.
+        progress: Optional function called with the number of teams
+            evaluated and the total number of teams.
     Returns:
         A auvsi_suas.proto.MultiUserMissionEvaluation.
     """
-    # Start a results map from user to MissionEvaluation.
     mission_eval = interop_admin_api_pb2.MultiUserMissionEvaluation()
-
-    # If not provided, eval all users.
-    if users is None:
-        users = User.objects.all()
-
-    logger.info('Starting team evaluations.')
-    for user in sorted(users, key=lambda u: u.username):
-        # Ignore admins.
-        if user.is_superuser:
-            logger.info('Filtering superuser: %s.' % user.username)
-            continue
-
-        # Filter inactive users.
-        has_flights = TakeoffOrLandingEvent.objects.filter(user=user).filter(
-            mission=mission_config).exists()
-        has_odlcs = Odlc.objects.filter(user=user).filter(
-            mission=mission_config).exists()
-        has_feedback = MissionJudgeFeedback.objects.filter(user=user).filter(
-            mission=mission_config).exists()
-        if not has_flights and not has_odlcs and not has_feedback:
-            logger.info('Filtering inactive user: %s.' % user.username)
-            continue
-
-        # Start the evaluation data structure.
-        logger.info('Evaluation starting for user: %s.' % user.username)
-        team_eval = mission_eval.teams.add()
-        team_eval.mission = mission_config.pk
-        team_eval.team.username = user.username
-        team_eval.team.name = user.first_name
-        team_eval.team.university = user.last_name
-        # Generate feedback.
-        generate_feedback(mission_config, user, team_eval)
-        # Generate score from feedback.
-        score_team(team_eval)
-
+    mission_eval.teams.extend(
+        iter_evaluate_teams(mission_config, users, processes, progress))
     return mission_eval
@@ -1,11 +1,24 @@
 """Tests for the mission_evaluation module."""
 
+import datetime
+import time
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
+from auvsi_suas.models import evaluation_cache
+from auvsi_suas.models import evaluation_data
 from auvsi_suas.models import mission_config
 from auvsi_suas.models import mission_evaluation
 from auvsi_suas.models import test_utils
+from auvsi_suas.models.mission_judge_feedback import MissionJudgeFeedback
+from auvsi_suas.models.odlc import Odlc
+from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.proto import interop_admin_api_pb2
 
 
@@ -319,6 +332,9 @@ class TestMissionEvaluation(TestCase):
         self.assertGreater(feedback.uas_telemetry_time_max_sec, 0)
         self.assertGreater(feedback.uas_telemetry_time_avg_sec, 0)
 
+        self.assertTrue(feedback.HasField('boundary_violations'))
+        self.assertTrue(feedback.HasField('boundary_violation_time_sec'))
+
         self.assertTrue(feedback.odlc.HasField('score_ratio'))
 
         self.assertGreater(len(feedback.stationary_obstacles), 0)
@@ -365,3 +381,354 @@ class TestMissionEvaluation(TestCase):
         self.assertEqual(1, len(mission_eval.teams))
         self.assertEqual(self.user0.username,
                          mission_eval.teams[0].team.username)
+
+    def test_boundary_violations(self):
+        """Tests boundary violations are computed from telemetry."""
+        start = timezone.now()
+
+        def at(sec):
+            return start + datetime.timedelta(seconds=sec)
+
+        TakeoffOrLandingEvent(
+            user=self.user1,
+            mission=self.mission,
+            uas_in_air=True,
+            timestamp=at(0)).save()
+        for (sec, (lat,
+                   lon)) in [(1, (38.146, -76.428)), (2, (38.160, -76.430)),
+                             (20, (38.161, -76.430)), (21, (38.146, -76.428)),
+                             (22, (38.146, -76.429))]:
+            UasTelemetry(
+                user=self.user1,
+                timestamp=at(sec),
+                latitude=lat,
+                longitude=lon,
+                altitude_msl=300,
+                uas_heading=0).save()
+        TakeoffOrLandingEvent(
+            user=self.user1,
+            mission=self.mission,
+            uas_in_air=False,
+            timestamp=at(30)).save()
+
+        feedback = MissionJudgeFeedback(
+            mission=self.mission,
+            user=self.user1,
+            flight_time=datetime.timedelta(seconds=30),
+            post_process_time=datetime.timedelta(seconds=1),
+            used_timeout=False,
+            min_auto_flight_time=True,
+            safety_pilot_takeovers=0,
+            out_of_bounds=1,
+            unsafe_out_of_bounds=0,
+            things_fell_off_uas=False,
+            crashed=False,
+            air_drop_accuracy=interop_admin_api_pb2.MissionJudgeFeedback.
+            NO_POINTS,
+            ugv_drove_to_location=False,
+            operational_excellence_percent=90)
+        feedback.save()
+
+        team_eval = mission_evaluation.evaluate_teams(self.mission,
+                                                      [self.user1]).teams[0]
+        self.assertEqual(1, team_eval.feedback.boundary_violations)
+        self.assertAlmostEqual(19,
+                               team_eval.feedback.boundary_violation_time_sec)
+        self.assertFalse([w for w in team_eval.warnings if 'boundary' in w])
+
+        # Judges disagree with telemetry.
+        feedback.out_of_bounds = 0
+        feedback.save()
+        team_eval = mission_evaluation.evaluate_teams(self.mission,
+                                                      [self.user1]).teams[0]
+        self.assertIn(
+            'Telemetry has 1 boundary violations, but judges recorded 0 out '
+            'of bounds.', team_eval.warnings)
+
+
+class TestMissionEvaluationTeamsBase(TransactionTestCase):
+    """Base for tests evaluating many teams."""
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            username='superuser', password='testpass', email='test@test.com')
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        self.users = []
+
+    def create_team(self, num_telemetry):
+        """Creates a team with a flight of random telemetry."""
+        user = User.objects.create_user(
+            username='user%d' % len(self.users),
+            password='testpass',
+            email='test@test.com')
+        self.users.append(user)
+        start = timezone.now()
+        TakeoffOrLandingEvent(
+            user=user, mission=self.mission, uas_in_air=True,
+            timestamp=start).save()
+        UasTelemetry.objects.bulk_create([
+            UasTelemetry(
+                user=user,
+                timestamp=start + datetime.timedelta(seconds=0.1 * (i + 1)),
+                latitude=38.145 + 0.005 * ((i * 7919) % 1000) / 1000.0,
+                longitude=-76.43 + 0.005 * ((i * 104729) % 1000) / 1000.0,
+                altitude_msl=(i * 31) % 500,
+                uas_heading=0) for i in range(num_telemetry)
+        ])
+        TakeoffOrLandingEvent(
+            user=user,
+            mission=self.mission,
+            uas_in_air=False,
+            timestamp=start + datetime.timedelta(seconds=0.1 *
+                                                 (num_telemetry + 1))).save()
+
+
+class TestMissionEvaluationProcesses(TestMissionEvaluationTeamsBase):
+    """Tests evaluating teams with worker processes.
+
+    Worker processes connect to the test database by name, which in-memory
+    SQLite databases don't have, so these tests require PostgreSQL.
+    """
+
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Worker processes require PostgreSQL.')
+        super(TestMissionEvaluationProcesses, self).setUp()
+
+    def test_matches_serial(self):
+        """Tests worker processes give the same evaluation as serial."""
+        for _ in range(5):
+            self.create_team(100)
+        serial = mission_evaluation.evaluate_teams(self.mission, processes=1)
+        cache.clear()
+        parallel = mission_evaluation.evaluate_teams(self.mission, processes=3)
+        self.assertEqual(5, len(serial.teams))
+        self.assertEqual(['user%d' % i for i in range(5)],
+                         [t.team.username for t in parallel.teams])
+        self.assertEqual(serial, parallel)
+
+    def test_loadtest(self):
+        """Tests evaluation wall time against the number of teams."""
+        processes = 4
+        for num_teams in [1, 4, 8]:
+            while len(self.users) < num_teams:
+                # A 10 minute flight at 10 Hz.
+                self.create_team(6000)
+
+            cache.clear()
+            start_t = time.time()
+            serial = mission_evaluation.evaluate_teams(
+                self.mission, processes=1)
+            serial_t = time.time() - start_t
+
+            cache.clear()
+            start_t = time.time()
+            parallel = mission_evaluation.evaluate_teams(
+                self.mission, processes=processes)
+            parallel_t = time.time() - start_t
+
+            self.assertEqual(num_teams, len(parallel.teams))
+            self.assertEqual(serial, parallel)
+            # Worker processes are started per evaluation, which may cost
+            # more than they save for few teams or CPUs.
+            self.assertGreaterEqual(num_teams / serial_t, 0.2)
+            self.assertGreaterEqual(num_teams / parallel_t, 0.2)
+
+
+class TestMissionEvaluationQueries(TestMissionEvaluationTeamsBase):
+    """Tests the number of queries to evaluate teams."""
+
+    def simulate_teams(self, num_teams):
+        """Simulates the mission of more teams."""
+        for _ in range(num_teams):
+            user = User.objects.create_user(
+                username='user%d' % len(self.users),
+                password='testpass',
+                email='test@test.com')
+            self.users.append(user)
+            test_utils.simulate_team_mission(self, self.mission,
+                                             self.superuser, user)
+
+    def num_queries(self):
+        """Gets the queries to evaluate teams, uncached and cached."""
+        cache.clear()
+        num_queries = []
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                mission_eval = mission_evaluation.evaluate_teams(
+                    self.mission, processes=1)
+            self.assertEqual(len(self.users), len(mission_eval.teams))
+            num_queries.append(len(queries))
+        return num_queries
+
+    def test_num_queries(self):
+        """Tests the number of queries doesn't grow with the teams."""
+        self.simulate_teams(1)
+        # An inactive user.
+        User.objects.create_user(
+            username='inactive', password='testpass', email='test@test.com')
+        num_queries = self.num_queries()
+        self.simulate_teams(4)
+        self.assertEqual(num_queries, self.num_queries())
+
+
+class TestMissionEvaluationCache(TestMissionEvaluationTeamsBase):
+    """Tests caching team evaluations."""
+
+    def setUp(self):
+        super(TestMissionEvaluationCache, self).setUp()
+        self.user = User.objects.create_user(
+            username='team', password='testpass', email='test@test.com')
+        self.users.append(self.user)
+        test_utils.simulate_team_mission(self, self.mission, self.superuser,
+                                         self.user)
+
+    def assertEvaluated(self, expect_misses):
+        """Evaluates the teams, asserting the number of cache misses.
+
+        Returns:
+            The evaluation of the teams.
+        """
+        before = evaluation_cache.stats()
+        mission_eval = mission_evaluation.evaluate_teams(self.mission)
+        after = evaluation_cache.stats()
+        self.assertEqual(expect_misses, after['misses'] - before['misses'])
+        self.assertEqual(
+            len(mission_eval.teams) - expect_misses,
+            after['hits'] - before['hits'])
+        return mission_eval
+
+    def test_cached(self):
+        """Tests unchanged teams use the cached evaluation."""
+        self.create_team(100)
+        first = self.assertEvaluated(2)
+        self.assertEqual(first, self.assertEvaluated(0))
+
+        # Cached evaluations are used for a subset of teams.
+        team_eval = mission_evaluation.evaluate_teams(
+            self.mission, users=[self.user])
+        self.assertEqual(1, len(team_eval.teams))
+        self.assertEqual(first.teams[0], team_eval.teams[0])
+
+    def test_progress(self):
+        """Tests progress is reported, with cached teams done first."""
+        self.create_team(100)
+        self.create_team(100)
+        progress = []
+        mission_evaluation.evaluate_teams(
+            self.mission,
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual([(0, 3), (1, 3), (2, 3), (3, 3)], progress)
+
+        progress = []
+        mission_evaluation.evaluate_teams(
+            self.mission,
+            processes=2,
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual([(3, 3)], progress)
+
+    def fingerprints(self):
+        """Computes the fingerprints of the teams."""
+        mission_data = evaluation_data.MissionData(self.mission)
+        teams = evaluation_data.load_teams(self.mission)
+        common_inputs = evaluation_cache.mission_inputs(mission_data)
+        telemetry = evaluation_data.telemetry_aggregates(teams)
+        return [
+            evaluation_cache.team_fingerprint(t, common_inputs,
+                                              telemetry.get(t.user.pk))
+            for t in teams
+        ]
+
+    def test_fingerprint(self):
+        """Tests fingerprints are stable and differ by team."""
+        self.create_team(100)
+        fingerprints = self.fingerprints()
+        self.assertEqual(2, len(fingerprints))
+        self.assertEqual(fingerprints, self.fingerprints())
+        self.assertNotEqual(fingerprints[0], fingerprints[1])
+
+    def test_changed_telemetry(self):
+        """Tests new telemetry in a flight evaluates the team again."""
+        self.create_team(100)
+        first = self.assertEvaluated(2)
+        flight = TakeoffOrLandingEvent.flights(self.mission, self.user)[0]
+        UasTelemetry(
+            user=self.user,
+            timestamp=flight.start + (flight.end - flight.start) / 2,
+            latitude=38,
+            longitude=-76,
+            altitude_msl=100,
+            uas_heading=0).save()
+        second = self.assertEvaluated(1)
+        self.assertNotEqual(first.teams[0], second.teams[0])
+        self.assertEqual(first.teams[1], second.teams[1])
+
+        # Telemetry outside of flights isn't evaluated.
+        UasTelemetry(
+            user=self.user,
+            timestamp=flight.end + datetime.timedelta(minutes=1),
+            latitude=38,
+            longitude=-76,
+            altitude_msl=100,
+            uas_heading=0).save()
+        self.assertEvaluated(0)
+
+    def test_changed_flights(self):
+        """Tests a new takeoff evaluates the team again."""
+        self.assertEvaluated(1)
+        TakeoffOrLandingEvent(
+            user=self.user, mission=self.mission, uas_in_air=True).save()
+        team_eval = self.assertEvaluated(1).teams[0]
+        self.assertIn(
+            'Infinite flight period, may be missing TakeoffOrLandingEvent.',
+            team_eval.warnings)
+
+    def test_changed_judge_feedback(self):
+        """Tests changed judge feedback evaluates the team again."""
+        self.assertEqual(
+            False, self.assertEvaluated(1).teams[0].feedback.judge.crashed)
+        feedback = MissionJudgeFeedback.objects.get(
+            mission=self.mission, user=self.user)
+        feedback.crashed = True
+        feedback.save()
+        self.assertEqual(
+            True, self.assertEvaluated(1).teams[0].feedback.judge.crashed)
+
+    def test_changed_odlc(self):
+        """Tests a changed ODLC review evaluates the team again."""
+        first = self.assertEvaluated(1).teams[0]
+        odlc = Odlc.objects.filter(user=self.user).first()
+        odlc.thumbnail_approved = not odlc.thumbnail_approved
+        odlc.save()
+        second = self.assertEvaluated(1).teams[0]
+        self.assertNotEqual(first.feedback.odlc, second.feedback.odlc)
+
+    def test_changed_mission(self):
+        """Tests changed mission geometry evaluates all teams again."""
+        self.create_team(100)
+        self.assertEvaluated(2)
+        waypoint = self.mission.mission_waypoints.order_by('order').first()
+        waypoint.altitude_msl += 1000
+        waypoint.save()
+        self.assertEvaluated(2)
+        obstacle = self.mission.stationary_obstacles.first()
+        obstacle.cylinder_radius += 10
+        obstacle.save()
+        self.assertEvaluated(2)
+
+    def test_loadtest(self):
+        """Tests re-exporting evaluations after one team changed."""
+        num_teams = 8
+        while len(self.users) < num_teams:
+            # A 10 minute flight at 10 Hz.
+            self.create_team(6000)
+
+        first = self.assertEvaluated(num_teams)
+        self.assertEqual(first, self.assertEvaluated(0))
+
+        feedback = MissionJudgeFeedback.objects.get(
+            mission=self.mission, user=self.user)
+        feedback.safety_pilot_takeovers += 1
+        feedback.save()
+        self.assertEvaluated(1)
@@ -2,8 +2,9 @@
 
 import enum
 import logging
-import networkx as nx
+import numpy as np
 import operator
+from auvsi_suas.models import distance
 from auvsi_suas.models import pb_utils
 from auvsi_suas.models.gps_position import GpsPosition
 from auvsi_suas.proto import interop_admin_api_pb2
@@ -12,6 +13,7 @@ from django.conf import settings
 from django.contrib import admin
 from django.db import models
 from django.utils import timezone
+from scipy import optimize
 
 logger = logging.getLogger(__name__)
 
@@ -189,20 +191,61 @@ class OdlcEvaluator(object):
         Raises:
             AssertionError: not all submitted objects are from the same user.
         """
-        self.submitted_objects = submitted_objects
-        self.real_objects = real_objects
+        self.submitted_objects = list(submitted_objects)
+        self.real_objects = list(real_objects)
         self.flights = flights
 
         if self.submitted_objects:
-            self.user = self.submitted_objects[0].user
+            self.user = self.submitted_objects[0].user_id
             for t in self.submitted_objects:
-                if t.user != self.user:
+                if t.user_id != self.user:
                     raise AssertionError(
                         "All submitted objects must be from the same user")
 
-        self.matches = self.match_odlcs(submitted_objects, real_objects)
-        self.unmatched = self.find_unmatched(submitted_objects, real_objects,
-                                             self.matches)
+        self.geolocation_distances = self.compute_geolocation_distances(
+            self.submitted_objects, self.real_objects)
+        # Evaluate each pair of objects once, for matching and evaluation.
+        self.submitted_index = dict(
+            (o, i) for (i, o) in enumerate(self.submitted_objects))
+        self.real_index = dict((o, j)
+                               for (j, o) in enumerate(self.real_objects))
+        self.match_evals = [[
+            self.evaluate_match(s, r) for r in self.real_objects
+        ] for s in self.submitted_objects]
+        self.match_values = np.array(
+            [[e.score_ratio for e in evals] for evals in self.match_evals],
+            dtype=np.float64).reshape((len(self.submitted_objects),
+                                       len(self.real_objects)))
+        self.matches = self.match_odlcs(self.submitted_objects,
+                                        self.real_objects)
+        self.unmatched = self.find_unmatched(self.submitted_objects,
+                                             self.real_objects, self.matches)
+
+    def compute_geolocation_distances(self, submitted_objects, real_objects):
+        """Computes the distance between all located object pairs at once.
+
+        Args:
+            submitted_objects: List of submitted object detections.
+            real_objects: List of real objects made by judges.
+        Returns:
+            Map from (submitted pk, real pk) to distance in feet, for pairs of
+            objects which both have a location.
+        """
+        submitted = [o for o in submitted_objects if o.location]
+        real = [o for o in real_objects if o.location]
+
+        def locations(objects):
+            return ([o.location.latitude for o in objects],
+                    [o.location.longitude
+                     for o in objects], [0] * len(objects))
+
+        dists = distance.distance_matrix(
+            *(locations(submitted) + locations(real))).tolist()
+        distances = {}
+        for (i, s) in enumerate(submitted):
+            for (j, r) in enumerate(real):
+                distances[(s.pk, r.pk)] = dists[i][j]
+        return distances
 
     def range_lookup(self,
                      ranges,
@@ -257,7 +300,7 @@ class OdlcEvaluator(object):
             submitted)
         if submitted.location:
             object_eval.geolocation_accuracy_ft = \
-                    submitted.location.distance_to(real.location)
+                    self.geolocation_distances[(submitted.pk, real.pk)]
         object_eval.actionable_submission = submitted.actionable_submission(
             flights=self.flights)
         object_eval.autonomous_submission = submitted.autonomous
@@ -292,6 +335,35 @@ class OdlcEvaluator(object):
             matches[s] = f
         return matches
 
+    def pair_values(self, submitted_objects, real_objects):
+        """Gets the match values of pairs of objects.
+
+        Args:
+            submitted_objects: List of submitted object detections.
+            real_objects: List of real objects made by judges.
+        Returns:
+            Array of the match value (score ratio) of each submitted object
+            (rows) and real object (columns).
+        """
+        rows = np.array(
+            [self.submitted_index[o] for o in submitted_objects],
+            dtype=np.int64)
+        cols = np.array(
+            [self.real_index[o] for o in real_objects], dtype=np.int64)
+        return self.match_values[np.ix_(rows, cols)]
+
+    def max_weight_matching(self, weights):
+        """Finds the bipartite matching with max total weight.
+
+        Args:
+            weights: Array of the weight of matching each row and column.
+        Returns:
+            List of matched (row, column) pairs. Pairs without weight are not
+            matched.
+        """
+        (rows, cols) = optimize.linear_sum_assignment(weights, maximize=True)
+        return [(i, j) for (i, j) in zip(rows, cols) if weights[i, j] > 0]
+
     def match_odlcs(self, submitted_objects, real_objects):
         """Matches the objects to maximize match value.
 
@@ -302,19 +374,14 @@ class OdlcEvaluator(object):
             A map from submitted object to real object, and real object to
             submitted object, if they are matched.
         """
-        # Create a bipartite graph from submitted to real objects with match
-        # values (score ratio) as edge weights. Skip edges with no match value.
-        g = nx.Graph()
-        g.add_nodes_from(submitted_objects)
-        g.add_nodes_from(real_objects)
-        for submitted in submitted_objects:
-            for real in real_objects:
-                match_value = self.evaluate_match(submitted, real).score_ratio
-                if match_value:
-                    g.add_edge(submitted, real, weight=match_value)
-        # Compute the full matching.
+        # Assign submitted to real objects with match values (score ratio) as
+        # weights. Pairs with no match value aren't matched.
+        submitted_objects = list(submitted_objects)
+        real_objects = list(real_objects)
+        values = self.pair_values(submitted_objects, real_objects)
         return self.matching_map_from_set(
-            nx.algorithms.matching.max_weight_matching(g))
+            [(submitted_objects[i], real_objects[j])
+             for (i, j) in self.max_weight_matching(values)])
 
     def find_unmatched(self, submitted_objects, real_objects, matches):
         """Finds unmatched objects, filtering double-counts by autonomy.
@@ -327,28 +394,26 @@ class OdlcEvaluator(object):
             List of objects which are unmatched after filtering autonomy
             duplicates.
         """
-        # Create a bipartite graph from unsubmitted to real objects with match
-        # values (score ratio) as edge weights. Skip edges with no match value.
-        # Skip edges if not inverse autonomy for existing match.
+        # Assign unsubmitted to real objects with match value, if the real
+        # object is matched to a submission with inverse autonomy.
         remaining_objects = [t for t in submitted_objects if t not in matches]
-        g = nx.Graph()
-        g.add_nodes_from(remaining_objects)
-        g.add_nodes_from(real_objects)
-        for submitted in remaining_objects:
-            for real in real_objects:
-                match_value = self.evaluate_match(submitted, real).score_ratio
-                inverted_autonomy = (
-                    real in matches and
-                    submitted.autonomous != matches[real].autonomous)
-                if match_value and inverted_autonomy:
-                    # We care about minimizing unmatched, not match weight, so
-                    # use weight of 1.
-                    g.add_edge(submitted, real, weight=1)
+        values = self.pair_values(remaining_objects, real_objects)
+        autonomous = np.array(
+            [t.autonomous for t in remaining_objects], dtype=bool)
+        matched = np.array([t in matches for t in real_objects], dtype=bool)
+        matched_autonomous = np.array(
+            [t in matches and matches[t].autonomous for t in real_objects],
+            dtype=bool)
+        inverted_autonomy = matched[np.newaxis, :] & (
+            autonomous[:, np.newaxis] != matched_autonomous[np.newaxis, :])
+        # We care about minimizing unmatched, not match weight, so use weight
+        # of 1.
+        weights = ((values > 0) & inverted_autonomy).astype(np.float64)
         # Compute the matching to find unused objects.
-        unused_match = self.matching_map_from_set(
-            nx.algorithms.matching.max_weight_matching(g))
+        unused = set(remaining_objects[i]
+                     for (i, _) in self.max_weight_matching(weights))
         # Difference between remaining and unused is unmatched.
-        return [t for t in remaining_objects if t not in unused_match]
+        return [t for t in remaining_objects if t not in unused]
 
     def evaluate(self):
         """Evaluates the submitted objects.
@@ -364,7 +429,8 @@ class OdlcEvaluator(object):
             object_eval.score_ratio = 0
             submitted = self.matches.get(real)
             if submitted:
-                object_eval.CopyFrom(self.evaluate_match(submitted, real))
+                object_eval.CopyFrom(self.match_evals[self.submitted_index[
+                    submitted]][self.real_index[real]])
         if self.real_objects:
             multi_eval.matched_score_ratio = sum(
                 [e.score_ratio
@@ -1,6 +1,8 @@
 """Tests for the odlc module."""
 
+import itertools
 import os.path
+import random
 from auvsi_suas.models.aerial_position import AerialPosition
 from auvsi_suas.models.gps_position import GpsPosition
 from auvsi_suas.models.mission_config import MissionConfig
@@ -671,3 +673,110 @@ class TestOdlcEvaluator(TestCase):
         self.assertEqual(7, d.unmatched_odlc_count)
         self.assertAlmostEqual(-0.35, d.score_ratio, places=3)
         self.assertEqual(0, len(d.odlcs))
+
+
+def max_matching_weight(weights):
+    """Gets the max total weight of a bipartite matching by brute force.
+
+    Pairs without weight don't add to the total.
+    """
+    if weights.shape[0] > weights.shape[1]:
+        weights = weights.T
+    (rows, cols) = weights.shape
+    best = 0
+    for perm in itertools.permutations(range(cols), rows):
+        best = max(best,
+                   sum(max(0, weights[i, j]) for (i, j) in enumerate(perm)))
+    return best
+
+
+class CountingOdlcEvaluator(OdlcEvaluator):
+    """OdlcEvaluator which counts pair evaluations."""
+
+    def evaluate_match(self, submitted, real):
+        self.num_evaluated = getattr(self, 'num_evaluated', 0) + 1
+        return super(CountingOdlcEvaluator, self).evaluate_match(
+            submitted, real)
+
+
+class TestOdlcEvaluatorMatching(TestCase):
+    """Tests matching random objects against brute force."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('user', 'email@example.com',
+                                             'pass')
+        self.rand = random.Random(0)
+        self.next_pk = 1
+
+    def random_odlc(self):
+        """Creates an unsaved object with random characteristics."""
+        rand = self.rand
+        odlc = Odlc(
+            pk=self.next_pk,
+            user=self.user,
+            odlc_type=rand.choice([
+                interop_api_pb2.Odlc.STANDARD, interop_api_pb2.Odlc.STANDARD,
+                interop_api_pb2.Odlc.EMERGENT
+            ]),
+            location=GpsPosition(
+                latitude=38 + rand.uniform(0, 5e-4),
+                longitude=-76 + rand.uniform(0, 5e-4)),
+            orientation=rand.choice(
+                [interop_api_pb2.Odlc.N, interop_api_pb2.Odlc.S]),
+            shape=rand.choice(
+                [interop_api_pb2.Odlc.SQUARE, interop_api_pb2.Odlc.CIRCLE]),
+            shape_color=rand.choice(
+                [interop_api_pb2.Odlc.WHITE, interop_api_pb2.Odlc.RED]),
+            alphanumeric=rand.choice(['A', 'B']),
+            alphanumeric_color=rand.choice(
+                [interop_api_pb2.Odlc.BLACK, interop_api_pb2.Odlc.BLUE]),
+            autonomous=rand.random() < 0.5,
+            thumbnail_approved=rand.random() < 0.8)
+        self.next_pk += 1
+        return odlc
+
+    def random_evaluator(self, num_submitted, num_real):
+        return CountingOdlcEvaluator([
+            self.random_odlc() for _ in range(num_submitted)
+        ], [self.random_odlc() for _ in range(num_real)], [])
+
+    def test_random_matches(self):
+        """Tests matches have the max value and minimal unmatched."""
+        for _ in range(100):
+            e = self.random_evaluator(
+                self.rand.randint(0, 5), self.rand.randint(0, 5))
+            self.assertEqual(
+                len(e.submitted_objects) * len(e.real_objects),
+                getattr(e, 'num_evaluated', 0))
+
+            matched_value = sum(
+                e.evaluate_match(s, e.matches[s]).score_ratio
+                for s in e.submitted_objects if s in e.matches)
+            self.assertAlmostEqual(
+                max_matching_weight(e.match_values), matched_value)
+            for s in e.submitted_objects:
+                if s in e.matches:
+                    self.assertIs(s, e.matches[e.matches[s]])
+
+            # Remaining objects can be matched to real objects matched to
+            # the inverse autonomy.
+            remaining = [s for s in e.submitted_objects if s not in e.matches]
+            weights = e.pair_values(remaining, e.real_objects)
+            for (i, s) in enumerate(remaining):
+                for (j, r) in enumerate(e.real_objects):
+                    if (r not in e.matches or
+                            e.matches[r].autonomous == s.autonomous):
+                        weights[i, j] = 0
+            weights = (weights > 0).astype(float)
+            self.assertEqual(
+                len(remaining) - max_matching_weight(weights),
+                len(e.unmatched))
+
+    def test_loadtest(self):
+        """Tests evaluating the max submissions against many objects."""
+        num_submitted = 44
+        num_real = 20
+        e = self.random_evaluator(num_submitted, num_real)
+        d = e.evaluate()
+        self.assertEqual(num_submitted * num_real, e.num_evaluated)
+        self.assertEqual(num_real, len(d.odlcs))
@@ -1,8 +1,12 @@
 """Stationary obstacle model."""
 
 import logging
+import numpy as np
+from auvsi_suas.models import distance
 from auvsi_suas.models.gps_position import GpsPositionMixin
-from auvsi_suas.models.uas_telemetry import UasTelemetry
+from auvsi_suas.models.telemetry_track import MICROSECOND
+from auvsi_suas.models.telemetry_track import TelemetryTrack
+from auvsi_suas.models.uas_telemetry import TELEMETRY_INTERPOLATION_MAX_GAP
 from django.contrib import admin
 from django.core import validators
 from django.db import models
@@ -43,17 +47,105 @@ class StationaryObstacle(GpsPositionMixin):
     def evaluate_collision_with_uas(self, uas_telemetry_logs):
         """Evaluates whether the Uas logs indicate a collision.
 
+        The UAS is considered to fly in a straight line between telemetry
+        which would be interpolated (see UasTelemetry.interpolate), and the
+        intersection of each such segment with the cylinder is solved
+        exactly, rather than checking positions at interpolation steps.
+
         Args:
-            uas_telemetry_logs: A list of UasTelemetry logs sorted by timestamp
-                for which to evaluate.
+            uas_telemetry_logs: A list of UasTelemetry logs sorted by timestamp,
+                or a TelemetryTrack, for which to evaluate.
         Returns:
             Whether a UAS telemetry log reported indicates a collision with the
             obstacle.
         """
-        for log in UasTelemetry.interpolate(uas_telemetry_logs):
-            if self.contains_pos(log):
-                return True
-        return False
+        if not isinstance(uas_telemetry_logs, TelemetryTrack):
+            uas_telemetry_logs = TelemetryTrack.from_logs(uas_telemetry_logs)
+        track = uas_telemetry_logs
+        if len(track) == 0 or not self.may_reach_track(track):
+            return False
+
+        # Project into the plane tangent at the obstacle, in feet.
+        (x, y) = distance.tangent_plane(track.latitude, track.longitude,
+                                        self.latitude, self.longitude)
+        z = track.altitude_msl
+
+        # Check each telemetry.
+        inside = ((x**2 + y**2 <= self.cylinder_radius**2) &
+                  (z <= self.cylinder_height))
+        if np.any(inside):
+            return True
+
+        # Check segments between telemetry which would be interpolated.
+        dt_us = np.diff(track.t_us)
+        max_gap_us = TELEMETRY_INTERPOLATION_MAX_GAP // MICROSECOND
+        seg = np.nonzero((dt_us > 0) & (dt_us <= max_gap_us))[0]
+        (x0, y0, z0) = (x[seg], y[seg], z[seg])
+        (dx, dy, dz) = (x[seg + 1] - x0, y[seg + 1] - y0, z[seg + 1] - z0)
+        return bool(np.any(self.segments_intersect(x0, y0, z0, dx, dy, dz)))
+
+    def may_reach_track(self, track):
+        """Whether the obstacle's bounding box overlaps the track's.
+
+        A cheap check to skip tracks which can't collide with the obstacle.
+
+        Args:
+            track: A non-empty TelemetryTrack.
+        Returns:
+            False if the track can't collide with the obstacle.
+        """
+        if track.altitude_msl.min() > self.cylinder_height:
+            return False
+        # Degrees of latitude and longitude covered by the radius.
+        (lon_ft, lat_ft) = distance.tangent_plane(
+            self.latitude + 1, self.longitude + 1, self.latitude,
+            self.longitude)
+        # Pad for the error of the tangent plane.
+        lat_deg = 1.01 * self.cylinder_radius / lat_ft
+        lon_deg = 1.01 * self.cylinder_radius / lon_ft
+        return (track.latitude.min() <= self.latitude + lat_deg and
+                track.latitude.max() >= self.latitude - lat_deg and
+                track.longitude.min() <= self.longitude + lon_deg and
+                track.longitude.max() >= self.longitude - lon_deg)
+
+    def segments_intersect(self, x0, y0, z0, dx, dy, dz):
+        """Whether line segments intersect the obstacle.
+
+        Segments are p(s) = p0 + s * d for s in [0, 1], in the plane tangent
+        at the obstacle, in feet. A segment intersects if for some s the
+        horizontal distance is within the radius and the altitude is within
+        the height. Each condition holds on an interval of s, solved in
+        closed form, and the segment intersects if the intervals overlap.
+
+        Args:
+            x0, y0, z0: Arrays of segment starts.
+            dx, dy, dz: Arrays of segment directions.
+        Returns:
+            Array of whether each segment intersects.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Altitude: z0 + s * dz <= height.
+            s_z = (self.cylinder_height - z0) / dz
+            z_lo = np.where(dz < 0, s_z, -np.inf)
+            z_hi = np.where(dz > 0, s_z, np.inf)
+            z_hi = np.where((dz == 0) & (z0 > self.cylinder_height), -np.inf,
+                            z_hi)
+
+            # Horizontal: a * s^2 + b * s + c <= 0.
+            a = dx**2 + dy**2
+            b = 2 * (x0 * dx + y0 * dy)
+            c = x0**2 + y0**2 - self.cylinder_radius**2
+            root = np.sqrt(b**2 - 4 * a * c)
+            r_lo = (-b - root) / (2 * a)
+            r_hi = (-b + root) / (2 * a)
+            # Without horizontal movement, it's inside for all or no s.
+            r_lo = np.where(a == 0, np.where(c <= 0, -np.inf, np.inf), r_lo)
+            r_hi = np.where(a == 0, np.where(c <= 0, np.inf, -np.inf), r_hi)
+
+            lo = np.maximum(np.maximum(z_lo, r_lo), 0)
+            hi = np.minimum(np.minimum(z_hi, r_hi), 1)
+            # NaN roots (no real solution) compare False.
+            return lo <= hi
 
 
 @admin.register(StationaryObstacle)
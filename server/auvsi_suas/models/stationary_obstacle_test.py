@@ -1,12 +1,18 @@
 """Tests for the stationary_obstacle module."""
 
+import math
+import numpy as np
+import random
+from auvsi_suas.models import distance
 from auvsi_suas.models.aerial_position import AerialPosition
 from auvsi_suas.models.gps_position import GpsPosition
 from auvsi_suas.models.stationary_obstacle import StationaryObstacle
+from auvsi_suas.models.telemetry_track import TelemetryTrack
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from datetime import timedelta
 from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
 
 
 class TestStationaryObstacleModel(TestCase):
@@ -140,3 +146,164 @@ class TestStationaryObstacleModel(TestCase):
             (45.4338393, -71.8523446, 769.881926415),
         ])
         self.assertFalse(obst.evaluate_collision_with_uas(logs))
+
+
+class TestStationaryObstacleSegments(TestCase):
+    """Tests collisions between telemetry."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.now = timezone.now()
+        self.obst = StationaryObstacle(
+            latitude=38,
+            longitude=-76,
+            cylinder_radius=100,
+            cylinder_height=200)
+
+    def telemetry(self, entries):
+        """Creates unsaved telemetry from (t, lat, lon, alt) tuples."""
+        return [
+            UasTelemetry(
+                user=self.user,
+                timestamp=self.now + timedelta(seconds=t),
+                latitude=lat,
+                longitude=lon,
+                altitude_msl=alt,
+                uas_heading=0) for (t, lat, lon, alt) in entries
+        ]
+
+    def assertCollision(self, expect, entries):
+        logs = self.telemetry(entries)
+        self.assertEqual(expect, self.obst.evaluate_collision_with_uas(logs))
+        self.assertEqual(expect,
+                         self.obst.evaluate_collision_with_uas(
+                             TelemetryTrack.from_logs(logs)))
+
+    def test_through(self):
+        """Tests flying through the obstacle between telemetry."""
+        # About 365 ft either side of the obstacle.
+        self.assertCollision(True, [
+            (0, 37.999, -76, 100),
+            (1, 38.001, -76, 100),
+        ])
+        # Faster than the interpolation step.
+        self.assertCollision(True, [
+            (0, 37.999, -76, 100),
+            (0.05, 38.001, -76, 100),
+        ])
+        # Beyond the max interpolation gap.
+        self.assertCollision(False, [
+            (0, 37.999, -76, 100),
+            (10, 38.001, -76, 100),
+        ])
+        # Over the obstacle.
+        self.assertCollision(False, [
+            (0, 37.999, -76, 300),
+            (1, 38.001, -76, 300),
+        ])
+
+    def test_graze(self):
+        """Tests flying just inside and outside the radius."""
+        # About 98 ft and 103 ft from the center.
+        self.assertCollision(True, [
+            (0, 37.999, -75.99966, 100),
+            (1, 38.001, -75.99966, 100),
+        ])
+        self.assertCollision(False, [
+            (0, 37.999, -75.99964, 100),
+            (1, 38.001, -75.99964, 100),
+        ])
+
+    def test_climb_and_descend(self):
+        """Tests segments changing altitude while crossing the obstacle."""
+        # Below the height while horizontally inside.
+        self.assertCollision(True, [
+            (0, 37.9995, -76, 0),
+            (1, 38.0005, -76, 300),
+        ])
+        # Only below the height after passing the obstacle.
+        self.assertCollision(False, [
+            (0, 37.999, -76, 1000),
+            (1, 38.001, -76, 0),
+        ])
+
+    def test_hover(self):
+        """Tests segments without horizontal movement."""
+        self.assertCollision(True, [
+            (0, 38, -76, 300),
+            (1, 38, -76, 100),
+        ])
+        self.assertCollision(False, [
+            (0, 38.001, -76, 300),
+            (1, 38.001, -76, 100),
+        ])
+
+    def test_may_reach_track(self):
+        """Tests pruning tracks far from the obstacle."""
+        near = TelemetryTrack.from_logs(
+            self.telemetry([(0, 38.0002, -76.0002, 100)]))
+        far = TelemetryTrack.from_logs(
+            self.telemetry([(0, 38.01, -76.01, 100)]))
+        high = TelemetryTrack.from_logs(self.telemetry([(0, 38, -76, 300)]))
+        self.assertTrue(self.obst.may_reach_track(near))
+        self.assertFalse(self.obst.may_reach_track(far))
+        self.assertFalse(self.obst.may_reach_track(high))
+
+    def random_logs(self, num, rand):
+        """Creates random telemetry near the obstacle."""
+        entries = []
+        t = 0
+        for _ in range(num):
+            t += rand.choice([0.05, 0.5, 1, 10])
+            entries.append((t, 38 + rand.uniform(-0.001, 0.001),
+                            -76 + rand.uniform(-0.001, 0.001), rand.uniform(
+                                0, 400)))
+        return self.telemetry(entries)
+
+    def test_matches_interpolation(self):
+        """Tests collisions at interpolated telemetry are found."""
+        rand = random.Random(0)
+        for _ in range(200):
+            logs = self.random_logs(3, rand)
+            interpolated = any(
+                self.obst.contains_pos(log)
+                for log in UasTelemetry.interpolate(logs))
+            if interpolated:
+                self.assertTrue(self.obst.evaluate_collision_with_uas(logs))
+
+    def test_loadtest(self):
+        """Tests evaluating obstacles against an hour of flight."""
+        # Circle the obstacles at 1 Hz, missing them all.
+        rand = random.Random(0)
+        num_logs = 60 * 60
+        logs = []
+        for i in range(num_logs):
+            angle = i * 0.1
+            logs.append(
+                UasTelemetry(
+                    user=self.user,
+                    timestamp=self.now + timedelta(seconds=i),
+                    latitude=38 + 0.004 * math.sin(angle),
+                    longitude=-76 + 0.004 * math.cos(angle),
+                    altitude_msl=rand.uniform(0, 400),
+                    uas_heading=0))
+        track = TelemetryTrack.from_logs(logs)
+        obstacles = [
+            StationaryObstacle(
+                latitude=38 + rand.uniform(-0.002, 0.002),
+                longitude=-76 + rand.uniform(-0.002, 0.002),
+                cylinder_radius=100,
+                cylinder_height=500) for _ in range(20)
+        ]
+
+        for obst in obstacles:
+            self.assertFalse(obst.evaluate_collision_with_uas(track))
+
+        # Compare against checking each interpolated position.
+        interpolated = UasTelemetry.interpolate(track)
+        for obst in obstacles:
+            dists = distance.distance_to_many(interpolated.latitude,
+                                              interpolated.longitude, 0,
+                                              obst.latitude, obst.longitude, 0)
+            self.assertFalse(np.any(dists <= obst.cylinder_radius))
@@ -0,0 +1,210 @@
+"""Cache of the latest telemetry and in-air status of each team.
+
+Team status endpoints poll the latest telemetry and takeoff/landing status of
+every team, which would otherwise be two queries per team. The status is kept
+in the shared Django cache, so all server processes see the same values. Saved
+telemetry and changed takeoff/landing events update the cached status via
+model signals. Deleted telemetry is not tracked, as a delete signal would
+prevent fast bulk deletes, so it may be reported until the cache times out.
+Telemetry stored with bulk_create() does not send signals,
+so it must be passed to telemetry_saved(). Status changes are also published
+to the team_status_hub, which wakes team status streams.
+"""
+
+import collections
+import logging
+from auvsi_suas.models import team_status_hub
+from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds after which cached status is reloaded. Bounds the staleness
+# if the database is changed without sending signals.
+CACHE_TIMEOUT = 5 * 60
+
+# Cache keys for a user's latest telemetry and in-air status.
+TELEMETRY_KEY = 'team_status/telemetry/%d'
+IN_AIR_KEY = 'team_status/in_air/%d'
+# Cache keys for the hit and miss counters.
+HITS_KEY = 'team_status/hits'
+MISSES_KEY = 'team_status/misses'
+
+# Cached in place of telemetry for users without telemetry.
+NO_TELEMETRY = 'none'
+
+# Status of a team. The telemetry is an unsaved UasTelemetry, or None.
+TeamStatus = collections.namedtuple('TeamStatus', ['in_air', 'telemetry'])
+
+
+def telemetry_to_cache(telemetry):
+    """Converts telemetry to the cached value."""
+    if telemetry is None:
+        return NO_TELEMETRY
+    return (telemetry.pk, telemetry.timestamp, telemetry.latitude,
+            telemetry.longitude, telemetry.altitude_msl, telemetry.uas_heading)
+
+
+def telemetry_from_cache(user, value):
+    """Converts the cached value to telemetry."""
+    if value == NO_TELEMETRY:
+        return None
+    (pk, timestamp, latitude, longitude, altitude_msl, uas_heading) = value
+    return UasTelemetry(
+        pk=pk,
+        user=user,
+        timestamp=timestamp,
+        latitude=latitude,
+        longitude=longitude,
+        altitude_msl=altitude_msl,
+        uas_heading=uas_heading)
+
+
+def count(key, delta):
+    """Increments the counter by delta."""
+    if delta <= 0:
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Counter was evicted between add and incr.
+        cache.add(key, delta, timeout=None)
+
+
+def team_statuses(users):
+    """Gets the status of each team.
+
+    Cached statuses are read with a single cache request. Statuses which are
+    not cached are loaded from the database and cached.
+
+    Args:
+        users: The users to get status for.
+    Returns:
+        A dict of user pk to TeamStatus.
+    """
+    keys = []
+    for user in users:
+        keys.append(TELEMETRY_KEY % user.pk)
+        keys.append(IN_AIR_KEY % user.pk)
+    cached = cache.get_many(keys)
+    count(HITS_KEY, len(cached))
+    count(MISSES_KEY, len(keys) - len(cached))
+
+    statuses = {}
+    missing = {}
+    missing_in_air = {}
+    for user in users:
+        telemetry_key = TELEMETRY_KEY % user.pk
+        if telemetry_key in cached:
+            telemetry = telemetry_from_cache(user, cached[telemetry_key])
+        else:
+            telemetry = UasTelemetry.last_for_user(user)
+            missing[telemetry_key] = telemetry_to_cache(telemetry)
+
+        in_air_key = IN_AIR_KEY % user.pk
+        if in_air_key in cached:
+            in_air = cached[in_air_key]
+        else:
+            in_air = TakeoffOrLandingEvent.user_in_air(user)
+            missing_in_air[in_air_key] = in_air
+
+        statuses[user.pk] = TeamStatus(in_air=in_air, telemetry=telemetry)
+
+    if missing:
+        cache.set_many(missing, timeout=CACHE_TIMEOUT)
+    # An event may change while the status is loaded, and the signal caches
+    # the new status. So the loaded status is only cached if it's still
+    # missing, rather than replacing the new status.
+    for key, in_air in missing_in_air.items():
+        cache.add(key, in_air, timeout=CACHE_TIMEOUT)
+    return statuses
+
+
+def team_status(user):
+    """Gets the TeamStatus of the team."""
+    return team_statuses([user])[user.pk]
+
+
+def telemetry_saved(telemetry):
+    """Updates cached status for saved telemetry.
+
+    Args:
+        telemetry: A list of saved UasTelemetry.
+    """
+    if telemetry:
+        team_status_hub.publish()
+
+    # Find the latest of the saved telemetry for each user.
+    latest = {}
+    for t in telemetry:
+        if t.user_id not in latest or t.timestamp >= latest[t.
+                                                            user_id].timestamp:
+            latest[t.user_id] = t
+
+    for user_id, t in latest.items():
+        key = TELEMETRY_KEY % user_id
+        if t.pk is None:
+            # Some databases don't set the pk from bulk_create(), so reload.
+            cache.delete(key)
+            continue
+        value = cache.get(key)
+        if value is None:
+            # Not cached, so we don't know if this is the latest.
+            continue
+        if value == NO_TELEMETRY or value[1] <= t.timestamp:
+            cache.set(key, telemetry_to_cache(t), timeout=CACHE_TIMEOUT)
+        elif value[0] == t.pk:
+            # The cached telemetry moved back in time, so reload.
+            cache.delete(key)
+
+
+def in_air_changed(user_id):
+    """Caches the in-air status of the user, after an event changed."""
+    in_air = TakeoffOrLandingEvent.user_in_air(User(pk=user_id))
+    cache.set(IN_AIR_KEY % user_id, in_air, timeout=CACHE_TIMEOUT)
+    team_status_hub.publish()
+
+
+def clear_user(user_id):
+    """Clears all cached status for the user."""
+    cache.delete_many([TELEMETRY_KEY % user_id, IN_AIR_KEY % user_id])
+
+
+def stats():
+    """Gets the cache hit and miss counters.
+
+    Returns:
+        A dict with the number of cache hits and misses.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+    }
+
+
+@receiver(post_save, sender=UasTelemetry)
+def on_telemetry_save(sender, instance, **kwargs):
+    telemetry_saved([instance])
+
+
+@receiver(post_save, sender=TakeoffOrLandingEvent)
+@receiver(post_delete, sender=TakeoffOrLandingEvent)
+def on_takeoff_or_landing_event_change(sender, instance, **kwargs):
+    # Other connections only see the change once committed.
+    user_id = instance.user_id
+    transaction.on_commit(lambda: in_air_changed(user_id))
+
+
+@receiver(post_save, sender=User)
+def on_user_save(sender, instance, created, **kwargs):
+    # Database ids may be reused, so new users can't have cached status.
+    if created:
+        clear_user(instance.pk)
@@ -0,0 +1,165 @@
+"""Tests for the team_status_cache module."""
+
+import datetime
+from auvsi_suas.models import team_status_cache
+from auvsi_suas.models.gps_position import GpsPosition
+from auvsi_suas.models.mission_config import MissionConfig
+from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+
+class TestTeamStatusCacheCommon(object):
+    """Common setup for team status cache tests."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.user.save()
+
+        pos = GpsPosition(latitude=10, longitude=100)
+        pos.save()
+        self.mission = MissionConfig(
+            home_pos=pos,
+            lost_comms_pos=pos,
+            emergent_last_known_pos=pos,
+            off_axis_odlc_pos=pos,
+            air_drop_pos=pos,
+            ugv_drive_pos=pos)
+        self.mission.save()
+
+        self.now = timezone.now()
+
+
+class TestTeamStatusCache(TestTeamStatusCacheCommon, TestCase):
+    """Tests the team status cache."""
+
+    def create_telemetry(self, timestamp, latitude=10):
+        telemetry = UasTelemetry(
+            user=self.user,
+            timestamp=timestamp,
+            latitude=latitude,
+            longitude=100,
+            altitude_msl=200,
+            uas_heading=90)
+        telemetry.save()
+        return telemetry
+
+    def assertCachedTelemetry(self, expected):
+        """Asserts the cached telemetry is expected, without queries."""
+        with self.assertNumQueries(0):
+            telemetry = team_status_cache.team_status(self.user).telemetry
+        if expected is None:
+            self.assertIsNone(telemetry)
+            return
+        self.assertEqual(expected.pk, telemetry.pk)
+        self.assertEqual(expected.timestamp, telemetry.timestamp)
+        self.assertTrue(expected.duplicate(telemetry))
+
+    def test_no_data(self):
+        """Tests the status of a team without data."""
+        status = team_status_cache.team_status(self.user)
+        self.assertFalse(status.in_air)
+        self.assertIsNone(status.telemetry)
+        self.assertCachedTelemetry(None)
+
+    def test_hits_misses(self):
+        """Tests the hit and miss counters."""
+        self.assertEqual({'hits': 0, 'misses': 0}, team_status_cache.stats())
+        team_status_cache.team_status(self.user)
+        self.assertEqual({'hits': 0, 'misses': 2}, team_status_cache.stats())
+        team_status_cache.team_status(self.user)
+        self.assertEqual({'hits': 2, 'misses': 2}, team_status_cache.stats())
+
+    def test_telemetry_saved(self):
+        """Tests saved telemetry updates the cache."""
+        team_status_cache.team_status(self.user)
+        t1 = self.create_telemetry(self.now)
+        self.assertCachedTelemetry(t1)
+        t2 = self.create_telemetry(self.now + datetime.timedelta(seconds=1))
+        self.assertCachedTelemetry(t2)
+
+        # Older telemetry doesn't replace newer telemetry.
+        self.create_telemetry(self.now - datetime.timedelta(seconds=1))
+        self.assertCachedTelemetry(t2)
+
+        # Latest telemetry moving back in time is reloaded.
+        t2.timestamp = self.now - datetime.timedelta(seconds=2)
+        t2.save()
+        self.assertEqual(t1.pk,
+                         team_status_cache.team_status(self.user).telemetry.pk)
+        self.assertCachedTelemetry(t1)
+
+    def test_telemetry_bulk_saved(self):
+        """Tests telemetry saved with bulk_create updates the cache."""
+        team_status_cache.team_status(self.user)
+        telemetry = [
+            UasTelemetry(
+                user=self.user,
+                timestamp=self.now + datetime.timedelta(seconds=i),
+                latitude=i,
+                longitude=100,
+                altitude_msl=200,
+                uas_heading=90) for i in range(1, 4)
+        ]
+        UasTelemetry.objects.bulk_create(telemetry)
+        team_status_cache.telemetry_saved(telemetry)
+
+        latest = team_status_cache.team_status(self.user).telemetry
+        self.assertEqual(3, latest.latitude)
+        self.assertEqual(UasTelemetry.last_for_user(self.user).pk, latest.pk)
+
+    def test_new_user(self):
+        """Tests cached status isn't used for new users."""
+        cache.set(team_status_cache.IN_AIR_KEY % (self.user.pk + 1), True)
+        user = User.objects.create_user('testuser2', 'testemail@x.com',
+                                        'testpass')
+        self.assertEqual(self.user.pk + 1, user.pk)
+        self.assertFalse(team_status_cache.team_status(user).in_air)
+
+
+class TestTeamStatusCacheEvents(TestTeamStatusCacheCommon,
+                                TransactionTestCase):
+    """Tests the cache of takeoff and landing events.
+
+    Events update the cache once committed, so tests aren't run in a
+    transaction.
+    """
+
+    def test_in_air(self):
+        """Tests takeoff and landing events update the cache."""
+        self.assertFalse(team_status_cache.team_status(self.user).in_air)
+
+        event = TakeoffOrLandingEvent(
+            user=self.user, mission=self.mission, uas_in_air=True)
+        event.save()
+        self.assertTrue(team_status_cache.team_status(self.user).in_air)
+
+        event.delete()
+        self.assertFalse(team_status_cache.team_status(self.user).in_air)
+
+    def test_in_air_changed_while_loading(self):
+        """Tests status loaded before an event doesn't replace the change."""
+        user_in_air = TakeoffOrLandingEvent.user_in_air
+        self.addCleanup(setattr, TakeoffOrLandingEvent, 'user_in_air',
+                        TakeoffOrLandingEvent.__dict__['user_in_air'])
+        changed = []
+
+        def load_then_change(user, time=None):
+            in_air = user_in_air(user, time)
+            # The change's signal loads the status again.
+            if not changed:
+                changed.append(True)
+                TakeoffOrLandingEvent(
+                    user=self.user, mission=self.mission,
+                    uas_in_air=True).save()
+            return in_air
+
+        TakeoffOrLandingEvent.user_in_air = staticmethod(load_then_change)
+        self.assertFalse(team_status_cache.team_status(self.user).in_air)
+        self.assertTrue(team_status_cache.team_status(self.user).in_air)
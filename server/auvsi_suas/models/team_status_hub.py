@@ -0,0 +1,68 @@
+"""Publish/subscribe hub of team status changes.
+
+Streams of team status wait on the hub for new telemetry or takeoff/landing
+events, instead of polling the status of every team. Saved telemetry and
+events are published to the hub of the process which saved them, which wakes
+that process's subscribers at once. Server processes don't share memory, so
+each publish also increments a version counter in the shared Django cache,
+which subscribers check while waiting to see changes saved by other processes.
+"""
+
+import logging
+import threading
+import time
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Cache key for the version of the team statuses.
+VERSION_KEY = 'team_status/version'
+
+# Time in seconds between checks for changes published by other processes.
+CHECK_INTERVAL_SEC = 0.5
+
+# Notified when changes are published by this process.
+_condition = threading.Condition()
+# Number of changes published by this process.
+_published = 0
+
+
+def version():
+    """Gets the version of the team statuses, changed by each publish."""
+    return cache.get(VERSION_KEY, 0)
+
+
+def publish():
+    """Publishes a change to team statuses, waking all subscribers."""
+    global _published
+    cache.add(VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Version was evicted between add and incr.
+        cache.add(VERSION_KEY, 1, timeout=None)
+    with _condition:
+        _published += 1
+        _condition.notify_all()
+
+
+def wait(last_version, timeout):
+    """Waits for a change to team statuses.
+
+    Args:
+        last_version: The version() last seen by the subscriber.
+        timeout: Max time in seconds to wait.
+    Returns:
+        The current version, which equals last_version if the wait timed out.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        # Read before the version, so a publish in between isn't missed.
+        published = _published
+        current = version()
+        remaining = deadline - time.monotonic()
+        if current != last_version or remaining <= 0:
+            return current
+        with _condition:
+            _condition.wait_for(lambda: _published != published,
+                                min(remaining, CHECK_INTERVAL_SEC))
@@ -0,0 +1,56 @@
+"""Tests for the team_status_hub module."""
+
+import threading
+import time
+from auvsi_suas.models import team_status_hub
+from django.core.cache import cache
+from django.test import TestCase
+
+
+class TestTeamStatusHub(TestCase):
+    """Tests the team status hub."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_publish(self):
+        """Tests publishing changes the version."""
+        version = team_status_hub.version()
+        team_status_hub.publish()
+        self.assertNotEqual(version, team_status_hub.version())
+
+    def test_wait_changed(self):
+        """Tests waiting returns at once if the version changed."""
+        version = team_status_hub.version()
+        team_status_hub.publish()
+        start_t = time.monotonic()
+        self.assertEqual(team_status_hub.version(),
+                         team_status_hub.wait(version, 10))
+        self.assertLess(time.monotonic() - start_t, 1)
+
+    def test_wait_timeout(self):
+        """Tests waiting without changes times out."""
+        version = team_status_hub.version()
+        start_t = time.monotonic()
+        self.assertEqual(version, team_status_hub.wait(version, 0.2))
+        self.assertGreaterEqual(time.monotonic() - start_t, 0.2)
+
+    def test_wait_published(self):
+        """Tests waiting wakes when another thread publishes."""
+        version = team_status_hub.version()
+        timer = threading.Timer(0.1, team_status_hub.publish)
+        timer.start()
+        start_t = time.monotonic()
+        self.assertNotEqual(version, team_status_hub.wait(version, 10))
+        self.assertLess(time.monotonic() - start_t,
+                        team_status_hub.CHECK_INTERVAL_SEC)
+        timer.join()
+
+    def test_wait_other_process(self):
+        """Tests waiting sees changes to the version by other processes."""
+        version = team_status_hub.version()
+        timer = threading.Timer(
+            0.1, lambda: cache.set(team_status_hub.VERSION_KEY, version + 1))
+        timer.start()
+        self.assertEqual(version + 1, team_status_hub.wait(version, 10))
+        timer.join()
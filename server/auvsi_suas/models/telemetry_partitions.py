@@ -0,0 +1,202 @@
+"""Time partitioning of UasTelemetry storage.
+
+On PostgreSQL, the UasTelemetry table is partitioned by range of timestamp,
+with a partition per UTC day and a default partition for telemetry outside of
+the daily partitions. Queries which filter by timestamp, like
+AccessLogMixin.by_user() with a start or end time, only scan the partitions
+overlapping the time range. Partitions for past days can be archived to
+compressed files and later restored for evaluation.
+
+Other databases store UasTelemetry in a single table.
+"""
+
+import datetime
+import gzip
+import logging
+import os
+import re
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.db import connection
+from django.db import transaction
+from django.db.transaction import TransactionManagementError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Minimum PostgreSQL version, for default partitions and partitioned indexes.
+MIN_POSTGRES_VERSION = 110000
+
+# Table which is partitioned.
+TABLE = UasTelemetry._meta.db_table
+# Partition for telemetry without a daily partition.
+DEFAULT_PARTITION = TABLE + '_default'
+# Daily partitions are named with the prefix and the day.
+PARTITION_PREFIX = TABLE + '_p'
+PARTITION_DAY_FORMAT = '%Y%m%d'
+PARTITION_RE = re.compile('^' + re.escape(PARTITION_PREFIX) + r'(\d{8})$')
+# Suffix of archived partitions.
+ARCHIVE_SUFFIX = '.csv.gz'
+
+
+def supported():
+    """Whether the database supports partitioning."""
+    return (connection.vendor == 'postgresql' and
+            connection.pg_version >= MIN_POSTGRES_VERSION)
+
+
+def partition_name(day):
+    """Gets the partition name for the day."""
+    return PARTITION_PREFIX + day.strftime(PARTITION_DAY_FORMAT)
+
+
+def partition_day(name):
+    """Gets the day of the partition name, or None if not a daily partition."""
+    match = PARTITION_RE.match(name)
+    if not match:
+        return None
+    return datetime.datetime.strptime(match.group(1),
+                                      PARTITION_DAY_FORMAT).date()
+
+
+def partition_bounds(day):
+    """Gets the (inclusive start, exclusive end) UTC time bounds of the day."""
+    start = datetime.datetime.combine(day, datetime.time()).replace(
+        tzinfo=timezone.utc)
+    return (start, start + datetime.timedelta(days=1))
+
+
+def archive_path(directory, day):
+    """Gets the path of the archive of the day's partition."""
+    return os.path.join(directory, partition_name(day) + ARCHIVE_SUFFIX)
+
+
+def is_partitioned():
+    """Whether the UasTelemetry table is partitioned."""
+    if not supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table p '
+                       'JOIN pg_class c ON c.oid = p.partrelid '
+                       'WHERE c.relname = %s', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partition_days():
+    """Gets the sorted days which have a partition."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT c.relname FROM pg_inherits i '
+                       'JOIN pg_class c ON c.oid = i.inhrelid '
+                       'JOIN pg_class p ON p.oid = i.inhparent '
+                       'WHERE p.relname = %s', [TABLE])
+        days = [partition_day(row[0]) for row in cursor.fetchall()]
+    return sorted(day for day in days if day is not None)
+
+
+def create_partition(day):
+    """Creates the partition for the day, if it doesn't exist.
+
+    Telemetry for the day in the default partition is moved to the new
+    partition.
+
+    Args:
+        day: The date of the partition.
+    Returns:
+        Whether the partition was created.
+    """
+    if day in partition_days():
+        return False
+    name = partition_name(day)
+    (start, end) = partition_bounds(day)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # The default partition can't hold rows for a new partition's range,
+        # so detach it while moving those rows.
+        cursor.execute('ALTER TABLE %s DETACH PARTITION %s' %
+                       (TABLE, DEFAULT_PARTITION))
+        cursor.execute(
+            'CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%%s) TO (%%s)' %
+            (name, TABLE), [start, end])
+        cursor.execute(
+            'WITH moved AS (DELETE FROM %s '
+            'WHERE "timestamp" >= %%s AND "timestamp" < %%s RETURNING *) '
+            'INSERT INTO %s SELECT * FROM moved' % (DEFAULT_PARTITION,
+                                                    name), [start, end])
+        cursor.execute('ALTER TABLE %s ATTACH PARTITION %s DEFAULT' %
+                       (TABLE, DEFAULT_PARTITION))
+    logger.info('Created partition %s.', name)
+    return True
+
+
+def create_partitions(days_ahead=1):
+    """Creates the partitions for today and the given number of days ahead.
+
+    Returns:
+        The days for which partitions were created.
+    """
+    today = timezone.now().astimezone(timezone.utc).date()
+    created = []
+    for i in range(days_ahead + 1):
+        day = today + datetime.timedelta(days=i)
+        if create_partition(day):
+            created.append(day)
+    return created
+
+
+def archive_partition(day, directory):
+    """Archives the day's partition to a compressed file and drops it.
+
+    Args:
+        day: The date of the partition.
+        directory: The directory to write the archive to.
+    Returns:
+        The path of the archive.
+    Raises:
+        ValueError: The day has no partition, or it has not ended.
+        TransactionManagementError: Called within a transaction, whose
+            pending constraint checks would prevent dropping the partition.
+    """
+    if connection.in_atomic_block:
+        raise TransactionManagementError(
+            'Partitions must be archived outside of a transaction.')
+    if day not in partition_days():
+        raise ValueError('No partition for %s.' % day)
+    (_, end) = partition_bounds(day)
+    if end > timezone.now():
+        raise ValueError('Partition for %s is not closed.' % day)
+
+    name = partition_name(day)
+    path = archive_path(directory, day)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE %s IN ACCESS EXCLUSIVE MODE' % name)
+        with gzip.open(path, 'wt') as f:
+            cursor.copy_expert('COPY %s TO STDOUT WITH CSV HEADER' % name, f)
+        cursor.execute('ALTER TABLE %s DETACH PARTITION %s' % (TABLE, name))
+        cursor.execute('DROP TABLE %s' % name)
+    logger.info('Archived partition %s to %s.', name, path)
+    return path
+
+
+def restore_partition(path):
+    """Restores an archived partition.
+
+    Args:
+        path: The path of the archive.
+    Returns:
+        The day of the restored partition.
+    Raises:
+        ValueError: The path is not an archive, or the partition exists.
+    """
+    filename = os.path.basename(path)
+    if not filename.endswith(ARCHIVE_SUFFIX):
+        raise ValueError('Not a partition archive: %s' % path)
+    day = partition_day(filename[:-len(ARCHIVE_SUFFIX)])
+    if day is None:
+        raise ValueError('Not a partition archive: %s' % path)
+
+    name = partition_name(day)
+    with transaction.atomic():
+        if not create_partition(day):
+            raise ValueError('Partition %s already exists.' % name)
+        with connection.cursor() as cursor, gzip.open(path, 'rt') as f:
+            cursor.copy_expert('COPY %s FROM STDIN WITH CSV HEADER' % name, f)
+    logger.info('Restored partition %s from %s.', name, path)
+    return day
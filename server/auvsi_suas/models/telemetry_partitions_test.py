@@ -0,0 +1,240 @@
+"""Tests for the telemetry_partitions module."""
+
+import datetime
+import os
+import shutil
+import tempfile
+import time
+from auvsi_suas.models import telemetry_partitions
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db import transaction
+from django.db.transaction import TransactionManagementError
+from django.test import TestCase
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+
+class TestPartitionNames(TestCase):
+    """Tests partition names and bounds."""
+
+    def test_partition_name(self):
+        """Tests the name and day of partitions."""
+        day = datetime.date(2019, 10, 14)
+        name = telemetry_partitions.partition_name(day)
+        self.assertEqual('auvsi_suas_uastelemetry_p20191014', name)
+        self.assertEqual(day, telemetry_partitions.partition_day(name))
+        self.assertIsNone(
+            telemetry_partitions.partition_day(
+                telemetry_partitions.DEFAULT_PARTITION))
+
+    def test_partition_bounds(self):
+        """Tests the partition bounds are the UTC day."""
+        (start, end) = telemetry_partitions.partition_bounds(
+            datetime.date(2019, 10, 14))
+        self.assertEqual(
+            datetime.datetime(2019, 10, 14, tzinfo=timezone.utc), start)
+        self.assertEqual(
+            datetime.datetime(2019, 10, 15, tzinfo=timezone.utc), end)
+
+    def test_archive_path(self):
+        """Tests the archive path."""
+        self.assertEqual('/tmp/auvsi_suas_uastelemetry_p20191014.csv.gz',
+                         telemetry_partitions.archive_path(
+                             '/tmp', datetime.date(2019, 10, 14)))
+
+
+class TestTelemetryPartitionsCommon(TransactionTestCase):
+    """Common code for tests using telemetry.
+
+    Partitions are archived outside of transactions, so tests aren't run in a
+    transaction.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.user.save()
+
+    def tearDown(self):
+        # Partitions aren't removed by the flush between tests.
+        if not telemetry_partitions.supported():
+            return
+        with connection.cursor() as cursor:
+            for day in telemetry_partitions.partition_days():
+                cursor.execute(
+                    'DROP TABLE %s' % telemetry_partitions.partition_name(day))
+
+    def create_telemetry(self, start, num, delta):
+        """Creates telemetry at times starting at start and spaced by delta."""
+        UasTelemetry.objects.bulk_create([
+            UasTelemetry(
+                user=self.user,
+                timestamp=start + i * delta,
+                latitude=38,
+                longitude=-76,
+                altitude_msl=100,
+                uas_heading=i % 360) for i in range(num)
+        ])
+
+
+class TestTelemetryPartitions(TestTelemetryPartitionsCommon):
+    """Tests partition management, which requires PostgreSQL."""
+
+    def setUp(self):
+        if not telemetry_partitions.supported():
+            self.skipTest('Partitioning requires PostgreSQL.')
+        super(TestTelemetryPartitions, self).setUp()
+        self.archive_dir = tempfile.mkdtemp()
+        self.day = datetime.date(2019, 10, 14)
+        (self.start,
+         self.end) = telemetry_partitions.partition_bounds(self.day)
+
+    def tearDown(self):
+        shutil.rmtree(self.archive_dir)
+        super(TestTelemetryPartitions, self).tearDown()
+
+    def test_is_partitioned(self):
+        """Tests the migration partitioned the table."""
+        self.assertTrue(telemetry_partitions.is_partitioned())
+
+    def test_create_partition(self):
+        """Tests creating a partition moves telemetry from the default."""
+        self.create_telemetry(self.start, 10, datetime.timedelta(hours=1))
+        self.assertNotIn(self.day, telemetry_partitions.partition_days())
+
+        self.assertTrue(telemetry_partitions.create_partition(self.day))
+        self.assertIn(self.day, telemetry_partitions.partition_days())
+        self.assertFalse(telemetry_partitions.create_partition(self.day))
+        self.assertEqual(10, UasTelemetry.by_user(self.user).count())
+
+    def test_create_partitions(self):
+        """Tests creating partitions for upcoming days."""
+        telemetry_partitions.create_partitions(days_ahead=2)
+        today = timezone.now().astimezone(timezone.utc).date()
+        days = telemetry_partitions.partition_days()
+        for i in range(3):
+            self.assertIn(today + datetime.timedelta(days=i), days)
+
+    def test_archive_restore(self):
+        """Tests archiving and restoring a partition."""
+        telemetry_partitions.create_partition(self.day)
+        self.create_telemetry(self.start, 24, datetime.timedelta(hours=1))
+        self.create_telemetry(self.end, 10, datetime.timedelta(minutes=1))
+        logs = list(UasTelemetry.by_user(self.user, self.start, self.end))
+
+        path = telemetry_partitions.archive_partition(self.day,
+                                                      self.archive_dir)
+        self.assertTrue(os.path.exists(path))
+        self.assertNotIn(self.day, telemetry_partitions.partition_days())
+        self.assertEqual(0,
+                         UasTelemetry.by_user(self.user, self.start,
+                                              self.end).count())
+        self.assertEqual(10, UasTelemetry.by_user(self.user).count())
+
+        self.assertEqual(self.day,
+                         telemetry_partitions.restore_partition(path))
+        self.assertIn(self.day, telemetry_partitions.partition_days())
+        self.assertEqual(
+            logs, list(UasTelemetry.by_user(self.user, self.start, self.end)))
+
+    def test_archive_in_transaction(self):
+        """Tests partitions can't be archived within a transaction."""
+        telemetry_partitions.create_partition(self.day)
+        with self.assertRaises(TransactionManagementError):
+            with transaction.atomic():
+                telemetry_partitions.archive_partition(self.day,
+                                                       self.archive_dir)
+
+    def test_archive_open_partition(self):
+        """Tests partitions which haven't ended can't be archived."""
+        today = timezone.now().astimezone(timezone.utc).date()
+        telemetry_partitions.create_partition(today)
+        with self.assertRaises(ValueError):
+            telemetry_partitions.archive_partition(today, self.archive_dir)
+
+    def test_restore_invalid(self):
+        """Tests restoring files which aren't partition archives."""
+        with self.assertRaises(ValueError):
+            telemetry_partitions.restore_partition('/tmp/telemetry.csv.gz')
+
+    def test_command(self):
+        """Tests the management command archives closed partitions."""
+        telemetry_partitions.create_partition(self.day)
+        self.create_telemetry(self.start, 10, datetime.timedelta(minutes=1))
+        call_command('telemetry_partitions', 'archive', '--directory',
+                     self.archive_dir)
+        path = telemetry_partitions.archive_path(self.archive_dir, self.day)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(0, UasTelemetry.by_user(self.user).count())
+
+        call_command('telemetry_partitions', 'restore', path)
+        self.assertEqual(10, UasTelemetry.by_user(self.user).count())
+
+
+class TestTelemetryPartitionsUnsupported(TestCase):
+    """Tests partition management without partitioning."""
+
+    def test_command(self):
+        """Tests the command fails if not partitioned."""
+        if telemetry_partitions.supported():
+            self.skipTest('Partitioning is supported.')
+        self.assertFalse(telemetry_partitions.is_partitioned())
+        with self.assertRaises(CommandError):
+            call_command('telemetry_partitions', 'list')
+
+
+class TestTelemetryRangeQueryLoad(TestTelemetryPartitionsCommon):
+    """Tests range query latency as the telemetry table grows."""
+
+    def test_loadtest(self):
+        """Tests range query latency against table size."""
+        # Telemetry is spread over 10 days of practice flights.
+        days = 10
+        start = datetime.datetime(2019, 10, 1, tzinfo=timezone.utc)
+        if telemetry_partitions.supported():
+            for i in range(days):
+                telemetry_partitions.create_partition(
+                    (start + datetime.timedelta(days=i)).date())
+
+        # Query one minute of telemetry from the middle of the flights.
+        query_start = start + datetime.timedelta(days=days / 2)
+        query_end = query_start + datetime.timedelta(minutes=1)
+        total_ops = 20
+
+        num_rows = 0
+        for table_size in [1000, 10000, 100000]:
+            delta = datetime.timedelta(days=days) / table_size
+            self.create_telemetry(start, table_size - num_rows, delta)
+            num_rows = table_size
+
+            start_t = time.clock()
+            for _ in range(total_ops):
+                logs = list(
+                    UasTelemetry.by_user(self.user, query_start, query_end))
+            end_t = time.clock()
+            op_rate = total_ops / (end_t - start_t)
+            self.assertGreaterEqual(op_rate, 10)
+
+            # The minute has the telemetry of the table size's spacing, as
+            # well as the telemetry of the smaller sizes.
+            self.assertGreaterEqual(
+                len(logs), datetime.timedelta(minutes=1) // delta)
+            for log in logs:
+                self.assertGreaterEqual(log.timestamp, query_start)
+                self.assertLess(log.timestamp, query_end)
+
+        if telemetry_partitions.supported():
+            # Only the queried day's partition is scanned.
+            query = UasTelemetry.by_user(self.user, query_start, query_end)
+            sql, params = query.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ' + sql, params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            self.assertIn(
+                telemetry_partitions.partition_name(query_start.date()), plan)
+            self.assertNotIn(
+                telemetry_partitions.partition_name(start.date()), plan)
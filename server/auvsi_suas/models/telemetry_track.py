@@ -0,0 +1,307 @@
+"""Columnar representation of a telemetry track."""
+
+import datetime
+import logging
+import numpy as np
+from auvsi_suas.models import distance
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Timestamps are stored as integer microseconds since the epoch.
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Fields of UasTelemetry stored in a track, in column order.
+TRACK_FIELDS = ('timestamp', 'latitude', 'longitude', 'altitude_msl',
+                'uas_heading')
+
+
+def to_us(timestamp):
+    """Converts a datetime to microseconds since the epoch."""
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_us(us):
+    """Converts microseconds since the epoch to a datetime."""
+    return EPOCH + datetime.timedelta(microseconds=int(us))
+
+
+class TrackPoint(object):
+    """A single position of a TelemetryTrack.
+
+    Has the same position attributes as UasTelemetry, without being a model.
+    """
+    __slots__ = TRACK_FIELDS
+
+    def __init__(self, timestamp, latitude, longitude, altitude_msl,
+                 uas_heading):
+        self.timestamp = timestamp
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude_msl = altitude_msl
+        self.uas_heading = uas_heading
+
+    def __repr__(self):
+        return 'TrackPoint(%s, %f, %f, %f, %f)' % (self.timestamp,
+                                                   self.latitude,
+                                                   self.longitude,
+                                                   self.altitude_msl,
+                                                   self.uas_heading)
+
+    def distance_to(self, other):
+        """Computes distance to another position.
+
+        Args:
+          other: The other position.
+        Returns:
+          Distance in feet.
+        """
+        return distance.distance_to(self.latitude, self.longitude,
+                                    self.altitude_msl, other.latitude,
+                                    other.longitude, other.altitude_msl)
+
+    def duplicate(self, other):
+        """Determines whether the position equals another's position."""
+        return (self.latitude == other.latitude and
+                self.longitude == other.longitude and
+                self.altitude_msl == other.altitude_msl and
+                self.uas_heading == other.uas_heading)
+
+
+class TelemetryTrack(object):
+    """A time sorted track of telemetry stored as arrays.
+
+    Each field is a contiguous array: timestamps are int64 microseconds since
+    the epoch, and positions are float64. Operations on the track are
+    vectorized array operations, and return new tracks.
+    """
+
+    def __init__(self, t_us, latitude, longitude, altitude_msl, uas_heading):
+        """Creates a track from arrays of equal length.
+
+        Args:
+            t_us: Timestamps in microseconds since the epoch.
+            latitude: Latitudes in degrees.
+            longitude: Longitudes in degrees.
+            altitude_msl: Altitudes (MSL) in feet.
+            uas_heading: Headings in degrees.
+        """
+        self.t_us = np.asarray(t_us, dtype=np.int64)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.altitude_msl = np.asarray(altitude_msl, dtype=np.float64)
+        self.uas_heading = np.asarray(uas_heading, dtype=np.float64)
+
+    @classmethod
+    def empty(cls):
+        """Creates a track without telemetry."""
+        return cls([], [], [], [], [])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Creates a track from a sequence of TRACK_FIELDS tuples."""
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        (timestamps, latitude, longitude, altitude_msl, uas_heading) = zip(
+            *rows)
+        return cls([to_us(t) for t in timestamps], latitude, longitude,
+                   altitude_msl, uas_heading)
+
+    @classmethod
+    def from_queryset(cls, query):
+        """Creates a track from a time sorted UasTelemetry query.
+
+        Loads only the track fields, without creating model objects.
+        """
+        return cls.from_rows(query.values_list(*TRACK_FIELDS))
+
+    @classmethod
+    def from_logs(cls, logs):
+        """Creates a track from a time sorted sequence of telemetry."""
+        return cls.from_rows(
+            [tuple(getattr(log, f) for f in TRACK_FIELDS) for log in logs])
+
+    @classmethod
+    def concatenate(cls, tracks):
+        """Concatenates a sequence of tracks into a single track."""
+        tracks = list(tracks)
+        if not tracks:
+            return cls.empty()
+        return cls(*[
+            np.concatenate([getattr(track, c) for track in tracks])
+            for c in ('t_us', 'latitude', 'longitude', 'altitude_msl',
+                      'uas_heading')
+        ])
+
+    def __len__(self):
+        return len(self.t_us)
+
+    def __getitem__(self, key):
+        """Gets the TrackPoint at an index, or a sub-track for a slice."""
+        if isinstance(key, slice):
+            return self.select(key)
+        return TrackPoint(
+            from_us(self.t_us[key]),
+            float(self.latitude[key]),
+            float(self.longitude[key]),
+            float(self.altitude_msl[key]), float(self.uas_heading[key]))
+
+    def __iter__(self):
+        """Iterates the positions of the track as TrackPoints."""
+        for ix in range(len(self)):
+            yield self[ix]
+
+    def select(self, index):
+        """Gets the track of the given index, mask or slice."""
+        return TelemetryTrack(self.t_us[index], self.latitude[index],
+                              self.longitude[index], self.altitude_msl[index],
+                              self.uas_heading[index])
+
+    def timestamps(self):
+        """Gets the timestamps as a list of datetimes."""
+        return [from_us(t) for t in self.t_us]
+
+    def dedupe(self):
+        """Filters sequential telemetry with duplicate positions.
+
+        For every run of sequential telemetry with equal position and heading,
+        all but the first are filtered.
+
+        Returns:
+            The track without duplicates.
+        """
+        if len(self) == 0:
+            return self
+        keep = np.ones(len(self), dtype=bool)
+        keep[1:] = ((self.latitude[1:] != self.latitude[:-1]) |
+                    (self.longitude[1:] != self.longitude[:-1]) |
+                    (self.altitude_msl[1:] != self.altitude_msl[:-1]) |
+                    (self.uas_heading[1:] != self.uas_heading[:-1]))
+        return self.select(keep)
+
+    def filter_bad(self, threshold_degrees):
+        """Filters telemetry near (0, 0), which is likely noise.
+
+        Args:
+            threshold_degrees: Telemetry with latitude and longitude within
+                this many degrees of 0 is filtered.
+        Returns:
+            The track without bad telemetry.
+        """
+        good = np.maximum(np.abs(self.latitude),
+                          np.abs(self.longitude)) > threshold_degrees
+        return self.select(good)
+
+    def interpolate(self, step, max_gap):
+        """Linearly interpolates positions between telemetry.
+
+        Between each pair of sequential telemetry at most max_gap apart,
+        positions are added every step after the first telemetry and before
+        the second.
+
+        Args:
+            step: The interpolation step as a timedelta.
+            max_gap: The max time between telemetry to interpolate, as a
+                timedelta.
+        Returns:
+            The track with interpolated positions.
+        """
+        if len(self) < 2:
+            return self
+        step_us = step // MICROSECOND
+        max_gap_us = max_gap // MICROSECOND
+
+        # Number of positions to add after each telemetry.
+        dt_us = np.zeros(len(self), dtype=np.int64)
+        dt_us[:-1] = np.diff(self.t_us)
+        num_added = np.where((dt_us > 0) & (dt_us <= max_gap_us),
+                             (dt_us - 1) // step_us, 0)
+
+        # For each output position, the telemetry it follows and the number of
+        # steps after that telemetry.
+        counts = num_added + 1
+        base = np.repeat(np.arange(len(self)), counts)
+        starts = np.cumsum(counts) - counts
+        k = np.arange(counts.sum(), dtype=np.int64) - np.repeat(starts, counts)
+
+        # Weight of the next telemetry. Zero for original telemetry.
+        next_ix = np.minimum(base + 1, len(self) - 1)
+        dt = np.where(k > 0, dt_us[base], 1).astype(np.float64)
+        next_w = (k * step_us) / dt
+        w = (dt - k * step_us) / dt
+
+        def weighted_avg(v):
+            return w * v[base] + next_w * v[next_ix]
+
+        return TelemetryTrack(self.t_us[base] + k * step_us,
+                              weighted_avg(self.latitude),
+                              weighted_avg(self.longitude),
+                              weighted_avg(self.altitude_msl),
+                              weighted_avg(self.uas_heading))
+
+    def decimate(self, min_interval):
+        """Limits the rate of telemetry.
+
+        Time since the first telemetry is divided into intervals, and the
+        first telemetry of each interval is kept, as is the last telemetry.
+
+        Args:
+            min_interval: The min time between kept telemetry, as a timedelta.
+        Returns:
+            The decimated track.
+        """
+        interval_us = min_interval // MICROSECOND
+        if len(self) < 3 or interval_us <= 0:
+            return self
+        bucket = (self.t_us - self.t_us[0]) // interval_us
+        keep = np.ones(len(self), dtype=bool)
+        keep[1:] = bucket[1:] != bucket[:-1]
+        keep[-1] = True
+        return self.select(keep)
+
+    def simplify(self, tolerance_ft):
+        """Simplifies the path of the track with Douglas-Peucker.
+
+        Positions are projected onto the plane tangent at the first position.
+        Starting with the first and last telemetry, the telemetry furthest from
+        the segment between kept telemetry is kept while further than the
+        tolerance, so the simplified path is within the tolerance of every
+        position of the track.
+
+        Args:
+            tolerance_ft: The max distance in feet of positions from the
+                simplified path.
+        Returns:
+            The simplified track.
+        """
+        if len(self) < 3:
+            return self
+        (x, y) = distance.tangent_plane(self.latitude, self.longitude,
+                                        self.latitude[0], self.longitude[0])
+        points = np.column_stack((x, y, self.altitude_msl))
+
+        keep = np.zeros(len(self), dtype=bool)
+        keep[0] = keep[-1] = True
+        segments = [(0, len(self) - 1)]
+        while segments:
+            (first, last) = segments.pop()
+            if last - first < 2:
+                continue
+            # Distances from the segment of the telemetry between its ends.
+            start = points[first]
+            direction = points[last] - start
+            offsets = points[first + 1:last] - start
+            length_sq = direction.dot(direction)
+            t = np.zeros(len(offsets))
+            if length_sq > 0:
+                t = np.clip(offsets.dot(direction) / length_sq, 0, 1)
+            dist = np.linalg.norm(offsets - np.outer(t, direction), axis=1)
+            ix = np.argmax(dist)
+            if dist[ix] > tolerance_ft:
+                split = first + 1 + ix
+                keep[split] = True
+                segments.append((first, split))
+                segments.append((split, last))
+        return self.select(keep)
@@ -0,0 +1,240 @@
+"""Tests for the telemetry_track module."""
+
+import datetime
+import random
+import numpy as np
+from auvsi_suas.models import distance
+from auvsi_suas.models.telemetry_track import TelemetryTrack
+from auvsi_suas.models.uas_telemetry import BAD_TELEMETRY_THRESHOLD_DEGREES
+from auvsi_suas.models.uas_telemetry import TELEMETRY_INTERPOLATION_MAX_GAP
+from auvsi_suas.models.uas_telemetry import TELEMETRY_INTERPOLATION_STEP
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from auvsi_suas.models.uas_telemetry_test import TestUasTelemetryBase
+
+
+class TestTelemetryTrackBase(TestUasTelemetryBase):
+    """Base for the TelemetryTrack tests."""
+
+    def random_logs(self, num, seed=0):
+        """Creates unsaved, time sorted, random telemetry.
+
+        The telemetry has random time gaps around the interpolation step and
+        max gap, duplicates, and bad positions.
+        """
+        rand = random.Random(seed)
+        logs = []
+        t = self.now
+        for _ in range(num):
+            t += datetime.timedelta(seconds=rand.choice(
+                [0, 0.05, 0.1, 0.25, 1.0, 5.0, 7.5]))
+            if logs and rand.random() < 0.2:
+                prev = logs[-1]
+                (lat, lon, alt, head) = (prev.latitude, prev.longitude,
+                                         prev.altitude_msl, prev.uas_heading)
+            elif rand.random() < 0.1:
+                (lat, lon, alt, head) = (0, 0, 0, 0)
+            else:
+                (lat, lon, alt, head) = (38 + rand.random(),
+                                         -76 + rand.random(), rand.uniform(
+                                             0, 500), rand.uniform(0, 360))
+            logs.append(
+                UasTelemetry(
+                    user=self.user,
+                    timestamp=t,
+                    latitude=lat,
+                    longitude=lon,
+                    altitude_msl=alt,
+                    uas_heading=head))
+        return logs
+
+    def assertTrackEqual(self, expect, got):
+        """Asserts a track equals a list of telemetry."""
+        expect = list(expect)
+        got = list(got)
+        self.assertEqual(len(expect), len(got))
+        for (e, g) in zip(expect, got):
+            self.assertEqual(e.timestamp, g.timestamp)
+            self.assertTelemetryEqual(e, g)
+
+
+class TestTelemetryTrack(TestTelemetryTrackBase):
+    """Tests the TelemetryTrack."""
+
+    def test_empty(self):
+        """Tests operations on an empty track."""
+        track = TelemetryTrack.empty()
+        self.assertEqual(0, len(track))
+        self.assertEqual([], list(track))
+        self.assertEqual(0, len(track.dedupe()))
+        self.assertEqual(0, len(track.filter_bad(1)))
+        self.assertEqual(
+            0,
+            len(
+                track.interpolate(TELEMETRY_INTERPOLATION_STEP,
+                                  TELEMETRY_INTERPOLATION_MAX_GAP)))
+        self.assertEqual(0, len(TelemetryTrack.concatenate([])))
+
+    def test_from_queryset(self):
+        """Tests loading a track from a query."""
+        logs = self.create_uas_logs([
+            (0.0, 38, -76, 100, 0),
+            (0.5, 39, -75, 105, 1),
+            (1.2, 40, -74, 110, 2),
+        ])
+        track = TelemetryTrack.from_queryset(UasTelemetry.by_user(self.user))
+        self.assertTrackEqual(logs, track)
+        self.assertEqual([l.timestamp for l in logs], track.timestamps())
+
+    def test_getitem(self):
+        """Tests indexing and slicing a track."""
+        logs = self.random_logs(10)
+        track = TelemetryTrack.from_logs(logs)
+        self.assertTrackEqual([logs[3]], [track[3]])
+        self.assertTrackEqual(logs[2:5], track[2:5])
+        self.assertTrue(track[0].duplicate(logs[0]))
+        self.assertAlmostEqual(logs[0].distance_to(logs[1]),
+                               track[0].distance_to(track[1]))
+
+    def test_concatenate(self):
+        """Tests concatenating tracks."""
+        logs = self.random_logs(20)
+        track = TelemetryTrack.concatenate([
+            TelemetryTrack.from_logs(logs[:5]),
+            TelemetryTrack.empty(),
+            TelemetryTrack.from_logs(logs[5:]),
+        ])
+        self.assertTrackEqual(logs, track)
+
+    def test_dedupe(self):
+        """Tests dedupe matches deduping a list of telemetry."""
+        logs = self.random_logs(500)
+        self.assertTrackEqual(
+            UasTelemetry.dedupe(logs),
+            UasTelemetry.dedupe(TelemetryTrack.from_logs(logs)))
+
+    def test_filter_bad(self):
+        """Tests filter_bad matches filtering a list of telemetry."""
+        logs = self.random_logs(500)
+        track = UasTelemetry.filter_bad(TelemetryTrack.from_logs(logs))
+        self.assertIsInstance(track, TelemetryTrack)
+        self.assertTrackEqual(UasTelemetry.filter_bad(logs), track)
+        self.assertTrackEqual(
+            TelemetryTrack.from_logs(logs).filter_bad(
+                BAD_TELEMETRY_THRESHOLD_DEGREES), track)
+
+    def test_interpolate(self):
+        """Tests interpolate matches interpolating a list of telemetry."""
+        logs = self.random_logs(500)
+        track = UasTelemetry.interpolate(TelemetryTrack.from_logs(logs))
+        self.assertIsInstance(track, TelemetryTrack)
+        self.assertTrackEqual(UasTelemetry.interpolate(logs), track)
+
+    def test_decimate(self):
+        """Tests decimate limits the rate of telemetry."""
+        # 10 s at 10 Hz.
+        n = 101
+        track = TelemetryTrack(
+            np.arange(n) * 100000, 38 + np.arange(n) * 1e-4,
+            np.full(n, -76), np.full(n, 100), np.zeros(n))
+        decimated = track.decimate(datetime.timedelta(seconds=1))
+        self.assertEqual(11, len(decimated))
+        self.assertTrue(np.all(np.diff(decimated.t_us) == 1000000))
+        self.assertIs(track, track.decimate(datetime.timedelta(0)))
+
+    def test_simplify(self):
+        """Tests simplify keeps the path within the tolerance."""
+        # Positions on a line simplify to the ends.
+        n = 50
+        track = TelemetryTrack(
+            np.arange(n) * 100000, 38 + np.arange(n) * 1e-4,
+            -76 + np.arange(n) * 1e-4, 100 + np.arange(n), np.zeros(n))
+        simplified = track.simplify(1)
+        self.assertEqual(2, len(simplified))
+        self.assertEqual(track[0].timestamp, simplified[0].timestamp)
+        self.assertEqual(track[-1].timestamp, simplified[-1].timestamp)
+
+        # Every position is within the tolerance of the simplified segment
+        # spanning it.
+        track = UasTelemetry.dedupe(
+            UasTelemetry.filter_bad(
+                TelemetryTrack.from_logs(self.random_logs(500))))
+        # Unique times, to find the kept telemetry.
+        track.t_us = np.arange(len(track))
+        (x, y) = distance.tangent_plane(track.latitude, track.longitude,
+                                        track.latitude[0], track.longitude[0])
+        points = np.column_stack((x, y, track.altitude_msl))
+        self.assertLess(len(track.simplify(50000)), len(track))
+        for tolerance_ft in [10, 10000, 50000]:
+            simplified = track.simplify(tolerance_ft)
+            self.assertLessEqual(len(simplified), len(track))
+            kept = np.flatnonzero(np.isin(track.t_us, simplified.t_us))
+            for (first, last) in zip(kept[:-1], kept[1:]):
+                (a, b) = (points[first], points[last])
+                for p in points[first + 1:last]:
+                    t = np.clip((p - a).dot(b - a) / (b - a).dot(b - a), 0, 1)
+                    self.assertLessEqual(
+                        np.linalg.norm(p - (a + t * (b - a))), tolerance_ft)
+
+    def test_satisfied_waypoints(self):
+        """Tests satisfied_waypoints accepts a track."""
+        waypoints = self.waypoints_from_data([
+            (38.2, -75.8, 100),
+            (38.5, -75.5, 200),
+            (38.8, -75.2, 300),
+        ])
+        logs = self.random_logs(100)
+        self.assertSatisfiedWaypoints(
+            UasTelemetry.satisfied_waypoints(None, waypoints, logs),
+            UasTelemetry.satisfied_waypoints(None, waypoints,
+                                             TelemetryTrack.from_logs(logs)))
+
+
+class TestTelemetryTrackLoad(TestTelemetryTrackBase):
+    """Tests the time to process a flight."""
+
+    def test_loadtest(self):
+        """Tests processing a 30 minute flight at 10 Hz."""
+        # Jitter the telemetry times so some positions are interpolated.
+        num_rows = 30 * 60 * 10
+        rand = random.Random(0)
+        logs = []
+        for i in range(num_rows):
+            logs.append(
+                UasTelemetry(
+                    user=self.user,
+                    timestamp=self.now + datetime.timedelta(
+                        seconds=i / 10.0 + rand.random() / 20.0),
+                    latitude=38 + i * 1e-5,
+                    longitude=-76 + i * 1e-5,
+                    altitude_msl=100 + i % 100,
+                    uas_heading=i % 360))
+        UasTelemetry.objects.bulk_create(logs)
+        query = UasTelemetry.by_user(self.user)
+
+        track = TelemetryTrack.from_queryset(query)
+        track = UasTelemetry.interpolate(
+            UasTelemetry.dedupe(UasTelemetry.filter_bad(track)))
+        self.assertGreater(len(track), num_rows)
+
+        # Compare against model objects for part of the flight.
+        part_rows = num_rows // 10
+        part_track = TelemetryTrack.from_queryset(query[:part_rows])
+        part_track = UasTelemetry.interpolate(
+            UasTelemetry.dedupe(UasTelemetry.filter_bad(part_track)))
+        part_logs = list(query[:part_rows])
+        part_logs = list(
+            UasTelemetry.interpolate(
+                list(
+                    UasTelemetry.dedupe(
+                        list(UasTelemetry.filter_bad(part_logs))))))
+        self.assertEqual(len(part_logs), len(part_track))
+        for log, point in zip(part_logs, part_track):
+            self.assertEqual(log.timestamp, point.timestamp)
+            self.assertAlmostEqual(log.latitude, point.latitude)
+            self.assertAlmostEqual(log.longitude, point.longitude)
+
+        # Simplifying drops points, keeping the ends of the track.
+        simplified = track.simplify(10)
+        self.assertLess(len(simplified), len(track))
+        self.assertEqual(track.t_us[0], simplified.t_us[0])
+        self.assertEqual(track.t_us[-1], simplified.t_us[-1])
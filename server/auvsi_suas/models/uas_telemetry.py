@@ -3,9 +3,12 @@
 import datetime
 import itertools
 import logging
+import numpy as np
+from auvsi_suas.models import distance
 from auvsi_suas.models.access_log import AccessLogMixin
 from auvsi_suas.models.aerial_position import AerialPositionMixin
 from auvsi_suas.models.gps_position import GpsPosition
+from auvsi_suas.models.telemetry_track import TelemetryTrack
 from auvsi_suas.proto import interop_admin_api_pb2
 from collections import defaultdict
 from django.contrib import admin
@@ -20,6 +23,9 @@ BAD_TELEMETRY_THRESHOLD_DEGREES = 0.1
 TELEMETRY_INTERPOLATION_STEP = datetime.timedelta(seconds=0.1)
 # The max time gap between two telemetry to interpolate between.
 TELEMETRY_INTERPOLATION_MAX_GAP = datetime.timedelta(seconds=5.0)
+# Max age of telemetry timestamps accepted in a batch upload. Telemetry older
+# than this can no longer be added.
+TELEMETRY_BATCH_MAX_AGE = datetime.timedelta(seconds=30)
 
 # The time window (in seconds) in which a plane cannot be counted as going out
 # of bounds multiple times. This prevents noisy input data from recording
@@ -80,13 +86,21 @@ class UasTelemetry(AccessLogMixin, AerialPositionMixin):
         telemetry data is not allowed per the rules, so it is filtered.
 
         Args:
-            logs: A sorted list of UasTelemetry logs.
+            logs: A sorted list of UasTelemetry logs, or a TelemetryTrack.
         Returns:
             A sequence containing the non-duplicate logs in the original list.
+            A TelemetryTrack if given a TelemetryTrack.
         """
+        if isinstance(logs, TelemetryTrack):
+            return logs.dedupe()
+        return cls._dedupe_logs(logs)
+
+    @classmethod
+    def _dedupe_logs(cls, logs):
+        """Dedupes a list of UAS telemetry logs. See dedupe()."""
         # Check that logs were provided.
         if not logs:
-            return logs
+            return
 
         # For each log, compare to previous. If different, add to output.
         prev_log = None
@@ -101,10 +115,13 @@ class UasTelemetry(AccessLogMixin, AerialPositionMixin):
         """Filters bad telemetry from the list.
 
         Args:
-            logs: A sorted list of UasTelemetry logs.
+            logs: A sorted list of UasTelemetry logs, or a TelemetryTrack.
         Returns:
-            A list containing the non-bad logs.
+            A list containing the non-bad logs. A TelemetryTrack if given a
+            TelemetryTrack.
         """
+        if isinstance(logs, TelemetryTrack):
+            return logs.filter_bad(BAD_TELEMETRY_THRESHOLD_DEGREES)
 
         def _is_good(log):
             # Positions near (0,0) are likely GPS/autopilot noise.
@@ -121,12 +138,21 @@ class UasTelemetry(AccessLogMixin, AerialPositionMixin):
         """Interpolates the ordered set of telemetry.
 
         Args:
-            uas_telemetry_logs: The telemetry to interpolate.
+            uas_telemetry_logs: The telemetry to interpolate, as a list of
+                UasTelemetry or a TelemetryTrack.
             step: The discrete interpolation step in seconds.
             max_gap: The max time between telemetry to interpolate.
         Returns:
-            An iterable set of telemetry.
+            An iterable set of telemetry. A TelemetryTrack if given a
+            TelemetryTrack.
         """
+        if isinstance(uas_telemetry_logs, TelemetryTrack):
+            return uas_telemetry_logs.interpolate(step, max_gap)
+        return cls._interpolate_logs(uas_telemetry_logs, step, max_gap)
+
+    @classmethod
+    def _interpolate_logs(cls, uas_telemetry_logs, step, max_gap):
+        """Interpolates a list of telemetry. See interpolate()."""
         for ix, log in enumerate(uas_telemetry_logs):
             yield log
 
@@ -173,24 +199,34 @@ class UasTelemetry(AccessLogMixin, AerialPositionMixin):
         Args:
             home_pos: The home position for projections.
             waypoints: A list of waypoints to check against.
-            uas_telemetry_logs: A list of UAS Telemetry logs to evaluate.
+            uas_telemetry_logs: A list of UAS Telemetry logs, or a
+                TelemetryTrack, to evaluate.
         Returns:
             A list of auvsi_suas.proto.WaypointEvaluation.
         """
         # Reduce telemetry from telemetry to waypoint hits.
         # This will make future processing more efficient via data reduction.
-        # While iterating, compute the best distance seen for feedback.
+        # Distances are computed as a (telemetry x waypoint) matrix. While
+        # reducing, compute the best distance seen for feedback.
+        if not isinstance(uas_telemetry_logs, TelemetryTrack):
+            uas_telemetry_logs = TelemetryTrack.from_logs(uas_telemetry_logs)
+        track = cls.interpolate(uas_telemetry_logs)
+        wpt_lat = [w.latitude for w in waypoints]
+        wpt_lon = [w.longitude for w in waypoints]
+        wpt_alt = [w.altitude_msl for w in waypoints]
+        dists = distance.distance_matrix(track.latitude, track.longitude,
+                                         track.altitude_msl, wpt_lat, wpt_lon,
+                                         wpt_alt)
         best = {}
-        hits = []
-        for log in cls.interpolate(uas_telemetry_logs):
-            for iw, waypoint in enumerate(waypoints):
-                dist = log.distance_to(waypoint)
-                best[iw] = min(best.get(iw, dist), dist)
-                score = max(0,
-                            float(SATISFIED_WAYPOINT_DIST_MAX_FT - dist) /
-                            SATISFIED_WAYPOINT_DIST_MAX_FT)
-                if score > 0:
-                    hits.append((iw, dist, score))
+        if len(track):
+            best = dict(enumerate(dists.min(axis=0).tolist()))
+        dist_scores = np.maximum(0, (SATISFIED_WAYPOINT_DIST_MAX_FT - dists) /
+                                 float(SATISFIED_WAYPOINT_DIST_MAX_FT))
+        # Hits in order of telemetry, then waypoint.
+        (hit_logs, hit_wpts) = np.nonzero(dist_scores > 0)
+        hits = list(
+            zip(hit_wpts.tolist(), dists[hit_logs, hit_wpts].tolist(),
+                dist_scores[hit_logs, hit_wpts].tolist()))
         # Remove redundant hits which wouldn't be part of best sequence.
         # This will make future processing more efficient via data reduction.
         hits = [
@@ -200,40 +236,52 @@ class UasTelemetry(AccessLogMixin, AerialPositionMixin):
 
         # Find highest scoring sequence via dynamic programming.
         # Implement recurrence relation:
-        #   S(iw, ih) = s[iw, ih] + max_{k=[0,ih)} S(iw-1, k)
-        dp = defaultdict(lambda: defaultdict(lambda: (0, None, None)))
+        #   S(iw, ih) = s[iw, ih] + max_{k=[0,ih]} S(iw-1, k)
+        # The max over k is a running prefix max of the previous row, so each
+        # row is computed in O(H). Ties resolve to the earliest hit.
+        num_hits = len(hits)
+        hit_iw = np.array([h[0] for h in hits], dtype=np.int64)
+        hit_score = np.array([h[2] for h in hits], dtype=np.float64)
+        hit_ix = np.arange(num_hits)
+        # Total score of each cell, and the hit of the previous row it extends
+        # (or -1 for none).
+        totals = np.zeros((len(waypoints), num_hits))
+        backs = np.full((len(waypoints), num_hits), -1, dtype=np.int64)
         highest_total = None
-        highest_total_pos = (None, None)
+        highest_total_pos = None
         for iw in range(len(waypoints)):
-            for ih, (hiw, hdist, hscore) in enumerate(hits):
-                # Compute score for assigning current hit to current waypoint.
-                score = hscore if iw == hiw else 0.0
-                # Compute best total score, which includes this match score and
-                # best of all which could come before it.
-                prev_iw = iw - 1
-                total_score = score
-                total_score_back = (None, None)
-                if prev_iw >= 0:
-                    for prev_ih in range(ih + 1):
-                        (prev_total_score, _) = dp[prev_iw][prev_ih]
-                        new_total_score = prev_total_score + score
-                        if new_total_score > total_score:
-                            total_score = new_total_score
-                            total_score_back = (prev_iw, prev_ih)
-                dp[iw][ih] = (total_score, total_score_back)
-                # Track highest score seen.
-                if highest_total is None or total_score > highest_total:
-                    highest_total = total_score
+            # Compute score for assigning each hit to current waypoint.
+            score = np.where(hit_iw == iw, hit_score, 0.0)
+            total_score = score
+            if iw > 0 and num_hits:
+                # Best previous total up to each hit, and its earliest hit.
+                prev_totals = totals[iw - 1]
+                prefix_max = np.maximum.accumulate(prev_totals)
+                new_max = np.ones(num_hits, dtype=bool)
+                new_max[1:] = prev_totals[1:] > prefix_max[:-1]
+                prefix_argmax = np.maximum.accumulate(
+                    np.where(new_max, hit_ix, 0))
+                # Extend the best previous total if it adds to the score.
+                new_total_score = prefix_max + score
+                extend = new_total_score > score
+                total_score = np.where(extend, new_total_score, score)
+                backs[iw] = np.where(extend, prefix_argmax, -1)
+            totals[iw] = total_score
+            # Track highest score seen.
+            if num_hits:
+                ih = int(np.argmax(total_score))
+                if highest_total is None or total_score[ih] > highest_total:
+                    highest_total = total_score[ih]
                     highest_total_pos = (iw, ih)
         # Traceback sequence to get scores and distance for score.
         scores = defaultdict(lambda: (0, None))
-        cur_pos = highest_total_pos
-        while cur_pos != (None, None):
-            cur_iw, cur_ih = cur_pos
-            hiw, hdist, hscore = hits[cur_ih]
-            if cur_iw == hiw:
-                scores[cur_iw] = (hscore, hdist)
-            _, cur_pos = dp[cur_iw][cur_ih]
+        if highest_total_pos is not None:
+            cur_iw, cur_ih = highest_total_pos
+            while cur_iw >= 0 and cur_ih >= 0:
+                hiw, hdist, hscore = hits[cur_ih]
+                if cur_iw == hiw:
+                    scores[cur_iw] = (hscore, hdist)
+                cur_iw, cur_ih = cur_iw - 1, backs[cur_iw][cur_ih]
 
         # Convert to evaluation.
         waypoint_evals = []
@@ -1,17 +1,82 @@
 """Tests for the uas_telemetry module."""
 
 import datetime
+import itertools
+import random
 from auvsi_suas.models.aerial_position import AerialPosition
 from auvsi_suas.models.gps_position import GpsPosition
 from auvsi_suas.models.mission_config import MissionConfig
+from auvsi_suas.models.uas_telemetry import SATISFIED_WAYPOINT_DIST_MAX_FT
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.models.waypoint import Waypoint
 from auvsi_suas.proto.interop_admin_api_pb2 import WaypointEvaluation
+from collections import defaultdict
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.utils import timezone
 
 
+def satisfied_waypoints_quadratic(waypoints, uas_telemetry_logs):
+    """Reference O(W*H^2) implementation of satisfied_waypoints."""
+    best = {}
+    hits = []
+    for log in UasTelemetry.interpolate(uas_telemetry_logs):
+        for iw, waypoint in enumerate(waypoints):
+            dist = log.distance_to(waypoint)
+            best[iw] = min(best.get(iw, dist), dist)
+            score = max(0,
+                        float(SATISFIED_WAYPOINT_DIST_MAX_FT - dist) /
+                        SATISFIED_WAYPOINT_DIST_MAX_FT)
+            if score > 0:
+                hits.append((iw, dist, score))
+    hits = [
+        max(g, key=lambda x: x[2])
+        for _, g in itertools.groupby(hits, lambda x: x[0])
+    ]
+
+    dp = defaultdict(lambda: defaultdict(lambda: (0, None, None)))
+    highest_total = None
+    highest_total_pos = (None, None)
+    for iw in range(len(waypoints)):
+        for ih, (hiw, hdist, hscore) in enumerate(hits):
+            score = hscore if iw == hiw else 0.0
+            prev_iw = iw - 1
+            total_score = score
+            total_score_back = (None, None)
+            if prev_iw >= 0:
+                for prev_ih in range(ih + 1):
+                    (prev_total_score, _) = dp[prev_iw][prev_ih]
+                    new_total_score = prev_total_score + score
+                    if new_total_score > total_score:
+                        total_score = new_total_score
+                        total_score_back = (prev_iw, prev_ih)
+            dp[iw][ih] = (total_score, total_score_back)
+            if highest_total is None or total_score > highest_total:
+                highest_total = total_score
+                highest_total_pos = (iw, ih)
+    scores = defaultdict(lambda: (0, None))
+    cur_pos = highest_total_pos
+    while cur_pos != (None, None):
+        cur_iw, cur_ih = cur_pos
+        hiw, hdist, hscore = hits[cur_ih]
+        if cur_iw == hiw:
+            scores[cur_iw] = (hscore, hdist)
+        _, cur_pos = dp[cur_iw][cur_ih]
+
+    waypoint_evals = []
+    for iw, waypoint in enumerate(waypoints):
+        score, dist = scores[iw]
+        waypoint_eval = WaypointEvaluation()
+        waypoint_eval.id = iw
+        waypoint_eval.score_ratio = score
+        if dist is not None:
+            waypoint_eval.closest_for_scored_approach_ft = dist
+        if iw in best:
+            waypoint_eval.closest_for_mission_ft = best[iw]
+        waypoint_evals.append(waypoint_eval)
+    return waypoint_evals
+
+
 class TestUasTelemetryBase(TestCase):
     """Base for the UasTelemetry tests."""
 
@@ -546,3 +611,80 @@ class TestUasTelemetryWaypoints(TestUasTelemetryBase):
         self.assertSatisfiedWaypoints(expect,
                                       UasTelemetry.satisfied_waypoints(
                                           gpos, waypoints, logs))
+
+
+class TestUasTelemetryWaypointsReference(TestUasTelemetryBase):
+    """Tests satisfied_waypoints against the quadratic implementation."""
+
+    def random_flight(self, waypoints, num, gap_sec, seed, spread=4e-4):
+        """Creates unsaved telemetry visiting random waypoints.
+
+        Each telemetry is offset randomly from a waypoint, so the flight
+        misses, grazes, or hits waypoints in a random order.
+
+        Args:
+            waypoints: The waypoints to visit.
+            num: The number of telemetry.
+            gap_sec: Seconds between telemetry.
+            seed: The random seed.
+            spread: Max offset in degrees. Altitude is offset by a similar
+                distance in feet.
+        """
+        rand = random.Random(seed)
+        logs = []
+        for i in range(num):
+            waypoint = rand.choice(waypoints)
+            logs.append(
+                UasTelemetry(
+                    user=self.user,
+                    timestamp=self.now + datetime.timedelta(
+                        seconds=i * gap_sec),
+                    latitude=waypoint.latitude + rand.uniform(-spread, spread),
+                    longitude=waypoint.longitude + rand.uniform(
+                        -spread, spread),
+                    altitude_msl=waypoint.altitude_msl +
+                    rand.uniform(-spread, spread) * 2.5e5,
+                    uas_heading=0))
+        return logs
+
+    def test_random_flights(self):
+        """Tests random flights score the same as the quadratic version."""
+        waypoints = self.waypoints_from_data([
+            (38.000, -76.000, 100),
+            (38.002, -76.000, 150),
+            (38.002, -76.002, 200),
+            (38.000, -76.002, 150),
+            (38.001, -76.001, 100),
+        ])
+        for seed in range(50):
+            rand = random.Random(seed)
+            num_waypoints = rand.randint(1, len(waypoints))
+            logs = self.random_flight(waypoints[:num_waypoints],
+                                      rand.randint(0, 40),
+                                      rand.choice([1, 10]), seed)
+            expect = satisfied_waypoints_quadratic(waypoints, logs)
+            self.assertEqual(expect,
+                             UasTelemetry.satisfied_waypoints(
+                                 None, waypoints, logs))
+
+    def test_no_waypoints(self):
+        """Tests flights without waypoints."""
+        logs = self.random_flight(
+            self.waypoints_from_data([(38, -76, 100)]), 10, 1, 0)
+        self.assertEqual([], UasTelemetry.satisfied_waypoints(None, [], logs))
+
+    def test_loadtest(self):
+        """Tests scoring a flight with many waypoint hits matches quadratic."""
+        waypoints = self.waypoints_from_data([
+            (38.000, -76.000, 100),
+            (38.002, -76.000, 150),
+            (38.002, -76.002, 200),
+            (38.000, -76.002, 150),
+            (38.001, -76.001, 100),
+        ])
+        # Without interpolation, nearly every telemetry is a separate hit.
+        logs = self.random_flight(waypoints, 3000, 10, 0, spread=1e-4)
+
+        got = UasTelemetry.satisfied_waypoints(None, waypoints, logs)
+        expect = satisfied_waypoints_quadratic(waypoints, logs)
+        self.assertEqual(expect, got)
@@ -0,0 +1,33 @@
+from django.db.backends.base.introspection import TableInfo
+from django.db.backends.postgresql.introspection import DatabaseIntrospection
+
+
+def fixed_get_table_list(self, cursor):
+    """
+    Monkey Patched Function
+    This patch fixes introspection of partitioned tables in Django 1.11.
+
+    In the original code, only tables and views are listed, so partitioned
+    tables (relkind 'p') like the UasTelemetry table are missing:
+        WHERE c.relkind IN ('r', 'v')
+
+    Tables which aren't listed aren't flushed, so flush truncates the tables
+    referenced by the partitioned table without it, which fails. This has been
+    corrected to list partitioned tables as tables:
+        WHERE c.relkind IN ('r', 'p', 'v')
+    """
+    cursor.execute("""
+        SELECT c.relname, c.relkind
+        FROM pg_catalog.pg_class c
+        LEFT JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p', 'v')
+            AND n.nspname NOT IN ('pg_catalog', 'pg_toast')
+            AND pg_catalog.pg_table_is_visible(c.oid)""")
+    table_types = {'r': 't', 'p': 't', 'v': 'v'}
+    return [
+        TableInfo(row[0], table_types.get(row[1]))
+        for row in cursor.fetchall() if row[0] not in self.ignored_tables
+    ]
+
+
+DatabaseIntrospection.get_table_list = fixed_get_table_list
@@ -4,6 +4,7 @@ import logging
 import shutil
 import tempfile
 from django.conf import settings
+from django.test import override_settings
 from django.test import runner
 
 
@@ -26,6 +27,15 @@ class AuvsiSuasTestRunner(runner.DiscoverRunner):
         self.sendfile_backend = settings.SENDFILE_BACKEND
         settings.SENDFILE_BACKEND = 'sendfile.backends.development'
 
+        # We don't have memcached during testing, use a local memory cache.
+        self.cache_settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'KEY_PREFIX': 'suas',
+            }
+        })
+        self.cache_settings.enable()
+
         # Disable logging
         logging.disable(logging.CRITICAL)
 
@@ -34,6 +44,7 @@ class AuvsiSuasTestRunner(runner.DiscoverRunner):
 
         settings.MEDIA_ROOT = self.media_root
         settings.SENDFILE_BACKEND = self.sendfile_backend
+        self.cache_settings.disable()
 
         logging.disable(logging.NOTSET)
 
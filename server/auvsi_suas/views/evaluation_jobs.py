@@ -0,0 +1,190 @@
+"""Background jobs which evaluate teams and write the evaluation artifact.
+
+Evaluating every team can take minutes, which would tie up a server worker
+that also serves live telemetry. A job instead evaluates the teams in a
+background thread of the process which started it, and writes the artifact to
+a file under MEDIA_ROOT. The job status, with the number of teams evaluated,
+is kept in the shared Django cache, so it can be polled from any server
+process. A job whose process stops, like on a server restart, stops updating
+its heartbeat and is then reported as failed.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from auvsi_suas.models import mission_evaluation
+from auvsi_suas.models.mission_config import MissionConfig
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds for which job status and artifacts are kept.
+JOB_TIMEOUT = 24 * 60 * 60
+# Time in seconds without a heartbeat after which a running job is reported
+# as failed. Heartbeats are sent after each team is evaluated.
+JOB_STALE_SEC = 10 * 60
+
+# Cache key for the status of a job.
+JOB_KEY = 'evaluation_job/%s'
+
+# Directory under MEDIA_ROOT for job artifacts.
+ARTIFACT_DIR = 'evaluations'
+
+# Job states.
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+# Threads of the jobs started by this process, by job id.
+_threads_lock = threading.Lock()
+_threads = {}
+
+
+def artifact_path(job_id):
+    """Gets the path of the job's artifact."""
+    return os.path.join(settings.MEDIA_ROOT, ARTIFACT_DIR, '%s.zip' % job_id)
+
+
+def job_status(job_id):
+    """Gets the status of the job.
+
+    Returns:
+        A dict with the job id, mission, state, the number of teams evaluated
+        and the total number of teams, the start and heartbeat times, or None
+        if the job doesn't exist. Running jobs without a recent heartbeat are
+        reported as failed.
+    """
+    status = cache.get(JOB_KEY % job_id)
+    if status is not None and status['state'] == RUNNING:
+        heartbeat = time.time() - status['heartbeat']
+        if heartbeat > JOB_STALE_SEC:
+            status['state'] = FAILED
+            status['error'] = 'No heartbeat for %d s.' % heartbeat
+    return status
+
+
+def set_status(status):
+    """Stores the status of the job, with a heartbeat."""
+    status['heartbeat'] = time.time()
+    cache.set(JOB_KEY % status['id'], status, timeout=JOB_TIMEOUT)
+
+
+def remove_old_artifacts():
+    """Removes artifacts of jobs which have timed out."""
+    directory = os.path.join(settings.MEDIA_ROOT, ARTIFACT_DIR)
+    if not os.path.isdir(directory):
+        return
+    min_mtime = time.time() - JOB_TIMEOUT
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        try:
+            if os.path.getmtime(path) < min_mtime:
+                os.remove(path)
+        except OSError:
+            # Removed by another process.
+            pass
+
+
+def run_job(status, mission_pk, user_pks, write_artifact):
+    """Evaluates the teams and writes the artifact, updating the job status.
+
+    Args:
+        status: The status of the job.
+        mission_pk: The pk of the MissionConfig to evaluate.
+        user_pks: The pks of the users to evaluate, or None for all users.
+        write_artifact: Function which writes the evaluation to a file,
+            called with an iterable of each team's MissionEvaluation, which
+            evaluates the teams as it's iterated, and the file.
+    """
+
+    def progress(teams_done, teams_total):
+        status['teams_done'] = teams_done
+        status['teams_total'] = teams_total
+        set_status(status)
+
+    path = artifact_path(status['id'])
+    try:
+        mission = MissionConfig.objects.get(pk=mission_pk)
+        users = None
+        if user_pks is not None:
+            users = User.objects.filter(pk__in=user_pks)
+        team_evals = mission_evaluation.iter_evaluate_teams(
+            mission, users, progress=progress)
+
+        # Write to a temporary file, so a partial artifact is never served.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            write_artifact(team_evals, f)
+        os.replace(tmp_path, path)
+        status['state'] = DONE
+    except Exception as e:
+        logger.exception('Evaluation job %s failed.', status['id'])
+        status['state'] = FAILED
+        status['error'] = str(e)
+    set_status(status)
+
+
+def start_job(mission, users, write_artifact):
+    """Starts a job evaluating teams in a background thread.
+
+    Args:
+        mission: The MissionConfig to evaluate.
+        users: The users to evaluate, or None for all users.
+        write_artifact: Function which writes the evaluation to a file,
+            called with an iterable of each team's MissionEvaluation, which
+            evaluates the teams as it's iterated, and the file.
+    Returns:
+        The job status.
+    """
+    remove_old_artifacts()
+    status = {
+        'id': uuid.uuid4().hex,
+        'mission': mission.pk,
+        'state': RUNNING,
+        'teams_done': 0,
+        'teams_total': 0,
+        'started': time.time(),
+    }
+    set_status(status)
+    # The thread updates the status, so return it as started.
+    started = dict(status)
+    args = (status, mission.pk, None
+            if users is None else [u.pk for u in users], write_artifact)
+    thread = threading.Thread(target=run_job_thread, args=args, daemon=True)
+    with _threads_lock:
+        _threads[status['id']] = thread
+    thread.start()
+    return started
+
+
+def run_job_thread(status, *args):
+    """Runs the job in a thread, closing the thread's database connection."""
+    try:
+        run_job(status, *args)
+    finally:
+        connection.close()
+        with _threads_lock:
+            del _threads[status['id']]
+
+
+def join_job(job_id, timeout=None):
+    """Waits for a job started by this process to finish.
+
+    Args:
+        job_id: The id of the job.
+        timeout: Optional time in seconds to wait.
+    Returns:
+        Whether the job is finished, or isn't running in this process.
+    """
+    with _threads_lock:
+        thread = _threads.get(job_id)
+    if thread is None:
+        return True
+    thread.join(timeout)
+    return not thread.is_alive()
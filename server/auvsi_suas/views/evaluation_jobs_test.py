@@ -0,0 +1,120 @@
+"""Tests for the evaluation_jobs module."""
+
+import os
+import time
+import zipfile
+from auvsi_suas.models import test_utils
+from auvsi_suas.views import evaluation_jobs
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TransactionTestCase
+
+
+def write_usernames(team_evals, f):
+    """Writes a zip with the evaluated usernames."""
+    with zipfile.ZipFile(f, 'w') as zip_file:
+        zip_file.writestr('usernames.txt', '\n'.join(t.team.username
+                                                     for t in team_evals))
+
+
+def read_usernames(job_id):
+    """Reads the usernames of the job's artifact."""
+    with zipfile.ZipFile(evaluation_jobs.artifact_path(job_id)) as zip_file:
+        return zip_file.read('usernames.txt').decode('utf-8').split('\n')
+
+
+def finish_job(status):
+    """Waits for the started job to finish, and gets its status."""
+    assert evaluation_jobs.join_job(status['id'], timeout=30)
+    return evaluation_jobs.job_status(status['id'])
+
+
+class TestEvaluationJobs(TransactionTestCase):
+    """Tests jobs run in a background thread.
+
+    Jobs read the database with the thread's own connection, so tests aren't
+    run in a transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        self.users = []
+        for i in range(2):
+            user = User.objects.create_user('user%d' % i, 'email@example.com',
+                                            'testpass')
+            test_utils.simulate_team_mission(self, self.mission,
+                                             self.superuser, user)
+            self.users.append(user)
+
+    def test_job(self):
+        """Tests a job evaluates the teams and writes the artifact."""
+        started = evaluation_jobs.start_job(self.mission, None,
+                                            write_usernames)
+        self.assertEqual(evaluation_jobs.RUNNING, started['state'])
+
+        status = finish_job(started)
+        self.assertEqual(evaluation_jobs.DONE, status['state'])
+        self.assertEqual(2, status['teams_done'])
+        self.assertEqual(2, status['teams_total'])
+        self.assertEqual(started['started'], status['started'])
+        self.assertGreaterEqual(status['heartbeat'], status['started'])
+        self.assertEqual(['user0', 'user1'], read_usernames(status['id']))
+
+    def test_job_users(self):
+        """Tests a job evaluating specific users."""
+        status = finish_job(
+            evaluation_jobs.start_job(self.mission, self.users[1:],
+                                      write_usernames))
+        self.assertEqual(1, status['teams_total'])
+        self.assertEqual(['user1'], read_usernames(status['id']))
+
+    def test_job_failed(self):
+        """Tests a job which fails records the error."""
+
+        def write_fails(team_evals, f):
+            raise ValueError('Write failed.')
+
+        status = finish_job(
+            evaluation_jobs.start_job(self.mission, None, write_fails))
+        self.assertEqual(evaluation_jobs.FAILED, status['state'])
+        self.assertEqual('Write failed.', status['error'])
+        self.assertFalse(
+            os.path.exists(evaluation_jobs.artifact_path(status['id'])))
+
+    def test_job_stale(self):
+        """Tests a running job without a recent heartbeat is failed."""
+        status = finish_job(
+            evaluation_jobs.start_job(self.mission, None, write_usernames))
+        # Simulates a running job whose process stopped.
+        status['state'] = evaluation_jobs.RUNNING
+        evaluation_jobs.set_status(status)
+        self.assertEqual(evaluation_jobs.RUNNING,
+                         evaluation_jobs.job_status(status['id'])['state'])
+
+        status['heartbeat'] = time.time() - evaluation_jobs.JOB_STALE_SEC - 1
+        cache.set(evaluation_jobs.JOB_KEY % status['id'], status)
+        stale = evaluation_jobs.job_status(status['id'])
+        self.assertEqual(evaluation_jobs.FAILED, stale['state'])
+        self.assertIn('No heartbeat', stale['error'])
+
+    def test_unknown_job(self):
+        """Tests the status of unknown jobs."""
+        self.assertIsNone(evaluation_jobs.job_status('0123456789abcdef'))
+        self.assertTrue(evaluation_jobs.join_job('0123456789abcdef'))
+
+    def test_remove_old_artifacts(self):
+        """Tests artifacts are removed after the job timeout."""
+        old = finish_job(
+            evaluation_jobs.start_job(self.mission, None, write_usernames))
+        old_path = evaluation_jobs.artifact_path(old['id'])
+        old_time = time.time() - evaluation_jobs.JOB_TIMEOUT - 1
+        os.utime(old_path, (old_time, old_time))
+
+        new = finish_job(
+            evaluation_jobs.start_job(self.mission, None, write_usernames))
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(
+            os.path.exists(evaluation_jobs.artifact_path(new['id'])))
@@ -2,12 +2,12 @@
 
 import logging
 from auvsi_suas.proto.interop_api_pb2 import Credentials
+from auvsi_suas.views.protobuf import parse_request
 from django.contrib.auth import authenticate
 from django.contrib.auth import login
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
 from django.views.generic import View
-from google.protobuf import json_format
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ class Login(View):
     def post(self, request):
         creds = Credentials()
         try:
-            json_format.Parse(request.body, creds)
+            parse_request(request, creds)
         except Exception as e:
             return HttpResponseBadRequest(
                 'Failed to parse request. Error: %s' % str(e))
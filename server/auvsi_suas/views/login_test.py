@@ -63,3 +63,14 @@ class TestLoginUserView(TestCase):
             data=self.login_request_body('testuser', 'testpass'),
             content_type='application/json')
         self.assertEqual(200, response.status_code)
+
+    def test_correct_credentials_proto(self):
+        """Tests correct credentials for login as binary proto."""
+        request_proto = Credentials()
+        request_proto.username = 'testuser'
+        request_proto.password = 'testpass'
+        response = self.client.post(
+            login_url,
+            data=request_proto.SerializeToString(),
+            content_type='application/x-protobuf')
+        self.assertEqual(200, response.status_code)
@@ -1,42 +1,65 @@
 """Missions view."""
 
-import copy
+import base64
 import csv
+import functools
+import hashlib
 import io
 import json
 import logging
 import math
 import numpy as np
+import tempfile
+import textwrap
+import time
 import zipfile
 from auvsi_suas.models import distance
+from auvsi_suas.models import evaluation_data
+from auvsi_suas.models import flight_track_cache
+from auvsi_suas.models import mission_cache
 from auvsi_suas.models import mission_evaluation
+from auvsi_suas.models import team_status_cache
 from auvsi_suas.models import units
 from auvsi_suas.models.mission_config import MissionConfig
-from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.telemetry_track import TRACK_FIELDS
+from auvsi_suas.models.telemetry_track import TrackPoint
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.patches.simplekml_patch import AltitudeMode
 from auvsi_suas.patches.simplekml_patch import Color
 from auvsi_suas.patches.simplekml_patch import Kml
 from auvsi_suas.patches.simplekml_patch import RefreshMode
 from auvsi_suas.proto import interop_api_pb2
+from auvsi_suas.views import evaluation_jobs
 from auvsi_suas.views.decorators import require_login
 from auvsi_suas.views.decorators import require_superuser
-from auvsi_suas.views.json import ProtoJsonEncoder
+from auvsi_suas.views.protobuf import proto_list_response
+from auvsi_suas.views.protobuf import serialize_proto
+from auvsi_suas.views.protobuf import serialized_proto_response
 from datetime import timedelta
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
 from django.contrib.sessions.models import Session
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.urlresolvers import reverse
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
 from django.http import HttpResponseForbidden
 from django.http import HttpResponseNotFound
-from django.http import HttpResponseServerError
+from django.http import StreamingHttpResponse
 from django.template.loader import get_template
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django.views.generic import View
 from google.protobuf import json_format
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.internal import type_checkers
+from sendfile import sendfile
+from xml.sax.saxutils import escape as xml_escape
 
 logger = logging.getLogger(__name__)
 
@@ -47,10 +70,51 @@ KML_OBST_NUM_POINTS = 20
 KML_ODLC_ICON = 'http://maps.google.com/mapfiles/kml/shapes/donut.png'
 KML_PLANE_ICON = 'http://maps.google.com/mapfiles/kml/shapes/airports.png'
 KML_WAYPOINT_ICON = 'http://maps.google.com/mapfiles/kml/paddle/blu-circle.png'
+KML_FLIGHT_STYLE = 'flight'
+
+# Placeholder for the update link in the cached live KML, replaced per viewer.
+LIVE_KML_UPDATE_HREF = 'LIVE_KML_UPDATE_HREF'
+# Time in seconds between live KML updates. Each update is rendered once per
+# tick, and shared by all viewers.
+LIVE_KML_UPDATE_TICK_SEC = 1
+# Cache key for the rendered live KML update.
+LIVE_KML_UPDATE_KEY = 'live_kml/update'
+# Time in seconds the user of a live KML session is cached.
+LIVE_KML_SESSION_TIMEOUT = 60
+# Cache key for the user of a live KML session.
+LIVE_KML_SESSION_KEY = 'live_kml/session/%s'
+
+# Size in bytes of the chunks copied into zip entries.
+ZIP_COPY_CHUNK_BYTES = 64 * 1024
+
+
+def missions_query():
+    """Gets a query of missions with the parts serialized by mission_proto.
+
+    Related positions are selected, and the fly zones, boundary points,
+    waypoints and obstacles are prefetched, so serializing any number of
+    missions takes a constant number of queries.
+    """
+    return MissionConfig.objects.select_related(
+        *mission_cache.POSITION_FIELDS).prefetch_related(
+            'fly_zones__boundary_pts', 'mission_waypoints',
+            'search_grid_points', 'air_drop_boundary_points',
+            'stationary_obstacles')
+
+
+def by_order(waypoints):
+    """Sorts waypoints by order, so prefetched waypoints can be sorted."""
+    return sorted(waypoints, key=lambda w: w.order)
 
 
 def mission_proto(mission):
-    """Converts a mission to protobuf format."""
+    """Converts a mission to protobuf format.
+
+    Args:
+        mission: The MissionConfig, preferably from missions_query().
+    Returns:
+        The interop_api_pb2.Mission.
+    """
     mission_proto = interop_api_pb2.Mission()
     mission_proto.id = mission.pk
 
@@ -61,18 +125,18 @@ def mission_proto(mission):
         fly_zone_proto = mission_proto.fly_zones.add()
         fly_zone_proto.altitude_min = fly_zone.altitude_msl_min
         fly_zone_proto.altitude_max = fly_zone.altitude_msl_max
-        for boundary_point in fly_zone.boundary_pts.order_by('order').all():
+        for boundary_point in by_order(fly_zone.boundary_pts.all()):
             boundary_proto = fly_zone_proto.boundary_points.add()
             boundary_proto.latitude = boundary_point.latitude
             boundary_proto.longitude = boundary_point.longitude
 
-    for waypoint in mission.mission_waypoints.order_by('order').all():
+    for waypoint in by_order(mission.mission_waypoints.all()):
         waypoint_proto = mission_proto.waypoints.add()
         waypoint_proto.latitude = waypoint.latitude
         waypoint_proto.longitude = waypoint.longitude
         waypoint_proto.altitude = waypoint.altitude_msl
 
-    for search_point in mission.search_grid_points.order_by('order').all():
+    for search_point in by_order(mission.search_grid_points.all()):
         search_point_proto = mission_proto.search_grid_points.add()
         search_point_proto.latitude = search_point.latitude
         search_point_proto.longitude = search_point.longitude
@@ -83,7 +147,7 @@ def mission_proto(mission):
     mission_proto.emergent_last_known_pos.latitude = mission.emergent_last_known_pos.latitude
     mission_proto.emergent_last_known_pos.longitude = mission.emergent_last_known_pos.longitude
 
-    for pt in mission.air_drop_boundary_points.order_by('order').all():
+    for pt in by_order(mission.air_drop_boundary_points.all()):
         proto = mission_proto.air_drop_boundary_points.add()
         proto.latitude = pt.latitude
         proto.longitude = pt.longitude
@@ -105,6 +169,26 @@ def mission_proto(mission):
     return mission_proto
 
 
+def serialized_missions(pks):
+    """Gets the serialized missions, serializing those not cached.
+
+    Args:
+        pks: The pks of the missions.
+    Returns:
+        A dict of mission pk to SerializedProto, for missions which exist.
+    """
+    missions = mission_cache.get_missions(pks)
+    missing = [pk for pk in pks if pk not in missions]
+    if missing:
+        serialized = {
+            m.pk: serialize_proto(mission_proto(m))
+            for m in missions_query().filter(pk__in=missing)
+        }
+        mission_cache.set_missions(serialized)
+        missions.update(serialized)
+    return missions
+
+
 class Missions(View):
     """Handles requests for all missions."""
 
@@ -113,14 +197,18 @@ class Missions(View):
         return super(Missions, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        missions = MissionConfig.objects.select_related().all()
+        pks = list(
+            MissionConfig.objects.order_by('pk').values_list('pk', flat=True))
+        missions = serialized_missions(pks)
         out = []
-        for mission in missions:
-            out.append(mission_proto(mission))
+        for pk in pks:
+            if pk in missions:
+                mission = interop_api_pb2.Mission()
+                mission.ParseFromString(missions[pk].proto)
+                out.append(mission)
 
-        return HttpResponse(
-            json.dumps(out, cls=ProtoJsonEncoder),
-            content_type="application/json")
+        return proto_list_response(request, out,
+                                   interop_api_pb2.MissionList(), 'missions')
 
 
 class MissionsId(View):
@@ -131,14 +219,11 @@ class MissionsId(View):
         return super(MissionsId, self).dispatch(*args, **kwargs)
 
     def get(self, request, pk):
-        try:
-            mission = MissionConfig.objects.select_related().get(pk=pk)
-        except MissionConfig.DoesNotExist:
+        mission = serialized_missions([int(pk)]).get(int(pk))
+        if mission is None:
             return HttpResponseNotFound('Mission %s not found.' % pk)
 
-        return HttpResponse(
-            json_format.MessageToJson(mission_proto(mission)),
-            content_type="application/json")
+        return serialized_proto_response(request, mission)
 
 
 def fly_zone_kml(fly_zone, kml):
@@ -269,74 +354,135 @@ def mission_kml(mission, kml, kml_doc):
     return kml_folder
 
 
-def uas_telemetry_kml(user, flight_logs, kml, kml_doc):
-    """
-    Appends kml nodes describing the given user's flight as described
-    by the log array given.
+def flight_track_kml(name, points):
+    """Renders the KML of a flight as a gx:Track.
 
     Args:
-        user: A Django User to get username from
-        flight_logs: A sequence of UasTelemetry logs per flight period.
-        kml: A simpleKML Container to which the flight data will be added
-        kml_doc: The simpleKML Document to which schemas will be added
+        name: The name of the track.
+        points: An iterable of the flight's TrackPoints, in time order.
     Returns:
-        None
+        The KML Placemark of the track, or None if there are no points.
     """
-    # Lazily create folder iff there is data.
-    kml_folder = None
-
-    for i, logs in enumerate(flight_logs):
-        name = '%s Flight %d' % (user.username, i + 1)
-
-        logs = UasTelemetry.dedupe(UasTelemetry.filter_bad(logs))
-
-        coords = []
-        angles = []
-        when = []
-        for entry in logs:
-            # Spatial Coordinates
-            coord = (entry.longitude, entry.latitude,
-                     units.feet_to_meters(entry.altitude_msl))
-            coords.append(coord)
-
-            # Time Elements
-            time = entry.timestamp.strftime(KML_DATETIME_FORMAT)
-            when.append(time)
-
-            # Degrees heading, tilt, and roll
-            angle = (entry.uas_heading, 0.0, 0.0)
-            angles.append(angle)
-
-        # Ignore tracks with no data.
-        if not coords or not angles or not when:
-            continue
+    whens = []
+    coords = []
+    angles = []
+    for point in UasTelemetry.dedupe(UasTelemetry.filter_bad(points)):
+        whens.append(
+            '<when>%s</when>' % point.timestamp.strftime(KML_DATETIME_FORMAT))
+        coords.append('<gx:coord>%r %r %r</gx:coord>' %
+                      (point.longitude, point.latitude,
+                       units.feet_to_meters(point.altitude_msl)))
+        # Degrees heading, tilt, and roll
+        angles.append('<gx:angles>%r 0.0 0.0</gx:angles>' % point.uas_heading)
+
+    # Ignore tracks with no data.
+    if not whens:
+        return None
+
+    return ''.join([
+        '<Placemark><name>%s</name>' % xml_escape(name),
+        '<styleUrl>#%s</styleUrl>' % KML_FLIGHT_STYLE,
+        '<gx:Track><extrude>1</extrude>',
+        '<altitudeMode>absolute</altitudeMode>',
+    ] + whens + coords + angles + ['</gx:Track></Placemark>'])
+
+
+def flights_kml(mission, users, start, end, simplify=None):
+    """Generates the KML of the teams' flights of a mission.
+
+    Telemetry is iterated from the database per flight, so only one flight is
+    held in memory at a time.
 
-        # Start folder if not done so already.
-        if not kml_folder:
-            kml_folder = kml.newfolder(name=user.username)
-
-        # Create a new track in the folder
-        trk = kml_folder.newgxtrack(name=name)
-        trk.altitudemode = AltitudeMode.absolute
-
-        # Append flight data
-        trk.newwhen(when)
-        trk.newgxcoord(coords)
-        trk.newgxangle(angles)
+    Args:
+        mission: The MissionConfig of the flights.
+        users: Optional list of users to export. If None, exports all teams.
+        start: Optional time before which telemetry is excluded.
+        end: Optional time from which telemetry is excluded.
+        simplify: Optional (tolerance in feet, min interval) to simplify the
+            tracks with. If None, tracks have all telemetry.
+    Yields:
+        Parts of the KML folder of each team with telemetry in the flights.
+    """
+    for team in evaluation_data.load_teams(mission, users):
+        # Lazily create folder iff there is data.
+        folder_started = False
+        for i, flight in enumerate(team.flights):
+            # Limit the flight to the exported time range.
+            flight_start = max(
+                [t for t in [flight.start, start] if t], default=None)
+            flight_end = min([t for t in [flight.end, end] if t], default=None)
+            if flight_start and flight_end and flight_start >= flight_end:
+                continue
+
+            if simplify:
+                points = flight_track_cache.simplified_track(
+                    team.user.pk, flight_start, flight_end, *simplify)
+            else:
+                # Same bounds as UasTelemetry.by_time_period().
+                query = UasTelemetry.objects.filter(user_id=team.user.pk)
+                if flight_start:
+                    query = query.filter(timestamp__gte=flight_start)
+                if flight_end:
+                    query = query.filter(timestamp__lt=flight_end)
+                rows = query.order_by('timestamp').values_list(
+                    *TRACK_FIELDS).iterator()
+                points = (TrackPoint(*row) for row in rows)
+
+            track = flight_track_kml('%s Flight %d' % (team.user.username,
+                                                       i + 1), points)
+            if not track:
+                continue
+            if not folder_started:
+                yield '<Folder><name>%s</name>' % xml_escape(
+                    team.user.username)
+                folder_started = True
+            yield track
+        if folder_started:
+            yield '</Folder>'
+
+
+def export_kml(missions, users, start, end, simplify=None):
+    """Generates the KML export of missions and the teams' flights.
 
-        # Set styling
-        trk.extrude = 1  # Extend path to ground
-        trk.style.linestyle.width = 2
-        trk.style.linestyle.color = Color.blue
-        trk.iconstyle.icon.href = KML_PLANE_ICON
+    Args:
+        missions: The MissionConfigs to export.
+        users: Optional list of users to export. If None, exports all teams.
+        start: Optional time before which telemetry is excluded.
+        end: Optional time from which telemetry is excluded.
+        simplify: Optional (tolerance in feet, min interval) to simplify the
+            tracks with. If None, tracks have all telemetry.
+    Yields:
+        Consecutive parts of the KML document.
+    """
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<kml xmlns="http://www.opengis.net/kml/2.2" '
+           'xmlns:gx="http://www.google.com/kml/ext/2.2"><Document>'
+           '<name>AUVSI SUAS Flight Data</name>')
+    # Style shared by all flights.
+    yield ('<Style id="%s"><IconStyle><Icon><href>%s</href></Icon>'
+           '</IconStyle><LineStyle><color>%s</color><width>2</width>'
+           '</LineStyle></Style>' % (KML_FLIGHT_STYLE, KML_PLANE_ICON,
+                                     Color.blue))
+    yield '<Folder><name>Missions</name>'
+    for mission in missions:
+        # Missions are small, so are rendered whole. The flights are nested
+        # in the mission's folder, before its closing tag.
+        kml = Kml()
+        mission_folder = str(mission_kml(mission, kml, kml.document))
+        yield mission_folder[:-len('</Folder>')]
+        yield '<Folder><name>Flights</name>'
+        for part in flights_kml(mission, users, start, end, simplify):
+            yield part
+        yield '</Folder></Folder>'
+    yield '</Folder></Document></kml>'
 
 
 def uas_telemetry_live_kml(kml, timespan):
     users = User.objects.order_by('username').all()
+    statuses = team_status_cache.team_statuses(users)
     for user in users:
-        try:
-            log = UasTelemetry.by_user(user).latest('timestamp')
-        except UasTelemetry.DoesNotExist:
+        log = statuses[user.pk].telemetry
+        if log is None:
             continue
 
         if log.timestamp < timezone.now() - timespan:
@@ -360,31 +506,84 @@ class ExportKml(View):
         return super(ExportKml, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        kml = Kml(name='AUVSI SUAS Flight Data')
-        kml_missions = kml.newfolder(name='Missions')
-        users = User.objects.order_by('username').all()
-        for mission in MissionConfig.objects.select_related().all():
-            kml_mission = mission_kml(mission, kml_missions, kml.document)
-            kml_flights = kml_mission.newfolder(name='Flights')
-            for user in users:
-                if user.is_superuser:
-                    continue
-                flights = TakeoffOrLandingEvent.flights(mission, user)
-                if not flights:
-                    continue
-                uas_telemetry_kml(
-                    user=user,
-                    flight_logs=UasTelemetry.by_time_period(user, flights),
-                    kml=kml_flights,
-                    kml_doc=kml.document)
-
-        response = HttpResponse(kml.kml())
-        response['Content-Type'] = 'application/vnd.google-earth.kml+xml'
+        missions = MissionConfig.objects.select_related().order_by('pk')
+        if 'mission' in request.GET:
+            try:
+                mission_id = int(request.GET['mission'])
+            except ValueError:
+                return HttpResponseBadRequest('Mission not an ID.')
+            missions = missions.filter(pk=mission_id)
+            if not missions.exists():
+                return HttpResponseNotFound('Mission not found.')
+        try:
+            users = evaluate_users(request)
+            start = export_time(request, 'start')
+            end = export_time(request, 'end')
+            simplify = export_simplify(request)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        except User.DoesNotExist:
+            return HttpResponseNotFound('Team not found.')
+
+        # Stream the KML as it's rendered.
+        response = StreamingHttpResponse(
+            export_kml(missions, users, start, end, simplify),
+            content_type='application/vnd.google-earth.kml+xml')
         response['Content-Disposition'] = 'attachment; filename=mission.kml'
-        response['Content-Length'] = str(len(response.content))
         return response
 
 
+def export_simplify(request):
+    """Gets the optional simplification of the exported tracks.
+
+    Tracks are simplified within the 'tolerance' parameter in feet, and limited
+    to the 'max_rate' parameter in Hz. Either defaults to no limit.
+
+    Args:
+        request: The request.
+    Returns:
+        The (tolerance in feet, min interval) to simplify tracks with, or None
+        if neither is given.
+    Raises:
+        ValueError: The tolerance or max rate is invalid.
+    """
+    if 'tolerance' not in request.GET and 'max_rate' not in request.GET:
+        return None
+    try:
+        tolerance_ft = float(request.GET.get('tolerance', 0))
+        max_rate_hz = float(request.GET.get('max_rate', 'inf'))
+    except ValueError:
+        raise ValueError('Tolerance and max rate must be numbers.')
+    if not (0 <= tolerance_ft < float('inf')) or not max_rate_hz > 0:
+        raise ValueError('Tolerance must be at least 0, and max rate above 0.')
+    return (tolerance_ft, timedelta(seconds=1 / max_rate_hz))
+
+
+def export_time(request, param):
+    """Gets an optional time filter of the KML export from the request.
+
+    Args:
+        request: The request, with the time as an ISO 8601 parameter.
+        param: The name of the parameter.
+    Returns:
+        The time, or None if not given. Times without a timezone are in the
+        current timezone.
+    Raises:
+        ValueError: The time is invalid.
+    """
+    if param not in request.GET:
+        return None
+    try:
+        value = parse_datetime(request.GET[param])
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValueError('Invalid %s time.' % param)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
 class LiveKml(View):
     """ Generates a KML for live display.
     This KML uses a network link to update via the update.kml endpoint
@@ -395,27 +594,82 @@ class LiveKml(View):
         return super(LiveKml, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        kml = Kml(name='AUVSI SUAS LIVE Flight Data')
-        kml_missions = kml.newfolder(name='Missions')
-        for mission in MissionConfig.objects.select_related().all():
-            mission_kml(mission, kml_missions, kml.document)
-
         parameters = '?sessionid={}'.format(request.COOKIES['sessionid'])
         uri = request.build_absolute_uri(
             '/api/missions/update.kml') + parameters
 
-        netlink = kml.newnetworklink(name="Live Data")
-        netlink.link.href = uri
-        netlink.link.refreshmode = RefreshMode.oninterval
-        netlink.link.refreshinterval = 1.0
-
-        response = HttpResponse(kml.kml())
+        # The missions are rendered once, and only the link differs by viewer.
+        rendered = cache.get(mission_cache.MISSIONS_KML_KEY)
+        if rendered is None:
+            kml = Kml(name='AUVSI SUAS LIVE Flight Data')
+            kml_missions = kml.newfolder(name='Missions')
+            for mission in MissionConfig.objects.select_related().all():
+                mission_kml(mission, kml_missions, kml.document)
+
+            netlink = kml.newnetworklink(name="Live Data")
+            netlink.link.href = LIVE_KML_UPDATE_HREF
+            netlink.link.refreshmode = RefreshMode.oninterval
+            netlink.link.refreshinterval = LIVE_KML_UPDATE_TICK_SEC
+
+            rendered = kml.kml()
+            cache.set(
+                mission_cache.MISSIONS_KML_KEY,
+                rendered,
+                timeout=mission_cache.CACHE_TIMEOUT)
+
+        response = HttpResponse(
+            rendered.replace(LIVE_KML_UPDATE_HREF, xml_escape(uri)))
         response['Content-Type'] = 'application/vnd.google-earth.kml+xml'
         response['Content-Disposition'] = 'attachment; filename=live.kml'
         response['Content-Length'] = str(len(response.content))
         return response
 
 
+def session_user_key(session_key):
+    """Gets the cache key for the user of a session."""
+    return LIVE_KML_SESSION_KEY % hashlib.sha1(
+        session_key.encode('utf-8')).hexdigest()
+
+
+def session_user(session_key):
+    """Gets the user of a session, cached for LIVE_KML_SESSION_TIMEOUT.
+
+    The user is cached no longer than the session, and is removed from the
+    cache once the session is logged out or deleted.
+
+    Args:
+        session_key: The key of the session.
+    Returns:
+        The User of the session.
+    Raises:
+        ObjectDoesNotExist: The session or its user doesn't exist, or the
+            session expired.
+    """
+    key = session_user_key(session_key)
+    user = cache.get(key)
+    if user is None:
+        now = timezone.now()
+        session = Session.objects.get(
+            session_key=session_key, expire_date__gt=now)
+        uid = session.get_decoded().get('_auth_user_id')
+        user = User.objects.get(pk=uid)
+        timeout = min(LIVE_KML_SESSION_TIMEOUT,
+                      (session.expire_date - now).total_seconds())
+        cache.set(key, user, timeout=timeout)
+    return user
+
+
+@receiver(user_logged_out)
+def on_user_logged_out(sender, request, user, **kwargs):
+    if request.session.session_key:
+        cache.delete(session_user_key(request.session.session_key))
+
+
+@receiver(post_delete, sender=Session)
+def on_session_delete(sender, instance, **kwargs):
+    cache.delete(session_user_key(instance.session_key))
+
+
 def set_request_session_from_cookie(func):
     def wrapper(request):
         if 'sessionid' not in request.GET:
@@ -427,9 +681,7 @@ def set_request_session_from_cookie(func):
             request.COOKIES['sessionid'] = request.GET['sessionid']
 
             # Update the user associated with the cookie
-            session = Session.objects.get(session_key=request.GET['sessionid'])
-            uid = session.get_decoded().get('_auth_user_id')
-            request.user = User.objects.get(pk=uid)
+            request.user = session_user(request.GET['sessionid'])
         except ObjectDoesNotExist:
             return HttpResponseForbidden()
         else:
@@ -447,10 +699,18 @@ class LiveKmlUpdate(View):
         return super(LiveKmlUpdate, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        kml = Kml(name='LIVE Data')
-        uas_telemetry_live_kml(kml, timedelta(seconds=5))
-
-        response = HttpResponse(kml.kml())
+        # Rendered at most once per tick, for all viewers.
+        rendered = cache.get(LIVE_KML_UPDATE_KEY)
+        if rendered is None:
+            kml = Kml(name='LIVE Data')
+            uas_telemetry_live_kml(kml, timedelta(seconds=5))
+            rendered = kml.kml()
+            cache.set(
+                LIVE_KML_UPDATE_KEY,
+                rendered,
+                timeout=LIVE_KML_UPDATE_TICK_SEC)
+
+        response = HttpResponse(rendered)
         response['Content-Type'] = 'application/vnd.google-earth.kml+xml'
         response['Content-Disposition'] = 'attachment; filename=update.kml'
         response['Content-Length'] = str(len(response.content))
@@ -462,6 +722,162 @@ def pretty_json(json_str):
     return json.dumps(json.loads(json_str), indent=4)
 
 
+def json_float(value):
+    """Converts a float to its JSON value, as from json_format."""
+    if math.isinf(value):
+        return '-Infinity' if value < 0 else 'Infinity'
+    if math.isnan(value):
+        return 'NaN'
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def csv_field(field):
+    """Gets how a proto field is flattened into CSV columns.
+
+    Values are converted as by json_format, so the CSV matches a CSV of the
+    proto's JSON.
+
+    Args:
+        field: The FieldDescriptor.
+    Returns:
+        A tuple of the field's column name, whether it's repeated, and the
+        function converting a value to its CSV value. The function is None
+        for message fields, which are flattened into columns of their fields.
+    """
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        convert = None
+    elif cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        values = field.enum_type.values_by_number
+        convert = lambda v: values[v].name
+    elif field.type == FieldDescriptor.TYPE_BYTES:
+        convert = lambda v: base64.b64encode(v).decode('utf-8')
+    elif cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        convert = bool
+    elif cpp_type in (FieldDescriptor.CPPTYPE_INT64,
+                      FieldDescriptor.CPPTYPE_UINT64):
+        convert = str
+    elif cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        convert = json_float
+    elif cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        convert = lambda v: json_float(type_checkers.ToShortestFloat(v))
+    else:
+        convert = lambda v: v
+    return (field.json_name, field.label == FieldDescriptor.LABEL_REPEATED,
+            convert)
+
+
+def flatten_proto(message, prefix, row):
+    """Flattens the set fields of a message into CSV columns.
+
+    Column names are the JSON field names and repeated field indices, joined
+    by '.'.
+
+    Args:
+        message: The message to flatten.
+        prefix: Prefix of the message's column names.
+        row: Dict of column name to value to add the columns to.
+    """
+    for field, value in message.ListFields():
+        (name, repeated, convert) = csv_field(field)
+        column = prefix + name
+        if not repeated:
+            if convert is None:
+                flatten_proto(value, column + '.', row)
+            else:
+                row[column] = convert(value)
+            continue
+        for ix, item in enumerate(value):
+            item_column = '%s.%d' % (column, ix)
+            if convert is None:
+                flatten_proto(item, item_column + '.', row)
+            else:
+                row[item_column] = convert(item)
+
+
+def zip_info(name):
+    """Gets the ZipInfo of a file written now, like ZipFile.writestr()."""
+    info = zipfile.ZipInfo(name, time.localtime(time.time())[:6])
+    info.external_attr = 0o600 << 16
+    return info
+
+
+class ZipStream(object):
+    """Unseekable file which buffers writes until popped.
+
+    A ZipFile writes to an unseekable file sequentially, so the zip file can
+    be streamed as it's written.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        """Gets and removes the data written since the last pop."""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class EvaluationCsv(object):
+    """CSV of team evaluations, whose rows are buffered in a temporary file.
+
+    The columns are the flattened fields set in any of the evaluations, in
+    sorted order, so they're only known once all evaluations are added.
+    """
+
+    def __init__(self):
+        self.columns = set()
+        self.rows = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.rows.close()
+
+    def add(self, team_eval):
+        """Adds the row of a team's MissionEvaluation."""
+        row = {}
+        flatten_proto(team_eval, '', row)
+        self.columns.update(row.keys())
+        self.rows.write(json.dumps(row) + '\n')
+
+    def iter_write(self, f):
+        """Writes the CSV, yielding after each row.
+
+        Args:
+            f: The text file to write to.
+        """
+        columns = sorted(self.columns)
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        self.rows.seek(0)
+        for line in self.rows:
+            row = json.loads(line)
+            writer.writerow([row.get(c, '') for c in columns])
+            yield
+
+
+def iter_copy(src, dst):
+    """Copies a file from its start in chunks, yielding after each chunk."""
+    src.seek(0)
+    while True:
+        chunk = src.read(ZIP_COPY_CHUNK_BYTES)
+        if not chunk:
+            break
+        dst.write(chunk)
+        yield
+
+
 class Evaluate(View):
     """Evaluates the teams and returns a zip file with CSV & JSON data.
 
@@ -470,98 +886,231 @@ class Evaluate(View):
     """
 
     feedback_template = get_template('feedback.html')
+    feedback_team_template = get_template('feedback_team.html')
 
     @method_decorator(require_superuser)
     def dispatch(self, *args, **kwargs):
         return super(Evaluate, self).dispatch(*args, **kwargs)
 
-    def csv_from_json(self, json_list):
-        """Generates a CSV string from a list of rows as JSON strings."""
-        csv_list = []
-        for json_row in json_list:
-            csv_dict = {}
-            work_queue = [([], json.loads(json_row))]
-            while len(work_queue) > 0:
-                (cur_prefixes, cur_val) = work_queue.pop()
-                if isinstance(cur_val, dict):
-                    for (key, val) in cur_val.items():
-                        new_prefixes = copy.copy(cur_prefixes)
-                        new_prefixes.append(str(key))
-                        work_queue.append((new_prefixes, val))
-                elif isinstance(cur_val, list):
-                    for ix, val in enumerate(cur_val):
-                        new_prefixes = copy.copy(cur_prefixes)
-                        new_prefixes.append(str(ix))
-                        work_queue.append((new_prefixes, val))
+    def write_csv(self, team_evals, f):
+        """Writes a CSV with a row for each team evaluation.
+
+        Args:
+            team_evals: The MissionEvaluation of each team.
+            f: The text file to write to.
+        """
+        with EvaluationCsv() as evaluation_csv:
+            for team_eval in team_evals:
+                evaluation_csv.add(team_eval)
+            for _ in evaluation_csv.iter_write(f):
+                pass
+
+    def feedback_page(self):
+        """Gets the feedback page before and after the teams' feedback."""
+        page = self.feedback_template.render({'feedbacks': []})
+        split = page.rindex('\n</body>')
+        return (page[:split].encode(), page[split:].encode())
+
+    def iter_zip(self, team_evals, f):
+        """Writes the zip file of the evaluation, yielding after each part.
+
+        Each team is written as it's evaluated, and its JSON is dropped once
+        written. The files of all teams are buffered in temporary files until
+        all teams are written, so memory doesn't grow with the number of
+        teams. Entries are written in parts, so f may be a ZipStream which is
+        emptied as the zip file is written.
+
+        Args:
+            team_evals: An iterable of the MissionEvaluation of each team,
+                which may evaluate the teams as they're iterated.
+            f: The file to write to.
+        """
+        with zipfile.ZipFile(f, 'w') as zip_file, \
+                tempfile.TemporaryFile() as all_json, \
+                tempfile.TemporaryFile() as all_html, \
+                EvaluationCsv() as all_csv:
+            num_teams = 0
+            for team_eval in team_evals:
+                team_json = json_format.MessageToJson(team_eval, indent=4)
+                zip_file.writestr(
+                    '/evaluate_teams/teams/%s.json' % team_eval.team.username,
+                    team_json)
+                if num_teams > 0:
+                    all_json.write(b',\n')
+                all_json.write(textwrap.indent(team_json, ' ' * 8).encode())
+                all_html.write(
+                    self.feedback_team_template.render({
+                        'feedback': team_json
+                    }).encode())
+                all_csv.add(team_eval)
+                num_teams += 1
+                yield
+
+            # Equivalent to the JSON of all teams, from the team JSON.
+            with zip_file.open(zip_info('/evaluate_teams/all.json'),
+                               'w') as entry:
+                if num_teams == 0:
+                    entry.write(b'{}')
                 else:
-                    column_key = '.'.join(cur_prefixes)
-                    csv_dict[column_key] = cur_val
-            csv_list.append(csv_dict)
+                    entry.write(b'{\n    "teams": [\n')
+                    yield from iter_copy(all_json, entry)
+                    entry.write(b'\n    ]\n}')
+            yield
+
+            (page_start, page_end) = self.feedback_page()
+            with zip_file.open(zip_info('/evaluate_teams/all.html'),
+                               'w') as entry:
+                entry.write(page_start)
+                yield from iter_copy(all_html, entry)
+                entry.write(page_end)
+            yield
+
+            with zip_file.open(zip_info('/evaluate_teams/all.csv'),
+                               'w') as entry:
+                with io.TextIOWrapper(
+                        entry, encoding='utf-8', newline='') as text:
+                    yield from all_csv.iter_write(text)
+            yield
+
+    def write_zip(self, team_evals, f):
+        """Writes the zip file of the evaluation.
+
+        Args:
+            team_evals: An iterable of the MissionEvaluation of each team.
+            f: The file to write to.
+        """
+        for _ in self.iter_zip(team_evals, f):
+            pass
+
+    def stream_zip(self, team_evals):
+        """Generates the chunks of the zip file of the evaluation.
+
+        Args:
+            team_evals: An iterable of the MissionEvaluation of each team.
+        """
+        stream = ZipStream()
+        for _ in self.iter_zip(team_evals, stream):
+            chunk = stream.pop()
+            if chunk:
+                yield chunk
+        # The zip file's directory is written when closed.
+        yield stream.pop()
+
+    def get(self, request, pk):
+        try:
+            mission = MissionConfig.objects.select_related().get(pk=pk)
+        except MissionConfig.DoesNotExist:
+            return HttpResponseBadRequest('Mission not found.')
+        try:
+            users = evaluate_users(request)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        except User.DoesNotExist:
+            return HttpResponseNotFound('Team not found.')
 
-        col_headers = set()
-        for csv_dict in csv_list:
-            col_headers.update(csv_dict.keys())
-        col_headers = sorted(col_headers)
+        # Teams are evaluated as the zip file is streamed, so the zip file
+        # starts before all teams are evaluated.
+        team_evals = mission_evaluation.iter_evaluate_teams(mission, users)
+        return StreamingHttpResponse(
+            self.stream_zip(team_evals), content_type='application/zip')
 
-        csv_io = io.StringIO()
-        writer = csv.DictWriter(csv_io, fieldnames=col_headers)
-        writer.writeheader()
-        for csv_dict in csv_list:
-            writer.writerow(csv_dict)
-        csv_output = csv_io.getvalue()
-        csv_io.close()
 
-        return csv_output
+def evaluate_users(request):
+    """Gets the optional team to evaluate from the request.
 
-    def get(self, request, pk):
+    Returns:
+        A list with the team's User, or None to evaluate all teams.
+    Raises:
+        ValueError: The team is not an ID.
+        User.DoesNotExist: The team doesn't exist.
+    """
+    if 'team' not in request.GET:
+        return None
+    try:
+        team = int(request.GET['team'])
+    except ValueError:
+        raise ValueError('Team not an ID.')
+    return [User.objects.get(pk=team)]
+
+
+def job_response(pk, status):
+    """Gets the response for the status of an evaluation job."""
+    status = dict(status)
+    if status['state'] == evaluation_jobs.DONE:
+        status['artifact'] = reverse(
+            'auvsi_suas:evaluate_jobs_id_zip', args=[pk, status['id']])
+    return HttpResponse(json.dumps(status), content_type="application/json")
+
+
+def find_job(pk, job_id):
+    """Gets the status of the mission's evaluation job, or None."""
+    status = evaluation_jobs.job_status(job_id)
+    if status is None or status['mission'] != int(pk):
+        return None
+    return status
+
+
+class EvaluateJobs(View):
+    """Starts background jobs evaluating the teams.
+
+    The job status is polled with EvaluateJobsId, and once done the zip file
+    of Evaluate is downloaded with EvaluateJobsIdZip.
+    """
+
+    @method_decorator(require_superuser)
+    def dispatch(self, *args, **kwargs):
+        return super(EvaluateJobs, self).dispatch(*args, **kwargs)
+
+    def post(self, request, pk):
         try:
-            mission = MissionConfig.objects.select_related().get(pk=pk)
+            mission = MissionConfig.objects.get(pk=pk)
         except MissionConfig.DoesNotExist:
             return HttpResponseBadRequest('Mission not found.')
+        try:
+            users = evaluate_users(request)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        except User.DoesNotExist:
+            return HttpResponseNotFound('Team not found.')
 
-        # Get the optional team to eval.
-        users = None
-        if 'team' in request.GET:
-            try:
-                team = int(request.GET['team'])
-                users = [User.objects.get(pk=team)]
-            except TypeError:
-                return HttpResponseBadRequest('Team not an ID.')
-            except User.DoesNotExist:
-                return HttpResponseNotFound('Team not found.')
-
-        # Get the eval data for the teams.
-        mission_eval = mission_evaluation.evaluate_teams(mission, users)
-        if not mission_eval:
-            return HttpResponseServerError(
-                'Could not get user evaluation data.')
-
-        # Form Zip file.
-        zip_io = io.BytesIO()
-        with zipfile.ZipFile(zip_io, 'w') as zip_file:
-            zip_file.writestr(
-                '/evaluate_teams/all.json',
-                pretty_json(json_format.MessageToJson(mission_eval)))
-            team_jsons = []
-            for team_eval in mission_eval.teams:
-                team_json = pretty_json(json_format.MessageToJson(team_eval))
-                zip_file.writestr(
-                    '/evaluate_teams/teams/%s.json' % team_eval.team.username,
-                    team_json)
-                team_jsons.append(team_json)
+        status = evaluation_jobs.start_job(mission, users,
+                                           Evaluate().write_zip)
+        return job_response(pk, status)
 
-            zip_file.writestr('/evaluate_teams/all.html',
-                              self.feedback_template.render({
-                                  'feedbacks':
-                                  team_jsons
-                              }))
 
-            zip_file.writestr('/evaluate_teams/all.csv',
-                              self.csv_from_json(team_jsons))
-        zip_output = zip_io.getvalue()
-        zip_io.close()
+class EvaluateJobsId(View):
+    """Gets the status of an evaluation job."""
 
-        return HttpResponse(zip_output, content_type='application/zip')
+    @method_decorator(require_superuser)
+    def dispatch(self, *args, **kwargs):
+        return super(EvaluateJobsId, self).dispatch(*args, **kwargs)
+
+    def get(self, request, pk, job_id):
+        status = find_job(pk, job_id)
+        if status is None:
+            return HttpResponseNotFound('Job not found.')
+        return job_response(pk, status)
+
+
+class EvaluateJobsIdZip(View):
+    """Downloads the zip file of a finished evaluation job."""
+
+    @method_decorator(require_superuser)
+    def dispatch(self, *args, **kwargs):
+        return super(EvaluateJobsIdZip, self).dispatch(*args, **kwargs)
+
+    def get(self, request, pk, job_id):
+        status = find_job(pk, job_id)
+        if status is None:
+            return HttpResponseNotFound('Job not found.')
+        if status['state'] != evaluation_jobs.DONE:
+            return HttpResponseNotFound('Job not done.')
+        return sendfile(
+            request,
+            evaluation_jobs.artifact_path(job_id),
+            attachment=True,
+            attachment_filename='evaluate.zip',
+            mimetype='application/zip')
 
 
 class MissionDetails(TemplateView):
@@ -576,7 +1125,7 @@ class MissionDetails(TemplateView):
     def get_context_data(self, **kwargs):
         context = super(MissionDetails, self).get_context_data(**kwargs)
         pk = int(kwargs['pk'])
-        proto = mission_proto(MissionConfig.objects.get(pk=pk))
+        proto = mission_proto(missions_query().get(pk=pk))
         context['mission'] = proto
         context['mission_str'] = pretty_json(json_format.MessageToJson(proto))
         return context
@@ -1,16 +1,39 @@
 """Tests for the missions module."""
 
+import copy
+import csv
 import functools
 import io
 import json
+import tracemalloc
 import zipfile
+from auvsi_suas.models import mission_evaluation
 from auvsi_suas.models import test_utils
+from auvsi_suas.models.fly_zone import FlyZone
 from auvsi_suas.models.gps_position import GpsPosition
 from auvsi_suas.models.mission_config import MissionConfig
+from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from auvsi_suas.models.waypoint import Waypoint
+from auvsi_suas.proto import interop_admin_api_pb2
+from auvsi_suas.proto import interop_api_pb2
+from auvsi_suas.views import evaluation_jobs
+from auvsi_suas.views.missions import Evaluate
+from auvsi_suas.views.missions import export_kml
+from auvsi_suas.views.missions import mission_proto
+from auvsi_suas.views.missions import pretty_json
+from datetime import timedelta
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test import TransactionTestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from google.protobuf import json_format
 from xml.etree import ElementTree
 
 missions_url = reverse('auvsi_suas:missions')
@@ -19,10 +42,95 @@ export_url = reverse('auvsi_suas:export_kml')
 live_url = reverse('auvsi_suas:live_kml')
 update_url = update_url = reverse('auvsi_suas:update_kml')
 evaluate_url = functools.partial(reverse, 'auvsi_suas:evaluate')
+evaluate_jobs_url = functools.partial(reverse, 'auvsi_suas:evaluate_jobs')
+evaluate_jobs_id_url = functools.partial(reverse,
+                                         'auvsi_suas:evaluate_jobs_id')
+evaluate_jobs_id_zip_url = functools.partial(reverse,
+                                             'auvsi_suas:evaluate_jobs_id_zip')
 details_url = functools.partial(reverse, 'auvsi_suas:details')
 
 
-class TestMissionsViewCommon(TestCase):
+def csv_from_json(json_list):
+    """Generates a CSV string from a list of rows as JSON strings.
+
+    The CSV as generated before flattening the protos directly.
+    """
+    csv_list = []
+    for json_row in json_list:
+        csv_dict = {}
+        work_queue = [([], json.loads(json_row))]
+        while len(work_queue) > 0:
+            (cur_prefixes, cur_val) = work_queue.pop()
+            if isinstance(cur_val, dict):
+                for (key, val) in cur_val.items():
+                    new_prefixes = copy.copy(cur_prefixes)
+                    new_prefixes.append(str(key))
+                    work_queue.append((new_prefixes, val))
+            elif isinstance(cur_val, list):
+                for ix, val in enumerate(cur_val):
+                    new_prefixes = copy.copy(cur_prefixes)
+                    new_prefixes.append(str(ix))
+                    work_queue.append((new_prefixes, val))
+            else:
+                column_key = '.'.join(cur_prefixes)
+                csv_dict[column_key] = cur_val
+        csv_list.append(csv_dict)
+
+    col_headers = set()
+    for csv_dict in csv_list:
+        col_headers.update(csv_dict.keys())
+    col_headers = sorted(col_headers)
+
+    csv_io = io.StringIO()
+    writer = csv.DictWriter(csv_io, fieldnames=col_headers)
+    writer.writeheader()
+    for csv_dict in csv_list:
+        writer.writerow(csv_dict)
+    csv_output = csv_io.getvalue()
+    csv_io.close()
+
+    return csv_output
+
+
+def csv_from_protos(team_evals):
+    """Generates the CSV string with Evaluate.write_csv()."""
+    csv_io = io.StringIO()
+    Evaluate().write_csv(team_evals, csv_io)
+    return csv_io.getvalue()
+
+
+def buffered_zip(mission_eval):
+    """Writes the evaluation zip file in memory, as it was before streaming."""
+    evaluate = Evaluate()
+    zip_io = io.BytesIO()
+    with zipfile.ZipFile(zip_io, 'w') as zip_file:
+        zip_file.writestr('/evaluate_teams/all.json',
+                          pretty_json(json_format.MessageToJson(mission_eval)))
+        team_jsons = []
+        for team_eval in mission_eval.teams:
+            team_json = pretty_json(json_format.MessageToJson(team_eval))
+            zip_file.writestr(
+                '/evaluate_teams/teams/%s.json' % team_eval.team.username,
+                team_json)
+            team_jsons.append(team_json)
+        zip_file.writestr('/evaluate_teams/all.html',
+                          evaluate.feedback_template.render({
+                              'feedbacks':
+                              team_jsons
+                          }))
+        zip_file.writestr('/evaluate_teams/all.csv', csv_from_json(team_jsons))
+    zip_output = zip_io.getvalue()
+    zip_io.close()
+    return zip_output
+
+
+def zip_contents(zip_bytes):
+    """Gets a dict of the files in a zip file to their contents."""
+    with zipfile.ZipFile(io.BytesIO(zip_bytes), 'r') as zip_file:
+        return {name: zip_file.read(name) for name in zip_file.namelist()}
+
+
+class MissionsViewCommon(object):
     """Common test setup"""
 
     def setUp(self):
@@ -44,6 +152,10 @@ class TestMissionsViewCommon(TestCase):
         self.client.force_login(self.superuser)
 
 
+class TestMissionsViewCommon(MissionsViewCommon, TestCase):
+    """Common test setup, with tests run in a transaction."""
+
+
 class TestMissionsViewInvalidLogin(TestMissionsViewCommon):
     def test_not_authenticated(self):
         """Tests requests for insufficient authentication or authorization."""
@@ -162,6 +274,19 @@ class TestMissionsViewSampleMission(TestMissionsViewCommon):
         data = json.loads(response.content)
         self.assert_data(data)
 
+    def test_get_proto(self):
+        """Response is a binary proto when requested."""
+        self.Login()
+        response = self.client.get(
+            missions_id_url(args=[self.mission.pk]),
+            HTTP_ACCEPT='application/x-protobuf')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-protobuf', response['Content-Type'])
+        mission = interop_api_pb2.Mission()
+        mission.ParseFromString(response.content)
+        self.assertEqual(self.mission.pk, mission.id)
+        self.assertGreater(len(mission.waypoints), 0)
+
 
 class TestGenerateKMLCommon(TestMissionsViewCommon):
     """Tests the generateKML view."""
@@ -204,7 +329,7 @@ class TestGenerateKML(TestGenerateKMLCommon):
         self.LoginSuperuser()
         response = self.client.get(export_url)
         self.assertEqual(200, response.status_code)
-        kml_data = response.content
+        kml_data = b''.join(response.streaming_content)
         self.validate_kml(kml_data, self.folders, self.users)
 
 
@@ -238,11 +363,162 @@ class TestGenerateKMLWithSimulation(TestGenerateKMLCommon):
         response = self.client.get(export_url)
         self.assertEqual(200, response.status_code)
 
-        kml_data = response.content
+        kml_data = b''.join(response.streaming_content)
         self.validate_kml(kml_data, self.folders, self.users)
 
 
-class TestGenerateLiveKML(TestMissionsViewCommon):
+class TestGenerateKMLFilters(TestGenerateKMLCommon):
+    """Tests filtering the exported KML."""
+
+    def setUp(self):
+        super(TestGenerateKMLFilters, self).setUp()
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        test_utils.simulate_team_mission(self, self.mission, self.superuser,
+                                         self.user0)
+        self.other = test_utils.create_sample_mission(self.superuser)
+        self.LoginSuperuser()
+
+    def get_kml(self, params):
+        """Gets the exported KML with the filters."""
+        response = self.client.get(export_url, params)
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        kml_data = b''.join(response.streaming_content)
+        ElementTree.fromstring(kml_data)
+        return kml_data.decode('utf-8')
+
+    def test_invalid(self):
+        """Tests invalid filters are rejected."""
+        for params in [{
+                'mission': 'a'
+        }, {
+                'team': 'a'
+        }, {
+                'start': 'yesterday'
+        }, {
+                'end': '2019-13-01T00:00:00'
+        }]:
+            response = self.client.get(export_url, params)
+            self.assertEqual(400, response.status_code)
+        response = self.client.get(export_url, {'mission': 1000})
+        self.assertEqual(404, response.status_code)
+        response = self.client.get(export_url, {'team': 1000})
+        self.assertEqual(404, response.status_code)
+
+    def test_mission(self):
+        """Tests exporting a single mission."""
+        kml_data = self.get_kml({'mission': self.other.pk})
+        self.assertIn('<name>Mission %d</name>' % self.other.pk, kml_data)
+        self.assertNotIn('<name>Mission %d</name>' % self.mission.pk, kml_data)
+        self.assertNotIn('<name>user0</name>', kml_data)
+
+        kml_data = self.get_kml({'mission': self.mission.pk})
+        self.assertIn('<name>user0</name>', kml_data)
+
+    def test_team(self):
+        """Tests exporting a single team."""
+        kml_data = self.get_kml({'team': self.user1.pk})
+        self.assertNotIn('<name>user0</name>', kml_data)
+        kml_data = self.get_kml({'team': self.user0.pk})
+        self.assertIn('<name>user0</name>', kml_data)
+
+    def test_time_range(self):
+        """Tests exporting the telemetry within a time range."""
+        timestamps = list(
+            UasTelemetry.objects.filter(user=self.user0).order_by('timestamp')
+            .values_list('timestamp', flat=True))
+        all_data = self.get_kml({'mission': self.mission.pk})
+        self.assertEqual(len(timestamps), all_data.count('<when>'))
+        self.assertEqual(len(timestamps), all_data.count('<gx:coord>'))
+        self.assertEqual(len(timestamps), all_data.count('<gx:angles>'))
+
+        start = timestamps[10]
+        end = timestamps[20]
+        kml_data = self.get_kml({
+            'mission': self.mission.pk,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+        })
+        self.assertEqual(10, kml_data.count('<when>'))
+
+        kml_data = self.get_kml({
+            'start': (timestamps[-1] + timedelta(seconds=1)).isoformat()
+        })
+        self.assertNotIn('<name>user0</name>', kml_data)
+
+    def test_simplify(self):
+        """Tests exporting simplified tracks."""
+        all_data = self.get_kml({'mission': self.mission.pk})
+        kml_data = self.get_kml({
+            'mission': self.mission.pk,
+            'tolerance': 1e9,
+        })
+        self.assertIn('<name>user0</name>', kml_data)
+        self.assertEqual(2, kml_data.count('<when>'))
+        kml_data = self.get_kml({'mission': self.mission.pk, 'max_rate': 100})
+        self.assertLessEqual(
+            kml_data.count('<when>'), all_data.count('<when>'))
+
+        for params in [{
+                'tolerance': 'a'
+        }, {
+                'tolerance': -1
+        }, {
+                'max_rate': 0
+        }, {
+                'max_rate': 'nan'
+        }]:
+            response = self.client.get(export_url, params)
+            self.assertEqual(400, response.status_code)
+
+
+class TestGenerateKMLLoad(TestGenerateKMLCommon):
+    """Tests streaming the KML export of many flights."""
+
+    def test_loadtest(self):
+        """Tests the peak memory of the export against its size."""
+        num_flights = 20
+        num_telemetry = 1000
+        mission = test_utils.create_sample_mission(self.superuser)
+        start = timezone.now() - timedelta(hours=num_flights)
+        for i in range(num_flights):
+            flight_start = start + timedelta(hours=i)
+            for in_air, offset in [(True, 0), (False, num_telemetry)]:
+                TakeoffOrLandingEvent(
+                    user=self.user0,
+                    mission=mission,
+                    uas_in_air=in_air,
+                    timestamp=flight_start + timedelta(seconds=offset)).save()
+            telemetry = []
+            for j in range(num_telemetry):
+                telemetry.append(
+                    UasTelemetry(
+                        user=self.user0,
+                        latitude=38 + j * 1e-5,
+                        longitude=-76,
+                        altitude_msl=100,
+                        uas_heading=90,
+                        timestamp=flight_start + timedelta(seconds=j)))
+            UasTelemetry.objects.bulk_create(telemetry)
+
+        tracemalloc.start()
+        size = 0
+        for chunk in export_kml(
+                MissionConfig.objects.filter(pk=mission.pk), None, None, None):
+            size += len(chunk)
+        (_, stream_peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertLess(stream_peak, size)
+
+
+class TestGenerateLiveKML(MissionsViewCommon, TransactionTestCase):
+    """Tests the live KML.
+
+    Cached missions are cleared once changes are committed, so tests aren't
+    run in a transaction.
+    """
+
     def setUp(self):
         """Setup a single mission to test live kml with."""
         super(TestGenerateLiveKML, self).setUp()
@@ -262,6 +538,8 @@ class TestGenerateLiveKML(TestMissionsViewCommon):
         config.save()
         self.config = config
 
+        cache.clear()
+
     def test_generate_live_kml_not_logged_in(self):
         """Tests the generate KML method."""
         response = self.client.get(live_url)
@@ -304,6 +582,75 @@ class TestGenerateLiveKML(TestMissionsViewCommon):
                                    {'sessionid': self.get_session_id()})
         self.assertEqual(200, response.status_code)
 
+    def test_generate_live_kml_cached(self):
+        """Tests the missions are rendered once, but linked per session."""
+        self.LoginSuperuser()
+        with CaptureQueriesContext(connection) as uncached:
+            response = self.client.get(live_url)
+        self.assertEqual(200, response.status_code)
+        self.assertIn(self.get_session_id(), response.content.decode())
+
+        with CaptureQueriesContext(connection) as cached:
+            cached_response = self.client.get(live_url)
+        self.assertEqual(response.content, cached_response.content)
+        self.assertLess(len(cached), len(uncached))
+
+        # Another session gets its own link.
+        self.client.logout()
+        self.LoginSuperuser()
+        response = self.client.get(live_url)
+        self.assertIn(self.get_session_id(), response.content.decode())
+
+    def test_generate_live_kml_mission_changed(self):
+        """Tests the cached missions are rendered again on change."""
+        self.LoginSuperuser()
+        response = self.client.get(live_url)
+        self.assertNotIn('20.0', response.content.decode())
+
+        home_pos = GpsPosition(latitude=20, longitude=20)
+        home_pos.save()
+        self.config.home_pos = home_pos
+        self.config.save()
+
+        response = self.client.get(live_url)
+        self.assertIn('20.0', response.content.decode())
+
+    def test_generate_live_kml_update_shared(self):
+        """Tests the update is rendered once per tick for all viewers."""
+        self.LoginSuperuser()
+        params = {'sessionid': self.get_session_id()}
+        with CaptureQueriesContext(connection) as uncached:
+            response = self.client.get(update_url, params)
+        self.assertEqual(200, response.status_code)
+
+        with CaptureQueriesContext(connection) as cached:
+            cached_response = self.client.get(update_url, params)
+        self.assertEqual(200, cached_response.status_code)
+        self.assertEqual(response.content, cached_response.content)
+        # Both the session's user and the update are cached.
+        self.assertEqual(0, len(cached))
+        self.assertLess(0, len(uncached))
+
+    def test_generate_live_kml_update_logged_out(self):
+        """Tests the cached user of a session is removed on logout."""
+        self.LoginSuperuser()
+        params = {'sessionid': self.get_session_id()}
+        response = self.client.get(update_url, params)
+        self.assertEqual(200, response.status_code)
+
+        self.client.logout()
+        response = self.client.get(update_url, params)
+        self.assertEqual(403, response.status_code)
+
+    def test_generate_live_kml_update_expired(self):
+        """Tests expired sessions aren't authorized."""
+        self.LoginSuperuser()
+        params = {'sessionid': self.get_session_id()}
+        Session.objects.filter(session_key=params['sessionid']).update(
+            expire_date=timezone.now())
+        response = self.client.get(update_url, params)
+        self.assertEqual(403, response.status_code)
+
     def get_session_id(self):
         for item in self.client.cookies.items():
             morsel = item[1]
@@ -351,19 +698,19 @@ class TestEvaluateTeams(TestMissionsViewCommon):
 
     def load_json(self, response):
         """Gets the json data out of the response's zip archive."""
-        zip_io = io.BytesIO(response.content)
+        zip_io = io.BytesIO(b''.join(response.streaming_content))
         with zipfile.ZipFile(zip_io, 'r') as zip_file:
             return json.loads(zip_file.read('/evaluate_teams/all.json'))
 
     def load_html(self, response):
         """Gets the HTML data out of the response's zip archive."""
-        zip_io = io.BytesIO(response.content)
+        zip_io = io.BytesIO(b''.join(response.streaming_content))
         with zipfile.ZipFile(zip_io, 'r') as zip_file:
             return zip_file.read('/evaluate_teams/all.html').decode('utf-8')
 
     def load_csv(self, response):
         """Gets the CSV data out of the response's zip archive."""
-        zip_io = io.BytesIO(response.content)
+        zip_io = io.BytesIO(b''.join(response.streaming_content))
         with zipfile.ZipFile(zip_io, 'r') as zip_file:
             return zip_file.read('/evaluate_teams/all.csv').decode('utf-8')
 
@@ -410,6 +757,223 @@ class TestEvaluateTeams(TestMissionsViewCommon):
         self.assertIn('waypoints', csv_data)
         self.assertIn('user0', csv_data)
 
+    def test_evaluate_teams_matches_buffered(self):
+        """Tests the streamed zip has the files of the buffered zip."""
+        self.LoginSuperuser()
+        user2 = User.objects.create_user('user2', 'email@example.com',
+                                         'testpass')
+        test_utils.simulate_team_mission(self, self.mission, self.superuser,
+                                         user2)
+        mission_eval = mission_evaluation.evaluate_teams(self.mission)
+        self.assertEqual(2, len(mission_eval.teams))
+        response = self.client.get(evaluate_url(args=[self.mission.pk]))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            zip_contents(buffered_zip(mission_eval)),
+            zip_contents(b''.join(response.streaming_content)))
+
+    def test_evaluate_teams_no_teams(self):
+        """Tests the zip file without active teams."""
+        mission_eval = interop_admin_api_pb2.MultiUserMissionEvaluation()
+        self.assertEqual(
+            zip_contents(buffered_zip(mission_eval)),
+            zip_contents(b''.join(Evaluate().stream_zip(mission_eval.teams))))
+
+    def test_evaluate_teams_streamed_as_evaluated(self):
+        """Tests the zip file streams before all teams are evaluated."""
+        evaluated = []
+
+        def team_evals():
+            for i in range(3):
+                evaluated.append(i)
+                team_eval = interop_admin_api_pb2.MissionEvaluation()
+                team_eval.team.username = 'team%d' % i
+                yield team_eval
+
+        chunks = Evaluate().stream_zip(team_evals())
+        first_chunk = next(chunks)
+        self.assertTrue(first_chunk)
+        self.assertEqual([0], evaluated)
+        zip_bytes = first_chunk + b''.join(chunks)
+        self.assertEqual([0, 1, 2], evaluated)
+        self.assertIn('/evaluate_teams/teams/team2.json',
+                      zip_contents(zip_bytes))
+
+    def test_evaluate_teams_invalid_team(self):
+        """Tests evaluating a team which isn't an ID or doesn't exist."""
+        self.LoginSuperuser()
+        response = self.client.get(
+            evaluate_url(args=[self.mission.pk]), {'team': 'a'})
+        self.assertEqual(400, response.status_code)
+        response = self.client.get(
+            evaluate_url(args=[self.mission.pk]), {'team': 1000})
+        self.assertEqual(404, response.status_code)
+
+
+class TestEvaluateCsv(TestCase):
+    """Tests the CSV of team evaluations."""
+
+    def assertCsvMatchesJson(self, team_evals):
+        """Asserts the CSV equals the CSV generated from JSON."""
+        self.assertEqual(
+            csv_from_json(
+                [json_format.MessageToJson(t, indent=4) for t in team_evals]),
+            csv_from_protos(team_evals))
+
+    def test_no_teams(self):
+        """Tests the CSV without teams."""
+        self.assertCsvMatchesJson([])
+
+    def test_values(self):
+        """Tests the CSV of values of each type and missing columns."""
+        team_evals = [interop_admin_api_pb2.MissionEvaluation()]
+        team_eval = interop_admin_api_pb2.MissionEvaluation()
+        team_eval.mission = 1
+        team_eval.team.username = 'team, "quoted"\nname'
+        team_eval.warnings.extend(['a', 'b'])
+        feedback = team_eval.feedback
+        feedback.uas_telemetry_time_max_sec = float('inf')
+        feedback.uas_telemetry_time_avg_sec = float('nan')
+        feedback.boundary_violation_time_sec = 1.0
+        feedback.boundary_violations = 0
+        feedback.judge.crashed = False
+        feedback.judge.air_drop_accuracy = (
+            interop_admin_api_pb2.MissionJudgeFeedback.WITHIN_05_FT)
+        # More than 10 waypoints, whose columns sort as strings.
+        for i in range(12):
+            waypoint = feedback.waypoints.add()
+            waypoint.id = 2**40 + i
+            waypoint.score_ratio = i / 3.0
+        feedback.odlc.SetInParent()
+        team_evals.append(team_eval)
+        team_evals.append(interop_admin_api_pb2.MissionEvaluation(mission=3))
+        self.assertCsvMatchesJson(team_evals)
+
+
+class TestEvaluateTeamsLoad(TestMissionsViewCommon):
+    """Tests streaming the evaluation of many teams."""
+
+    def test_loadtest(self):
+        """Tests peak memory and contents against buffering."""
+        num_teams = 200
+        mission = test_utils.create_sample_mission(self.superuser)
+        test_utils.simulate_team_mission(self, mission, self.superuser,
+                                         self.user0)
+        team_eval = mission_evaluation.evaluate_teams(mission).teams[0]
+
+        def team_evals():
+            """Generates the teams, as they're evaluated by the view."""
+            for i in range(num_teams):
+                team = interop_admin_api_pb2.MissionEvaluation()
+                team.CopyFrom(team_eval)
+                team.team.username = 'team%03d' % i
+                yield team
+
+        mission_eval = interop_admin_api_pb2.MultiUserMissionEvaluation()
+        mission_eval.teams.extend(team_evals())
+        evaluate = Evaluate()
+
+        tracemalloc.start()
+        zip_output = buffered_zip(mission_eval)
+        (_, buffered_peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        for chunk in evaluate.stream_zip(team_evals()):
+            pass
+        (_, stream_peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Streaming holds a few teams at a time, rather than all of them.
+        self.assertLess(stream_peak * 10, buffered_peak)
+        self.assertEqual(
+            zip_contents(zip_output),
+            zip_contents(b''.join(evaluate.stream_zip(team_evals()))))
+
+        team_jsons = [
+            json_format.MessageToJson(t, indent=4) for t in mission_eval.teams
+        ]
+        self.assertEqual(
+            csv_from_json(team_jsons), csv_from_protos(mission_eval.teams))
+
+
+class TestEvaluateJobs(MissionsViewCommon, TransactionTestCase):
+    """Tests the evaluation job views.
+
+    Jobs run in a thread with its own database connection, so tests aren't
+    run in a transaction.
+    """
+
+    def setUp(self):
+        super(TestEvaluateJobs, self).setUp()
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        test_utils.simulate_team_mission(self, self.mission, self.superuser,
+                                         self.user0)
+
+    def test_nonadmin(self):
+        """Tests that you can only access jobs as admin."""
+        self.Login()
+        response = self.client.post(evaluate_jobs_url(args=[self.mission.pk]))
+        self.assertEqual(403, response.status_code)
+        for url in [
+                evaluate_jobs_id_url(args=[self.mission.pk, 'abc']),
+                evaluate_jobs_id_zip_url(args=[self.mission.pk, 'abc']),
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(403, response.status_code)
+
+    def test_invalid_mission(self):
+        """Tests starting a job for an invalid mission."""
+        self.LoginSuperuser()
+        response = self.client.post(evaluate_jobs_url(args=[1000]))
+        self.assertEqual(400, response.status_code)
+
+    def test_invalid_job(self):
+        """Tests getting an unknown job."""
+        self.LoginSuperuser()
+        for url in [
+                evaluate_jobs_id_url(args=[self.mission.pk, 'abc']),
+                evaluate_jobs_id_zip_url(args=[self.mission.pk, 'abc']),
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(404, response.status_code)
+
+    def test_job(self):
+        """Tests the job status and zip file."""
+        self.LoginSuperuser()
+        response = self.client.post(
+            evaluate_jobs_url(args=[self.mission.pk]),
+            QUERY_STRING='team=%d' % self.user0.pk)
+        self.assertEqual(200, response.status_code)
+        status = json.loads(response.content)
+        self.assertEqual('RUNNING', status['state'])
+        self.assertNotIn('artifact', status)
+        self.assertTrue(evaluation_jobs.join_job(status['id'], timeout=30))
+
+        response = self.client.get(
+            evaluate_jobs_id_url(args=[self.mission.pk, status['id']]))
+        self.assertEqual(200, response.status_code)
+        status = json.loads(response.content)
+        self.assertEqual('DONE', status['state'])
+        self.assertEqual(1, status['teams_done'])
+        self.assertEqual(1, status['teams_total'])
+        zip_url = evaluate_jobs_id_zip_url(
+            args=[self.mission.pk, status['id']])
+        self.assertEqual(zip_url, status['artifact'])
+
+        # Jobs are found only by their mission.
+        response = self.client.get(
+            evaluate_jobs_id_url(args=[self.mission.pk + 1, status['id']]))
+        self.assertEqual(404, response.status_code)
+
+        response = self.client.get(zip_url)
+        self.assertEqual(200, response.status_code)
+        zip_io = io.BytesIO(b''.join(response.streaming_content))
+        with zipfile.ZipFile(zip_io, 'r') as zip_file:
+            data = json.loads(zip_file.read('/evaluate_teams/all.json'))
+        self.assertEqual(['user0'],
+                         [t['team']['username'] for t in data['teams']])
+
 
 class TestMissionDetailsView(TestMissionsViewCommon):
     """Tests the mission details template view."""
@@ -427,3 +991,90 @@ class TestMissionDetailsView(TestMissionsViewCommon):
         self.LoginSuperuser()
         response = self.client.get(details_url(args=[self.mission.pk]))
         self.assertEqual(200, response.status_code)
+
+
+class TestMissionsViewCache(MissionsViewCommon, TransactionTestCase):
+    """Tests missions are served from the cache with ETags.
+
+    Cached missions are cleared once changes are committed, so tests aren't
+    run in a transaction.
+    """
+
+    def setUp(self):
+        super(TestMissionsViewCache, self).setUp()
+        cache.clear()
+        self.mission = test_utils.create_sample_mission(self.superuser)
+        self.Login()
+
+    def get(self, **kwargs):
+        return self.client.get(
+            missions_id_url(args=[self.mission.pk]), **kwargs)
+
+    def test_etag(self):
+        """Tests conditional requests with the ETag are not modified."""
+        for accept in ['application/json', 'application/x-protobuf']:
+            response = self.get(HTTP_ACCEPT=accept)
+            self.assertEqual(200, response.status_code)
+            etag = response['ETag']
+            self.assertTrue(etag.startswith('"'))
+
+            response = self.get(HTTP_ACCEPT=accept, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(b'', response.content)
+        self.assertNotEqual(
+            self.get(HTTP_ACCEPT='application/json')['ETag'],
+            self.get(HTTP_ACCEPT='application/x-protobuf')['ETag'])
+
+    def test_changed(self):
+        """Tests a changed mission is served with a new ETag."""
+        response = self.get()
+        etag = response['ETag']
+        waypoint = self.mission.mission_waypoints.order_by('order').first()
+        waypoint.altitude_msl += 100
+        waypoint.save()
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+        self.assertEqual(
+            waypoint.altitude_msl,
+            json.loads(response.content)['waypoints'][0]['altitude'])
+
+    def test_matches_uncached(self):
+        """Tests cached responses match the serialized mission."""
+        expect = mission_proto(MissionConfig.objects.get(pk=self.mission.pk))
+        for _ in range(2):
+            self.assertEqual(expect,
+                             json_format.Parse(self.get().content,
+                                               interop_api_pb2.Mission()))
+
+        self.LoginSuperuser()
+        response = self.client.get(
+            missions_url, HTTP_ACCEPT='application/x-protobuf')
+        missions = interop_api_pb2.MissionList()
+        missions.ParseFromString(response.content)
+        self.assertEqual([expect], list(missions.missions))
+
+    def num_queries(self):
+        """Gets the number of queries to get the mission."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(200, self.get().status_code)
+        return len(queries)
+
+    def test_num_queries(self):
+        """Tests the queries don't grow with the mission's parts."""
+        uncached = self.num_queries()
+        cached = self.num_queries()
+        self.assertLess(cached, uncached)
+
+        for i in range(3):
+            zone = FlyZone(altitude_msl_min=0, altitude_msl_max=100)
+            zone.save()
+            for j in range(4):
+                waypoint = Waypoint(
+                    latitude=38 + j, longitude=-76, altitude_msl=0, order=j)
+                waypoint.save()
+                zone.boundary_pts.add(waypoint)
+            self.mission.fly_zones.add(zone)
+        self.assertEqual(uncached, self.num_queries())
+        self.assertEqual(cached, self.num_queries())
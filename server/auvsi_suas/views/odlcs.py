@@ -14,6 +14,9 @@ from auvsi_suas.proto import interop_api_pb2
 from auvsi_suas.views.decorators import require_login
 from auvsi_suas.views.decorators import require_superuser
 from auvsi_suas.views.json import ProtoJsonEncoder
+from auvsi_suas.views.protobuf import parse_request
+from auvsi_suas.views.protobuf import proto_list_response
+from auvsi_suas.views.protobuf import proto_response
 from django.contrib.auth.models import User
 from django.core.files.images import ImageFile
 from django.http import HttpResponse
@@ -167,14 +170,13 @@ class Odlcs(View):
         odlcs = odlcs.all()[:100]
 
         odlc_protos = [odlc_to_proto(o) for o in odlcs]
-        return HttpResponse(
-            json.dumps(odlc_protos, cls=ProtoJsonEncoder),
-            content_type="application/json")
+        return proto_list_response(request, odlc_protos,
+                                   interop_api_pb2.OdlcList(), 'odlcs')
 
     def post(self, request):
         odlc_proto = interop_api_pb2.Odlc()
         try:
-            json_format.Parse(request.body, odlc_proto)
+            parse_request(request, odlc_proto)
         except Exception as e:
             return HttpResponseBadRequest(
                 'Failed to parse request. Error: %s' % str(e))
@@ -201,9 +203,7 @@ class Odlcs(View):
         update_odlc_from_proto(odlc, odlc_proto)
         odlc.save()
 
-        return HttpResponse(
-            json_format.MessageToJson(odlc_to_proto(odlc)),
-            content_type="application/json")
+        return proto_response(request, odlc_to_proto(odlc))
 
 
 def find_odlc(request, pk):
@@ -243,9 +243,7 @@ class OdlcsId(View):
         except ValueError as e:
             return HttpResponseForbidden(str(e))
 
-        return HttpResponse(
-            json_format.MessageToJson(odlc_to_proto(odlc)),
-            content_type="application/json")
+        return proto_response(request, odlc_to_proto(odlc))
 
     def put(self, request, pk):
         try:
@@ -257,7 +255,7 @@ class OdlcsId(View):
 
         odlc_proto = interop_api_pb2.Odlc()
         try:
-            json_format.Parse(request.body, odlc_proto)
+            parse_request(request, odlc_proto)
         except Exception as e:
             return HttpResponseBadRequest(
                 'Failed to parse request. Error: %s' % str(e))
@@ -275,9 +273,7 @@ class OdlcsId(View):
         odlc.update_last_modified()
         odlc.save()
 
-        return HttpResponse(
-            json_format.MessageToJson(odlc_to_proto(odlc)),
-            content_type="application/json")
+        return proto_response(request, odlc_to_proto(odlc))
 
     def delete(self, request, pk):
         try:
@@ -169,6 +169,22 @@ class TestGetOdlc(TestOdlcsCommon):
             },
         ], json.loads(response.content))
 
+    def test_get_odlcs_proto(self):
+        """We get back a binary proto list when requested."""
+        t1 = Odlc(
+            mission=self.mission,
+            user=self.user,
+            odlc_type=interop_api_pb2.Odlc.STANDARD)
+        t1.save()
+
+        response = self.client.get(
+            odlcs_url, HTTP_ACCEPT='application/x-protobuf')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-protobuf', response['Content-Type'])
+        odlcs = interop_api_pb2.OdlcList()
+        odlcs.ParseFromString(response.content)
+        self.assertEqual([t1.pk], [o.id for o in odlcs.odlcs])
+
     def test_not_others(self):
         """We don't get odlcs owned by other users."""
         user2 = User.objects.create_user('testuser2', 'testemail@x.com',
@@ -246,6 +262,29 @@ class TestPostOdlc(TestOdlcsCommon):
         self.assertEqual(odlc['description'], created['description'])
         self.assertEqual(odlc['autonomous'], created['autonomous'])
 
+    def test_complete_proto(self):
+        """Send odlc as a binary proto, get back a binary proto."""
+        odlc = interop_api_pb2.Odlc()
+        odlc.mission = self.mission.pk
+        odlc.type = interop_api_pb2.Odlc.STANDARD
+        odlc.latitude = 38
+        odlc.longitude = -76
+        odlc.shape = interop_api_pb2.Odlc.SQUARE
+
+        response = self.client.post(
+            odlcs_url,
+            data=odlc.SerializeToString(),
+            content_type='application/x-protobuf',
+            HTTP_ACCEPT='application/x-protobuf')
+        self.assertEqual(200, response.status_code)
+
+        created = interop_api_pb2.Odlc()
+        created.ParseFromString(response.content)
+        self.assertTrue(created.HasField('id'))
+        odlc.id = created.id
+        odlc.autonomous = False
+        self.assertEqual(odlc, created)
+
     def test_minimal(self):
         """Send odlc minimal fields."""
         odlc = {
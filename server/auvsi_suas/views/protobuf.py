@@ -0,0 +1,143 @@
+"""Utilities for protobuf request parsing and response serialization.
+
+Requests and responses are JSON formatted protos by default. Clients may
+instead send binary protos by setting the Content-Type header, and receive
+binary protos by setting the Accept header, to the protobuf content type.
+"""
+
+import collections
+import hashlib
+import json
+from auvsi_suas.views.json import ProtoJsonEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from google.protobuf import json_format
+
+JSON_CONTENT_TYPE = 'application/json'
+PROTO_CONTENT_TYPE = 'application/x-protobuf'
+
+# A proto serialized in both response formats, with a strong ETag for each.
+SerializedProto = collections.namedtuple(
+    'SerializedProto', ['proto', 'proto_etag', 'json', 'json_etag'])
+
+
+def media_types(header):
+    """Gets the media types in a Content-Type or Accept header value."""
+    return [t.split(';')[0].strip().lower() for t in header.split(',')]
+
+
+def request_is_proto(request):
+    """Whether the request body is a binary proto."""
+    return PROTO_CONTENT_TYPE in media_types(
+        request.META.get('CONTENT_TYPE', ''))
+
+
+def request_accepts_proto(request):
+    """Whether the request asks for a binary proto response."""
+    return PROTO_CONTENT_TYPE in media_types(
+        request.META.get('HTTP_ACCEPT', ''))
+
+
+def parse_request(request, proto):
+    """Parses the request body into the proto.
+
+    Args:
+        request: The request whose body to parse.
+        proto: The proto to parse into.
+    Raises:
+        Exception: The body could not be parsed.
+    """
+    if request_is_proto(request):
+        proto.ParseFromString(request.body)
+    else:
+        json_format.Parse(request.body, proto)
+
+
+def proto_response(request, proto):
+    """Creates a response containing the proto.
+
+    Args:
+        request: The request being responded to.
+        proto: The proto to respond with.
+    Returns:
+        An HttpResponse with a binary proto if accepted by the request, or a
+        JSON formatted proto otherwise.
+    """
+    if request_accepts_proto(request):
+        response = HttpResponse(
+            proto.SerializeToString(), content_type=PROTO_CONTENT_TYPE)
+    else:
+        response = HttpResponse(
+            json_format.MessageToJson(proto), content_type=JSON_CONTENT_TYPE)
+    patch_vary_headers(response, ('Accept', ))
+    return response
+
+
+def proto_list_response(request, protos, list_proto, field):
+    """Creates a response containing a list of protos.
+
+    Args:
+        request: The request being responded to.
+        protos: The list of protos to respond with.
+        list_proto: The wrapper proto to use for binary responses.
+        field: Name of the repeated field in list_proto holding the protos.
+    Returns:
+        An HttpResponse with a binary wrapper proto if accepted by the
+        request, or a JSON list of JSON formatted protos otherwise.
+    """
+    if request_accepts_proto(request):
+        getattr(list_proto, field).extend(protos)
+        response = HttpResponse(
+            list_proto.SerializeToString(), content_type=PROTO_CONTENT_TYPE)
+    else:
+        response = HttpResponse(
+            json.dumps(protos, cls=ProtoJsonEncoder),
+            content_type=JSON_CONTENT_TYPE)
+    patch_vary_headers(response, ('Accept', ))
+    return response
+
+
+def content_etag(content):
+    """Computes a strong ETag of the response content bytes."""
+    return quote_etag(hashlib.sha1(content).hexdigest())
+
+
+def serialize_proto(proto):
+    """Serializes the proto in both response formats.
+
+    Args:
+        proto: The proto to serialize.
+    Returns:
+        A SerializedProto, which can be cached and later responded with.
+    """
+    proto_bytes = proto.SerializeToString()
+    json_str = json_format.MessageToJson(proto)
+    return SerializedProto(proto_bytes,
+                           content_etag(proto_bytes), json_str,
+                           content_etag(json_str.encode('utf-8')))
+
+
+def serialized_proto_response(request, serialized):
+    """Creates a response containing a serialized proto.
+
+    The response has the ETag of the content, so conditional requests can be
+    answered by ConditionalGetMiddleware.
+
+    Args:
+        request: The request being responded to.
+        serialized: The SerializedProto to respond with.
+    Returns:
+        An HttpResponse with a binary proto if accepted by the request, or a
+        JSON formatted proto otherwise.
+    """
+    if request_accepts_proto(request):
+        response = HttpResponse(
+            serialized.proto, content_type=PROTO_CONTENT_TYPE)
+        response['ETag'] = serialized.proto_etag
+    else:
+        response = HttpResponse(
+            serialized.json, content_type=JSON_CONTENT_TYPE)
+        response['ETag'] = serialized.json_etag
+    patch_vary_headers(response, ('Accept', ))
+    return response
@@ -2,32 +2,65 @@
 
 import json
 import logging
-from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
-from auvsi_suas.models.uas_telemetry import UasTelemetry
+import threading
+import time
+from auvsi_suas.models import team_status_cache
+from auvsi_suas.models import team_status_hub
 from auvsi_suas.proto import interop_api_pb2
 from auvsi_suas.views.decorators import require_login
 from auvsi_suas.views.json import ProtoJsonEncoder
+from auvsi_suas.views.protobuf import proto_list_response
+from auvsi_suas.views.protobuf import proto_response
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import View
-from google.protobuf import json_format
 
 logger = logging.getLogger(__name__)
 
+# Time in seconds a team status stream stays open. Clients then reconnect, so
+# streams don't hold server threads indefinitely.
+STREAM_MAX_SEC = 5 * 60
+# Time in seconds between keep alive comments on an idle stream. The teams
+# are also reloaded, to stream new teams.
+STREAM_KEEPALIVE_SEC = 15
+# Min time in seconds between events, so frequent telemetry is batched.
+STREAM_MIN_INTERVAL_SEC = 0.2
+# Time in milliseconds clients wait before reconnecting.
+STREAM_RETRY_MS = 1000
+# Time in seconds clients wait before retrying when all streams are open.
+STREAM_BUSY_RETRY_SEC = 30
+
+# Number of streams open in this process, guarded by the lock.
+_streams_lock = threading.Lock()
+_streams_open = 0
+
+
+def team_proto(user, status=None):
+    """Generate TeamStatus proto for team.
+
+    Args:
+        user: The user of the team.
+        status: Optional. The team_status_cache.TeamStatus for the team. If
+            None, will obtain from the cache.
+    Returns:
+        The TeamStatus proto.
+    """
+    if status is None:
+        status = team_status_cache.team_status(user)
 
-def team_proto(user):
-    """Generate TeamStatus proto for team."""
     team_status_proto = interop_api_pb2.TeamStatus()
     team_status_proto.team.id = user.pk
     team_status_proto.team.username = user.username
     team_status_proto.team.name = user.first_name
     team_status_proto.team.university = user.last_name
-    team_status_proto.in_air = TakeoffOrLandingEvent.user_in_air(user)
+    team_status_proto.in_air = status.in_air
 
-    telemetry = UasTelemetry.last_for_user(user)
+    telemetry = status.telemetry
     if telemetry is not None:
         telemetry_proto = team_status_proto.telemetry
         telemetry_proto.latitude = telemetry.latitude
@@ -42,6 +75,110 @@ def team_proto(user):
     return team_status_proto
 
 
+def standard_users():
+    """Gets the users which are teams, not superusers, by username."""
+    return list(User.objects.filter(is_superuser=False).order_by('username'))
+
+
+def status_changed(sent, status):
+    """Whether the status changed since the sent TeamStatus proto."""
+    if sent is None or sent.in_air != status.in_air:
+        return True
+    if status.telemetry is None:
+        return sent.HasField('telemetry')
+    return sent.telemetry_id != status.telemetry.pk
+
+
+def team_status_events(max_sec=STREAM_MAX_SEC):
+    """Generates server-sent events with changes to team status.
+
+    The first event has the status of every team, and later events have the
+    status of the teams which changed. Each event's data is a JSON list of
+    TeamStatus. Statuses are read from the team_status_cache when the
+    team_status_hub publishes a change.
+
+    Args:
+        max_sec: Time in seconds after which the stream ends.
+    Yields:
+        The events as strings.
+    """
+    yield 'retry: %d\n\n' % STREAM_RETRY_MS
+    end_t = time.monotonic() + max_sec
+    sent = {}
+    users = None
+    users_t = None
+    version = team_status_hub.version()
+    while True:
+        now = time.monotonic()
+        if users is None or now - users_t >= STREAM_KEEPALIVE_SEC:
+            users = standard_users()
+            users_t = now
+        statuses = team_status_cache.team_statuses(users)
+        changed = []
+        for user in users:
+            status = statuses[user.pk]
+            if status_changed(sent.get(user.pk), status):
+                sent[user.pk] = team_proto(user, status)
+                changed.append(sent[user.pk])
+        if changed:
+            yield 'data: %s\n\n' % json.dumps(changed, cls=ProtoJsonEncoder)
+        else:
+            yield ': keepalive\n\n'
+
+        if time.monotonic() >= end_t:
+            return
+        time.sleep(STREAM_MIN_INTERVAL_SEC)
+        timeout = min(STREAM_KEEPALIVE_SEC, end_t - time.monotonic())
+        version = team_status_hub.wait(version, max(timeout, 0))
+
+
+def open_stream():
+    """Reserves one of the process's streams.
+
+    Each open stream holds a server thread, so streams are limited to
+    settings.TEAM_STATUS_STREAMS_PER_PROCESS to leave threads for requests.
+
+    Returns:
+        Whether a stream was reserved. Reserved streams must be closed with
+        close_stream().
+    """
+    global _streams_open
+    with _streams_lock:
+        if _streams_open >= settings.TEAM_STATUS_STREAMS_PER_PROCESS:
+            return False
+        _streams_open += 1
+        return True
+
+
+def close_stream():
+    """Releases a stream reserved by open_stream()."""
+    global _streams_open
+    with _streams_lock:
+        _streams_open -= 1
+
+
+class StreamEvents(object):
+    """Iterates the events of a reserved stream, closed with the response.
+
+    The stream is closed even if the response closes before iterating, which
+    wouldn't run a finally clause of the generator.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        """Closes the events and releases the stream, once."""
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            close_stream()
+
+
 class Teams(View):
     """Gets a list of all teams."""
 
@@ -50,17 +187,13 @@ class Teams(View):
         return super(Teams, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        users = User.objects.all()
-        teams = []
+        # Only standard users are exported
+        users = standard_users()
+        statuses = team_status_cache.team_statuses(users)
+        teams = [team_proto(user, statuses[user.pk]) for user in users]
 
-        for user in users:
-            # Only standard users are exported
-            if not user.is_superuser:
-                teams.append(team_proto(user))
-
-        return HttpResponse(
-            json.dumps(teams, cls=ProtoJsonEncoder),
-            content_type="application/json")
+        return proto_list_response(request, teams,
+                                   interop_api_pb2.TeamStatusList(), 'teams')
 
 
 class Team(View):
@@ -76,6 +209,29 @@ class Team(View):
         except User.DoesNotExist:
             return HttpResponseBadRequest('Unknown team %s' % username)
 
-        return HttpResponse(
-            json_format.MessageToJson(team_proto(user)),
-            content_type="application/json")
+        return proto_response(request, team_proto(user))
+
+
+class TeamsStream(View):
+    """Streams changes to the status of all teams as server-sent events."""
+
+    @method_decorator(require_login)
+    def dispatch(self, *args, **kwargs):
+        return super(TeamsStream, self).dispatch(*args, **kwargs)
+
+    def get(self, request):
+        if not open_stream():
+            # Clients fall back to polling the teams until retrying.
+            response = HttpResponse(
+                'Too many team status streams.', status=503)
+            response['Retry-After'] = STREAM_BUSY_RETRY_SEC
+            return response
+        response = StreamingHttpResponse(
+            StreamEvents(team_status_events()),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Events must reach the client as they're generated, so they must
+        # not be buffered by nginx or compressed by GZipMiddleware.
+        response['X-Accel-Buffering'] = 'no'
+        response['Content-Encoding'] = 'identity'
+        return response
@@ -9,12 +9,21 @@ from auvsi_suas.models.mission_config import MissionConfig
 from auvsi_suas.models.takeoff_or_landing_event import TakeoffOrLandingEvent
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.models.waypoint import Waypoint
+from auvsi_suas.proto.interop_api_pb2 import TeamStatus
+from auvsi_suas.proto.interop_api_pb2 import TeamStatusList
+from auvsi_suas.views import teams
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 teams_url = reverse('auvsi_suas:teams')
+teams_stream_url = reverse('auvsi_suas:teams_stream')
 team_url = functools.partial(reverse, 'auvsi_suas:team')
 
 
@@ -112,6 +121,28 @@ class TestTeamsView(TestCase):
 
         self.assertEqual([], json.loads(response.content))
 
+    def test_proto(self):
+        """Response is a binary proto when requested."""
+        self.create_data()
+
+        response = self.client.get(
+            teams_url, HTTP_ACCEPT='application/x-protobuf')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-protobuf', response['Content-Type'])
+
+        teams = TeamStatusList()
+        teams.ParseFromString(response.content)
+        self.assertEqual(['user1', 'user2'],
+                         sorted(t.team.username for t in teams.teams))
+
+        response = self.client.get(
+            team_url(args=['user2']), HTTP_ACCEPT='application/x-protobuf')
+        self.assertEqual(200, response.status_code)
+        team = TeamStatus()
+        team.ParseFromString(response.content)
+        self.assertEqual('user2', team.team.username)
+        self.assertEqual(self.telem.pk, team.telemetry_id)
+
     def test_post(self):
         """POST not allowed"""
         response = self.client.post(teams_url)
@@ -168,6 +199,48 @@ class TestTeamsView(TestCase):
         self.assertEqual(user2['telemetryTimestamp'],
                          u'2016-10-01T00:00:00+00:00')
 
+    def get_num_queries(self):
+        """Gets the number of queries for a request with a warm cache."""
+        self.client.get(teams_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(teams_url)
+        self.assertEqual(200, response.status_code)
+        return len(queries)
+
+    def test_queries_per_team(self):
+        """No queries are made per team once the cache is warm."""
+        self.create_data()
+        num_queries = self.get_num_queries()
+
+        for i in range(5):
+            user = User.objects.create_user('cacheuser%d' % i,
+                                            'email@example.com', 'testpass')
+            UasTelemetry(
+                user=user,
+                latitude=38,
+                longitude=-76,
+                altitude_msl=0,
+                uas_heading=90).save()
+        self.assertEqual(num_queries, self.get_num_queries())
+
+    def test_telemetry_updated(self):
+        """Cached telemetry is updated by uploads."""
+        self.create_data()
+        self.client.get(teams_url)
+
+        telem = UasTelemetry(
+            user=self.user2,
+            latitude=38,
+            longitude=-76,
+            altitude_msl=100,
+            uas_heading=180)
+        telem.save()
+
+        data = json.loads(self.client.get(teams_url).content)
+        user2 = [d for d in data if d['team']['username'] == 'user2'][0]
+        self.assertEqual(int(user2['telemetryId']), telem.pk)
+        self.assertEqual(100, user2['telemetry']['altitude'])
+
 
 class TestTeamViewLoggedOut(TestCase):
     def test_not_authenticated(self):
@@ -211,3 +284,122 @@ class TestTeamView(TestCase):
         """POST not allowed"""
         response = self.client.post(team_url(args=[self.user1.username]))
         self.assertEqual(405, response.status_code)
+
+
+class TestTeamsStream(TransactionTestCase):
+    """Tests the team status stream.
+
+    Closing a stream response ends the request, which closes connections in
+    a transaction, so tests aren't run in a transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.user1 = User.objects.create_user('user1', 'email@example.com',
+                                              'testpass')
+        self.user2 = User.objects.create_user('user2', 'email@example.com',
+                                              'testpass')
+        pos = GpsPosition(latitude=10, longitude=100)
+        pos.save()
+        self.mission = MissionConfig(
+            home_pos=pos,
+            lost_comms_pos=pos,
+            emergent_last_known_pos=pos,
+            off_axis_odlc_pos=pos,
+            air_drop_pos=pos,
+            ugv_drive_pos=pos)
+        self.mission.save()
+
+    def next_teams(self, events):
+        """Gets the teams of the next event, or None for a keep alive."""
+        event = next(events)
+        if event.startswith(':'):
+            return None
+        self.assertTrue(event.startswith('data: '))
+        self.assertTrue(event.endswith('\n\n'))
+        return json.loads(event[len('data: '):])
+
+    def test_not_authenticated(self):
+        """Tests requests that have not yet been authenticated."""
+        response = self.client.get(teams_stream_url)
+        self.assertEqual(403, response.status_code)
+
+    def test_stream(self):
+        """Tests the stream response starts with all teams."""
+        self.client.force_login(self.user1)
+        response = self.client.get(teams_stream_url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/event-stream', response['Content-Type'])
+        self.assertEqual('no', response['X-Accel-Buffering'])
+        events = iter(response.streaming_content)
+        self.assertEqual(b'retry: 1000\n\n', next(events))
+        data = next(events).decode('utf-8')
+        statuses = json.loads(data[len('data: '):])
+        self.assertEqual(['user1', 'user2'],
+                         [t['team']['username'] for t in statuses])
+        response.close()
+
+    def test_stream_limit(self):
+        """Tests streams beyond the process's limit are refused."""
+        self.client.force_login(self.user1)
+        with override_settings(TEAM_STATUS_STREAMS_PER_PROCESS=1):
+            response = self.client.get(teams_stream_url)
+            self.assertEqual(200, response.status_code)
+
+            refused = self.client.get(teams_stream_url)
+            self.assertEqual(503, refused.status_code)
+            self.assertEqual(
+                str(teams.STREAM_BUSY_RETRY_SEC), refused['Retry-After'])
+
+            # Closing the stream releases it.
+            response.close()
+            response = self.client.get(teams_stream_url)
+            self.assertEqual(200, response.status_code)
+            response.close()
+
+    def test_stream_events_close(self):
+        """Tests an unread stream is released when closed."""
+        with override_settings(TEAM_STATUS_STREAMS_PER_PROCESS=1):
+            self.assertTrue(teams.open_stream())
+            self.assertFalse(teams.open_stream())
+            events = teams.StreamEvents(teams.team_status_events())
+            events.close()
+            events.close()
+            self.assertTrue(teams.open_stream())
+            teams.close_stream()
+
+    def test_changes(self):
+        """Tests only changed teams are streamed."""
+        events = teams.team_status_events(max_sec=30)
+        next(events)
+        self.assertEqual(2, len(self.next_teams(events)))
+
+        telemetry = UasTelemetry(
+            user=self.user2,
+            latitude=38,
+            longitude=-76,
+            altitude_msl=100,
+            uas_heading=90)
+        telemetry.save()
+        changed = self.next_teams(events)
+        self.assertEqual(1, len(changed))
+        self.assertEqual('user2', changed[0]['team']['username'])
+        self.assertEqual(str(telemetry.pk), changed[0]['telemetryId'])
+        self.assertEqual(38, changed[0]['telemetry']['latitude'])
+
+        TakeoffOrLandingEvent(
+            user=self.user1, mission=self.mission, uas_in_air=True).save()
+        changed = self.next_teams(events)
+        self.assertEqual(1, len(changed))
+        self.assertEqual('user1', changed[0]['team']['username'])
+        self.assertTrue(changed[0]['inAir'])
+
+    def test_keepalive(self):
+        """Tests a stream without changes is kept alive until it ends."""
+        events = teams.team_status_events(max_sec=0.5)
+        next(events)
+        self.assertEqual(2, len(self.next_teams(events)))
+        self.assertIsNone(self.next_teams(events))
+        self.assertEqual([], list(events))
@@ -1,18 +1,87 @@
 """Telemetry view."""
 
+import datetime
+import iso8601
 import logging
+from auvsi_suas.models import team_status_cache
 from auvsi_suas.models.aerial_position import AerialPosition
+from auvsi_suas.models.uas_telemetry import TELEMETRY_BATCH_MAX_AGE
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.proto import interop_api_pb2
 from auvsi_suas.views.decorators import require_login
+from auvsi_suas.views.protobuf import parse_request
+from auvsi_suas.views.protobuf import proto_response
+from auvsi_suas.views.telemetry_buffer import get_buffer
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import View
-from google.protobuf import json_format
 
 logger = logging.getLogger(__name__)
 
+# Max number of telemetry accepted in a single batch upload.
+TELEMETRY_BATCH_MAX = 1000
+# Max amount a batch telemetry timestamp may be ahead of the server clock.
+TELEMETRY_BATCH_MAX_SKEW = datetime.timedelta(seconds=1)
+
+
+def validate_telemetry_proto(telemetry_proto):
+    """Validates telemetry proto, raising ValueError if invalid."""
+    if (not telemetry_proto.HasField('latitude') or
+            not telemetry_proto.HasField('longitude') or
+            not telemetry_proto.HasField('altitude') or
+            not telemetry_proto.HasField('heading')):
+        raise ValueError('Request missing fields.')
+
+    # Check the values make sense.
+    if telemetry_proto.latitude < -90 or telemetry_proto.latitude > 90:
+        raise ValueError(
+            'Latitude out of range [-90, 90]: %f' % telemetry_proto.latitude)
+    if telemetry_proto.longitude < -180 or telemetry_proto.longitude > 180:
+        raise ValueError('Longitude out of range [-180, 180]: %f' %
+                         telemetry_proto.longitude)
+    if telemetry_proto.altitude < -1500 or telemetry_proto.altitude > 330000:
+        raise ValueError('Altitude out of range [-1500, 330000]: %f' %
+                         telemetry_proto.altitude)
+    if telemetry_proto.heading < 0 or telemetry_proto.heading > 360:
+        raise ValueError(
+            'Heading out of range [0, 360]: %f' % telemetry_proto.heading)
+
+
+def telemetry_from_proto(user, telemetry_proto, timestamp=None):
+    """Builds an unsaved UasTelemetry from a validated proto."""
+    return UasTelemetry(
+        user=user,
+        timestamp=timestamp,
+        latitude=telemetry_proto.latitude,
+        longitude=telemetry_proto.longitude,
+        altitude_msl=telemetry_proto.altitude,
+        uas_heading=telemetry_proto.heading)
+
+
+def parse_batch_timestamp(timestamp_str, now):
+    """Parses a batch telemetry timestamp, raising ValueError if invalid.
+
+    Args:
+        timestamp_str: The ISO formatted timestamp. Timestamps without a
+            timezone are interpreted as UTC.
+        now: The time of the upload.
+    Returns:
+        The timestamp as a timezone aware datetime.
+    """
+    try:
+        timestamp = iso8601.parse_date(timestamp_str)
+    except iso8601.ParseError as e:
+        raise ValueError('Invalid timestamp "%s": %s' % (timestamp_str, e))
+    if timestamp > now + TELEMETRY_BATCH_MAX_SKEW:
+        raise ValueError('Timestamp in the future: %s' % timestamp_str)
+    if timestamp < now - TELEMETRY_BATCH_MAX_AGE:
+        raise ValueError('Timestamp older than %d seconds: %s' %
+                         (TELEMETRY_BATCH_MAX_AGE.total_seconds(),
+                          timestamp_str))
+    return timestamp
+
 
 class Telemetry(View):
     """GET/POST telemetry."""
@@ -22,40 +91,78 @@ class Telemetry(View):
         """Posts the UAS position with a POST request."""
         telemetry_proto = interop_api_pb2.Telemetry()
         try:
-            json_format.Parse(request.body, telemetry_proto)
+            parse_request(request, telemetry_proto)
         except Exception as e:
             return HttpResponseBadRequest(
                 'Failed to parse request. Error: %s' % str(e))
 
-        if (not telemetry_proto.HasField('latitude') or
-                not telemetry_proto.HasField('longitude') or
-                not telemetry_proto.HasField('altitude') or
-                not telemetry_proto.HasField('heading')):
-            return HttpResponseBadRequest('Request missing fields.')
-
-        # Check the values make sense.
-        if telemetry_proto.latitude < -90 or telemetry_proto.latitude > 90:
-            return HttpResponseBadRequest('Latitude out of range [-90, 90]: %f'
-                                          % telemetry_proto.latitude)
-        if telemetry_proto.longitude < -180 or telemetry_proto.longitude > 180:
-            return HttpResponseBadRequest(
-                'Longitude out of range [-180, 180]: %f' %
-                telemetry_proto.longitude)
-        if telemetry_proto.altitude < -1500 or telemetry_proto.altitude > 330000:
+        try:
+            validate_telemetry_proto(telemetry_proto)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        # Store telemetry.
+        telemetry = telemetry_from_proto(request.user, telemetry_proto)
+        telemetry_buffer = get_buffer()
+        if telemetry_buffer:
+            telemetry_buffer.save([telemetry])
+        else:
+            telemetry.save()
+
+        return HttpResponse('UAS Telemetry Successfully Posted.')
+
+
+class TelemetryBatch(View):
+    """POST a batch of telemetry."""
+
+    @method_decorator(require_login)
+    def post(self, request):
+        """Posts many UAS positions in a single request.
+
+        Each telemetry is validated independently. Valid telemetry is stored
+        with a single bulk insert, and the response gives the accept/reject
+        status of every telemetry so clients can retry only failures.
+        """
+        batch_proto = interop_api_pb2.TelemetryBatch()
+        try:
+            parse_request(request, batch_proto)
+        except Exception as e:
             return HttpResponseBadRequest(
-                'Altitude out of range [-1500, 330000]: %f' %
-                telemetry_proto.altitude)
-        if telemetry_proto.heading < 0 or telemetry_proto.heading > 360:
+                'Failed to parse request. Error: %s' % str(e))
+
+        if not batch_proto.telemetry:
+            return HttpResponseBadRequest('Request contains no telemetry.')
+        if len(batch_proto.telemetry) > TELEMETRY_BATCH_MAX:
             return HttpResponseBadRequest(
-                'Heading out of range [0, 360]: %f' % telemetry_proto.heading)
+                'Request exceeds batch limit of %d telemetry.' %
+                TELEMETRY_BATCH_MAX)
+
+        now = timezone.now()
+        result_proto = interop_api_pb2.TelemetryBatchResult()
+        telemetry = []
+        for timestamped_proto in batch_proto.telemetry:
+            result = result_proto.results.add()
+            try:
+                timestamp = now
+                if timestamped_proto.HasField('timestamp'):
+                    timestamp = parse_batch_timestamp(
+                        timestamped_proto.timestamp, now)
+                validate_telemetry_proto(timestamped_proto.telemetry)
+            except ValueError as e:
+                result.accepted = False
+                result.error = str(e)
+                continue
+            result.accepted = True
+            telemetry.append(
+                telemetry_from_proto(request.user, timestamped_proto.telemetry,
+                                     timestamp))
 
         # Store telemetry.
-        telemetry = UasTelemetry(
-            user=request.user,
-            latitude=telemetry_proto.latitude,
-            longitude=telemetry_proto.longitude,
-            altitude_msl=telemetry_proto.altitude,
-            uas_heading=telemetry_proto.heading)
-        telemetry.save()
+        telemetry_buffer = get_buffer()
+        if telemetry_buffer:
+            telemetry_buffer.save(telemetry)
+        else:
+            UasTelemetry.objects.bulk_create(telemetry)
+            team_status_cache.telemetry_saved(telemetry)
 
-        return HttpResponse('UAS Telemetry Successfully Posted.')
+        return proto_response(request, result_proto)
@@ -0,0 +1,110 @@
+"""Write-behind telemetry buffer which inserts telemetry with group commits.
+
+Each telemetry upload normally performs its own INSERT and commit. When the
+buffer is enabled, concurrent uploads within a process are gathered into a
+shared group which is stored with a single bulk insert. The first request to
+join a group becomes its leader: it waits for the group to fill or for the max
+delay to elapse, and then stores the group. Other requests wait for the leader
+to finish. A request only returns once its telemetry is committed, so
+durability is the same as inserting each telemetry individually.
+"""
+
+import logging
+import threading
+from auvsi_suas.models import team_status_cache
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryGroup(object):
+    """Telemetry to be stored in a single commit."""
+
+    def __init__(self):
+        self.telemetry = []
+        # Set when the group is full and the leader should commit early.
+        self.full = threading.Event()
+        # Set when the group has been committed (or failed to commit).
+        self.done = threading.Event()
+        # Exception raised when committing, if any.
+        self.error = None
+
+
+class TelemetryBuffer(object):
+    """Buffers telemetry and stores it with group commits."""
+
+    def __init__(self, max_rows, max_delay_sec):
+        """Creates a buffer.
+
+        Args:
+            max_rows: Number of telemetry at which a group is committed.
+            max_delay_sec: Max time a group waits for more telemetry before it
+                is committed.
+        """
+        self.max_rows = max_rows
+        self.max_delay_sec = max_delay_sec
+        self.lock = threading.Lock()
+        # Group currently accepting telemetry, or None.
+        self.group = None
+
+    def save(self, telemetry):
+        """Stores the telemetry, returning once it is committed.
+
+        Args:
+            telemetry: List of unsaved UasTelemetry.
+        Raises:
+            Any exception raised by the database while committing.
+        """
+        if not telemetry:
+            return
+
+        with self.lock:
+            leader = self.group is None
+            if leader:
+                self.group = TelemetryGroup()
+            group = self.group
+            group.telemetry.extend(telemetry)
+            if len(group.telemetry) >= self.max_rows:
+                # Close the group so later telemetry starts a new one.
+                self.group = None
+                group.full.set()
+
+        if not leader:
+            group.done.wait()
+            if group.error:
+                raise group.error
+            return
+
+        group.full.wait(self.max_delay_sec)
+        with self.lock:
+            if self.group is group:
+                self.group = None
+        try:
+            UasTelemetry.objects.bulk_create(group.telemetry)
+            team_status_cache.telemetry_saved(group.telemetry)
+        except Exception as e:
+            logger.exception('Failed to commit telemetry group.')
+            group.error = e
+            raise
+        finally:
+            group.done.set()
+
+
+# Buffer for this process, created on first use.
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Gets the process buffer, or None if group commit is disabled."""
+    global _buffer
+    if not settings.TELEMETRY_GROUP_COMMIT:
+        return None
+    max_rows = settings.TELEMETRY_GROUP_COMMIT_MAX_ROWS
+    max_delay_sec = settings.TELEMETRY_GROUP_COMMIT_MAX_DELAY_MS / 1000.0
+    with _buffer_lock:
+        if (_buffer is None or _buffer.max_rows != max_rows or
+                _buffer.max_delay_sec != max_delay_sec):
+            _buffer = TelemetryBuffer(max_rows, max_delay_sec)
+        return _buffer
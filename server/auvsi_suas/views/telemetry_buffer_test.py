@@ -0,0 +1,167 @@
+"""Tests for the telemetry_buffer module."""
+
+import threading
+import time
+from auvsi_suas.models.uas_telemetry import UasTelemetry
+from auvsi_suas.proto.interop_api_pb2 import Telemetry
+from auvsi_suas.views.telemetry_buffer import TelemetryBuffer
+from auvsi_suas.views.telemetry_buffer import get_buffer
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client
+from django.test import TransactionTestCase
+from django.test import override_settings
+from google.protobuf import json_format
+
+telemetry_url = reverse('auvsi_suas:telemetry')
+
+
+def run_threads(num_threads, target):
+    """Runs target in threads, returning exceptions raised by each thread."""
+    errors = [None] * num_threads
+
+    def run(i):
+        try:
+            target()
+        except Exception as e:
+            errors[i] = e
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=run, args=(i, )) for i in range(num_threads)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+class TestTelemetryBuffer(TransactionTestCase):
+    """Tests the TelemetryBuffer."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.user.save()
+
+    def create_telemetry(self):
+        return UasTelemetry(
+            user=self.user,
+            latitude=10,
+            longitude=20,
+            altitude_msl=30,
+            uas_heading=40)
+
+    def test_get_buffer(self):
+        """Tests the buffer is only used when enabled."""
+        self.assertIsNone(get_buffer())
+        with override_settings(TELEMETRY_GROUP_COMMIT=True):
+            self.assertIsNotNone(get_buffer())
+            self.assertIs(get_buffer(), get_buffer())
+
+    def test_save_empty(self):
+        """Tests saving no telemetry."""
+        TelemetryBuffer(10, 0.01).save([])
+        self.assertEqual(0, UasTelemetry.objects.count())
+
+    def test_save_after_delay(self):
+        """Tests a partial group is committed after the max delay."""
+        buf = TelemetryBuffer(10, 0.01)
+        buf.save([self.create_telemetry()])
+        self.assertEqual(1, UasTelemetry.objects.count())
+        self.assertIsNone(buf.group)
+
+    def test_save_full(self):
+        """Tests a full group is committed without waiting."""
+        buf = TelemetryBuffer(10, 60)
+        start_t = time.time()
+        buf.save([self.create_telemetry() for _ in range(10)])
+        self.assertLess(time.time() - start_t, 60)
+        self.assertEqual(10, UasTelemetry.objects.count())
+
+    def test_concurrent_group(self):
+        """Tests concurrent saves are committed as a group."""
+        num_threads = 8
+        buf = TelemetryBuffer(num_threads, 60)
+        start_t = time.time()
+        errors = run_threads(num_threads,
+                             lambda: buf.save([self.create_telemetry()]))
+        # The group only commits before the delay if every thread joined it.
+        self.assertLess(time.time() - start_t, 60)
+        self.assertEqual([None] * num_threads, errors)
+        self.assertEqual(num_threads, UasTelemetry.objects.count())
+
+    def test_error(self):
+        """Tests commit errors are raised to every request in the group."""
+        num_threads = 4
+        buf = TelemetryBuffer(num_threads, 60)
+        errors = run_threads(
+            num_threads, lambda: buf.save([UasTelemetry(user=self.user)]))
+        for error in errors:
+            self.assertIsNotNone(error)
+        self.assertEqual(0, UasTelemetry.objects.count())
+
+        # Later groups are unaffected.
+        buf.save([self.create_telemetry() for _ in range(num_threads)])
+        self.assertEqual(num_threads, UasTelemetry.objects.count())
+
+
+class TestTelemetryGroupCommitLoad(TransactionTestCase):
+    """Tests concurrent telemetry uploads with and without group commit."""
+
+    num_threads = 8
+    ops_per_thread = 25
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.user.save()
+        proto = Telemetry()
+        proto.latitude = 10
+        proto.longitude = 20
+        proto.altitude = 30
+        proto.heading = 40
+        self.proto_json = json_format.MessageToJson(proto)
+
+    def upload(self):
+        """Uploads telemetry from a new client."""
+        client = Client()
+        client.force_login(self.user)
+        for _ in range(self.ops_per_thread):
+            response = client.post(
+                telemetry_url,
+                data=self.proto_json,
+                content_type='application/json')
+            self.assertEqual(200, response.status_code)
+
+    def upload_all(self):
+        """Uploads telemetry from concurrent clients.
+
+        Returns:
+            The rate of uploaded telemetry in rows/sec.
+        """
+        UasTelemetry.objects.all().delete()
+        start_t = time.clock()
+        errors = run_threads(self.num_threads, self.upload)
+        end_t = time.clock()
+        self.assertEqual([None] * self.num_threads, errors)
+        total_ops = self.num_threads * self.ops_per_thread
+        self.assertEqual(total_ops, UasTelemetry.objects.count())
+        return total_ops / (end_t - start_t)
+
+    def test_loadtest(self):
+        """Tests the telemetry rate before and after group commit."""
+        # SQLite locks the table for concurrent writers.
+        if connection.vendor != 'postgresql':
+            self.skipTest('Concurrent uploads require PostgreSQL.')
+        op_rate = self.upload_all()
+        self.assertGreaterEqual(op_rate, 20)
+        with override_settings(
+                TELEMETRY_GROUP_COMMIT=True,
+                TELEMETRY_GROUP_COMMIT_MAX_ROWS=self.num_threads,
+                TELEMETRY_GROUP_COMMIT_MAX_DELAY_MS=5):
+            group_op_rate = self.upload_all()
+        self.assertGreaterEqual(group_op_rate, 20)
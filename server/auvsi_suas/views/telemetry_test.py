@@ -1,14 +1,19 @@
 """Tests for the telemetry module."""
 
+import datetime
 import time
 from auvsi_suas.models.uas_telemetry import UasTelemetry
 from auvsi_suas.proto.interop_api_pb2 import Telemetry
+from auvsi_suas.proto.interop_api_pb2 import TelemetryBatch
+from auvsi_suas.proto.interop_api_pb2 import TelemetryBatchResult
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.test import TestCase
+from django.utils import timezone
 from google.protobuf import json_format
 
 telemetry_url = reverse('auvsi_suas:telemetry')
+telemetry_batch_url = reverse('auvsi_suas:telemetry_batch')
 
 
 class TestTelemetryViewLoggedOut(TestCase):
@@ -16,6 +21,8 @@ class TestTelemetryViewLoggedOut(TestCase):
         """Tests requests that have not yet been authenticated."""
         response = self.client.post(telemetry_url)
         self.assertEqual(403, response.status_code)
+        response = self.client.post(telemetry_batch_url)
+        self.assertEqual(403, response.status_code)
 
 
 class TestTelemetryPost(TestCase):
@@ -60,6 +67,28 @@ class TestTelemetryPost(TestCase):
         response = self.telemetry_request(lat=0, lon=0, alt=0)
         self.assertEqual(400, response.status_code)
 
+    def test_upload_proto(self):
+        """Tests upload of telemetry as a binary proto."""
+        proto = Telemetry()
+        proto.latitude = 10
+        proto.longitude = 20
+        proto.altitude = 30
+        proto.heading = 40
+        response = self.client.post(
+            telemetry_url,
+            data=proto.SerializeToString(),
+            content_type='application/x-protobuf')
+        self.assertEqual(200, response.status_code, response.content)
+        obj = UasTelemetry.objects.get()
+        self.assertEqual(obj.latitude, 10)
+        self.assertEqual(obj.uas_heading, 40)
+
+        response = self.client.post(
+            telemetry_url,
+            data=b'not a proto',
+            content_type='application/x-protobuf')
+        self.assertEqual(400, response.status_code)
+
     def test_invalid_request_values(self):
         """Tests by specifying correct parameters with invalid values."""
         TEST_DATA = [
@@ -97,3 +126,155 @@ class TestTelemetryPost(TestCase):
         end_t = time.clock()
         op_rate = total_ops / (end_t - start_t)
         self.assertGreaterEqual(op_rate, 20)
+
+
+class TestTelemetryBatchPost(TestCase):
+    """Tests the TelemetryBatch view POST."""
+
+    def setUp(self):
+        """Sets up the client, server info URL, and user."""
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.user.save()
+        self.client.force_login(self.user)
+
+    def batch_request(self, telemetry):
+        """Posts a batch of (timestamp, lat, lon, alt, head) telemetry."""
+        proto = TelemetryBatch()
+        for (timestamp, lat, lon, alt, head) in telemetry:
+            timestamped = proto.telemetry.add()
+            if timestamp is not None:
+                timestamped.timestamp = timestamp.isoformat()
+            timestamped.telemetry.latitude = lat
+            timestamped.telemetry.longitude = lon
+            timestamped.telemetry.altitude = alt
+            timestamped.telemetry.heading = head
+        proto_json = json_format.MessageToJson(proto)
+
+        return self.client.post(
+            telemetry_batch_url,
+            data=proto_json,
+            content_type='application/json')
+
+    def batch_result(self, response):
+        """Parses the batch result from the response."""
+        self.assertEqual(200, response.status_code, response.content)
+        result = TelemetryBatchResult()
+        json_format.Parse(response.content, result)
+        return result
+
+    def test_invalid_request(self):
+        """Tests invalid requests which reject the whole batch."""
+        response = self.client.post(telemetry_batch_url)
+        self.assertEqual(400, response.status_code)
+
+        response = self.batch_request([])
+        self.assertEqual(400, response.status_code)
+
+        response = self.batch_request([(None, 10, 20, 30, 40)] * 1001)
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(0, UasTelemetry.objects.count())
+
+    def test_upload_and_store(self):
+        """Tests correct upload and storage of a batch."""
+        now = timezone.now()
+        t1 = now - datetime.timedelta(seconds=2)
+        t2 = now - datetime.timedelta(seconds=1)
+        result = self.batch_result(
+            self.batch_request([
+                (t1, 10, 20, 30, 40),
+                (t2, 11, 21, 31, 41),
+            ]))
+
+        self.assertEqual([True, True], [r.accepted for r in result.results])
+        objs = UasTelemetry.by_user(self.user)
+        self.assertEqual(2, len(objs))
+        self.assertEqual(t1, objs[0].timestamp)
+        self.assertEqual(10, objs[0].latitude)
+        self.assertEqual(20, objs[0].longitude)
+        self.assertEqual(30, objs[0].altitude_msl)
+        self.assertEqual(40, objs[0].uas_heading)
+        self.assertEqual(t2, objs[1].timestamp)
+        self.assertEqual(11, objs[1].latitude)
+
+    def test_upload_proto(self):
+        """Tests upload of a batch as a binary proto."""
+        proto = TelemetryBatch()
+        telemetry = proto.telemetry.add().telemetry
+        telemetry.latitude = 10
+        telemetry.longitude = 20
+        telemetry.altitude = 30
+        telemetry.heading = 40
+        response = self.client.post(
+            telemetry_batch_url,
+            data=proto.SerializeToString(),
+            content_type='application/x-protobuf',
+            HTTP_ACCEPT='application/x-protobuf')
+        self.assertEqual(200, response.status_code, response.content)
+        self.assertEqual('application/x-protobuf', response['Content-Type'])
+
+        result = TelemetryBatchResult()
+        result.ParseFromString(response.content)
+        self.assertEqual([True], [r.accepted for r in result.results])
+        self.assertEqual(1, UasTelemetry.objects.count())
+
+    def test_default_timestamp(self):
+        """Tests telemetry without a timestamp uses the upload time."""
+        start = timezone.now()
+        result = self.batch_result(
+            self.batch_request([(None, 10, 20, 30, 40)]))
+        end = timezone.now()
+
+        self.assertTrue(result.results[0].accepted)
+        obj = UasTelemetry.objects.get()
+        self.assertGreaterEqual(obj.timestamp, start)
+        self.assertLessEqual(obj.timestamp, end)
+
+    def test_partial_reject(self):
+        """Tests invalid telemetry is rejected without rejecting the batch."""
+        now = timezone.now()
+        result = self.batch_result(
+            self.batch_request([
+                (now, 10, 20, 30, 40),
+                (now, 100, 20, 30, 40),
+                (now, 10, 20, 30, 370),
+                (now + datetime.timedelta(minutes=1), 10, 20, 30, 40),
+                (now - datetime.timedelta(minutes=1), 10, 20, 30, 40),
+                (now, 12, 22, 32, 42),
+            ]))
+
+        self.assertEqual([True, False, False, False, False, True],
+                         [r.accepted for r in result.results])
+        for r in result.results:
+            self.assertEqual(not r.accepted, r.HasField('error'))
+        self.assertEqual([10, 12], [
+            t.latitude for t in UasTelemetry.by_user(self.user).order_by('pk')
+        ])
+
+    def test_missing_fields(self):
+        """Tests telemetry missing fields is rejected."""
+        proto = TelemetryBatch()
+        proto.telemetry.add().telemetry.latitude = 10
+        response = self.client.post(
+            telemetry_batch_url,
+            data=json_format.MessageToJson(proto),
+            content_type='application/json')
+
+        result = self.batch_result(response)
+        self.assertFalse(result.results[0].accepted)
+        self.assertEqual('Request missing fields.', result.results[0].error)
+        self.assertEqual(0, UasTelemetry.objects.count())
+
+    def test_loadtest(self):
+        """Tests the max telemetry rate the view can handle in batches."""
+        batch_size = 100
+        total_ops = 10
+        start_t = time.clock()
+        for _ in range(total_ops):
+            result = self.batch_result(
+                self.batch_request([(None, 10, 20, 30, 40)] * batch_size))
+            self.assertEqual(batch_size, len(result.results))
+        end_t = time.clock()
+        telemetry_rate = total_ops * batch_size / (end_t - start_t)
+        self.assertGreaterEqual(telemetry_rate, 200)
+        self.assertEqual(total_ops * batch_size, UasTelemetry.objects.count())
@@ -1,6 +1,9 @@
 from auvsi_suas.views.login import Login
 from auvsi_suas.views.index import Index
 from auvsi_suas.views.missions import Evaluate
+from auvsi_suas.views.missions import EvaluateJobs
+from auvsi_suas.views.missions import EvaluateJobsId
+from auvsi_suas.views.missions import EvaluateJobsIdZip
 from auvsi_suas.views.missions import ExportKml
 from auvsi_suas.views.missions import LiveKml
 from auvsi_suas.views.missions import LiveKmlUpdate
@@ -12,9 +15,12 @@ from auvsi_suas.views.odlcs import OdlcsAdminReview
 from auvsi_suas.views.odlcs import OdlcsId
 from auvsi_suas.views.odlcs import OdlcsIdImage
 from auvsi_suas.views.teams import Teams
+from auvsi_suas.views.teams import TeamsStream
 from auvsi_suas.views.teams import Team
 from auvsi_suas.views.telemetry import Telemetry
+from auvsi_suas.views.telemetry import TelemetryBatch
 from auvsi_suas.views.utils import BulkCreateTeams
+from auvsi_suas.views.utils import CacheStats
 from auvsi_suas.views.utils import GpsConversion
 from django.conf.urls import url
 from django.conf import settings
@@ -29,6 +35,9 @@ urlpatterns = [
     url(r'^api/missions$', Missions.as_view(), name='missions'),
     url(r'^api/missions/(?P<pk>\d+)$', MissionsId.as_view(), name='missions_id'),
     url(r'^api/missions/(?P<pk>\d+)/evaluate\.zip$', Evaluate.as_view(), name='evaluate'),
+    url(r'^api/missions/(?P<pk>\d+)/evaluate/jobs$', EvaluateJobs.as_view(), name='evaluate_jobs'),
+    url(r'^api/missions/(?P<pk>\d+)/evaluate/jobs/(?P<job_id>[0-9a-f]+)$', EvaluateJobsId.as_view(), name='evaluate_jobs_id'),
+    url(r'^api/missions/(?P<pk>\d+)/evaluate/jobs/(?P<job_id>[0-9a-f]+)/evaluate\.zip$', EvaluateJobsIdZip.as_view(), name='evaluate_jobs_id_zip'),
     url(r'^api/missions/(?P<pk>\d+)/mission.html$', MissionDetails.as_view(), name='details'),
     url(r'^api/missions/export\.kml$', ExportKml.as_view(), name='export_kml'),
     url(r'^api/missions/live\.kml$', LiveKml.as_view(), name='live_kml'),
@@ -39,9 +48,12 @@ urlpatterns = [
     url(r'^api/odlcs/review$', OdlcsAdminReview.as_view(), name='odlcs_review'),
     url(r'^api/odlcs/review/(?P<pk>\d+)$', OdlcsAdminReview.as_view(), name='odlcs_review_id'),
     url(r'^api/teams$', Teams.as_view(), name='teams'),
+    url(r'^api/teams/stream$', TeamsStream.as_view(), name='teams_stream'),
     url(r'^api/teams/(?P<username>.+)$', Team.as_view(), name='team'),
     url(r'^api/telemetry$', Telemetry.as_view(), name='telemetry'),
+    url(r'^api/telemetry/batch$', TelemetryBatch.as_view(), name='telemetry_batch'),
     url(r'^api/utils/gps_conversion$', GpsConversion.as_view(), name='gps_conversion'),
     url(r'^api/utils/bulk_create_teams$', BulkCreateTeams.as_view(), name='bulk_create_teams'),
+    url(r'^api/utils/cache_stats$', CacheStats.as_view(), name='cache_stats'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 # yapf: enable
@@ -6,6 +6,10 @@ import json
 import logging
 import random
 from LatLon23 import string2latlon
+from auvsi_suas.models import evaluation_cache
+from auvsi_suas.models import flight_track_cache
+from auvsi_suas.models import mission_cache
+from auvsi_suas.models import team_status_cache
 from auvsi_suas.proto import interop_admin_api_pb2
 from auvsi_suas.views.decorators import require_superuser
 from auvsi_suas.views.json import ProtoJsonEncoder
@@ -116,3 +120,20 @@ class BulkCreateTeams(View):
 
         # Render a printable page.
         return shortcuts.render(request, 'bulk_create_teams.html', context)
+
+
+class CacheStats(View):
+    """Gets the hit and miss counters of server caches."""
+
+    @method_decorator(require_superuser)
+    def dispatch(self, *args, **kwargs):
+        return super(CacheStats, self).dispatch(*args, **kwargs)
+
+    def get(self, request):
+        stats = {
+            'flight_track': flight_track_cache.stats(),
+            'mission': mission_cache.stats(),
+            'mission_evaluation': evaluation_cache.stats(),
+            'team_status': team_status_cache.stats(),
+        }
+        return HttpResponse(json.dumps(stats), content_type="application/json")
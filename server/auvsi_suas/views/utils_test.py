@@ -5,12 +5,15 @@ import io
 import json
 from auvsi_suas.proto import interop_admin_api_pb2
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from google.protobuf import json_format
 
 gps_conversion_url = reverse('auvsi_suas:gps_conversion')
 bulk_create_teams_url = reverse('auvsi_suas:bulk_create_teams')
+cache_stats_url = reverse('auvsi_suas:cache_stats')
+teams_url = reverse('auvsi_suas:teams')
 
 
 class TestGpsConversion(TestCase):
@@ -124,3 +127,75 @@ class TestBulkCreateTeams(TestCase):
 
         self.assertIsNotNone(User.objects.get(username='testuser'))
         self.assertIsNotNone(User.objects.get(username='testuser2'))
+
+
+class TestCacheStats(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.superuser.save()
+
+    def test_not_authenticated(self):
+        """Tests that not authenticated return 403."""
+        response = self.client.get(cache_stats_url)
+        self.assertEqual(403, response.status_code)
+
+    def test_not_admin(self):
+        """Tests that not admin return 403."""
+        user = User.objects.create_user('user', 'email@example.com',
+                                        'testpass')
+        user.save()
+        self.client.force_login(user)
+
+        response = self.client.get(cache_stats_url)
+        self.assertEqual(403, response.status_code)
+
+    def test_stats(self):
+        """Tests the cache hits and misses from team status requests."""
+        User.objects.create_user('user', 'email@example.com', 'testpass')
+        self.client.force_login(self.superuser)
+
+        response = self.client.get(cache_stats_url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({
+            'flight_track': {
+                'hits': 0,
+                'misses': 0
+            },
+            'mission': {
+                'hits': 0,
+                'misses': 0
+            },
+            'mission_evaluation': {
+                'hits': 0,
+                'misses': 0
+            },
+            'team_status': {
+                'hits': 0,
+                'misses': 0
+            }
+        }, json.loads(response.content))
+
+        self.client.get(teams_url)
+        self.client.get(teams_url)
+
+        response = self.client.get(cache_stats_url)
+        self.assertEqual({
+            'flight_track': {
+                'hits': 0,
+                'misses': 0
+            },
+            'mission': {
+                'hits': 0,
+                'misses': 0
+            },
+            'mission_evaluation': {
+                'hits': 0,
+                'misses': 0
+            },
+            'team_status': {
+                'hits': 2,
+                'misses': 2
+            }
+        }, json.loads(response.content))
@@ -91,12 +91,32 @@ DATABASES = {
 # https://docs.djangoproject.com/en/1.11/topics/cache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': 'interop-cache:11211',
         'TIMEOUT': 10,
         'KEY_PREFIX': 'suas',
     }
 }
 
+# Telemetry group commit
+# When enabled, telemetry uploads within a process are buffered and stored with
+# a single commit once MAX_ROWS telemetry are buffered or MAX_DELAY_MS elapses.
+# Requests return after their telemetry is committed. Requires uWSGI threads.
+TELEMETRY_GROUP_COMMIT = False
+TELEMETRY_GROUP_COMMIT_MAX_ROWS = 64
+TELEMETRY_GROUP_COMMIT_MAX_DELAY_MS = 5
+
+# Team status streams
+# Max number of team status streams open in each uWSGI process. Each stream
+# holds one of the process's threads, so this must be less than its threads.
+# Further streams are refused, and clients poll until retrying.
+TEAM_STATUS_STREAMS_PER_PROCESS = 1
+
+# Mission evaluation
+# Number of processes which evaluate teams in parallel. Teams are evaluated
+# serially within the request if 1.
+MISSION_EVALUATION_PROCESSES = 1
+
 # Logging
 LOGGING = {
     'version': 1,